@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+from .memcached import Memcached
+
+# Статусы, после которых ордер больше не меняется
+TERMINAL_STATUSES = frozenset({"closed", "canceled", "expired", "rejected"})
+
+DEFAULT_TERMINAL_TTL_S = 3600
+DEFAULT_TERMINAL_LIMIT = 10000
+
+
+class OrderRecord:
+    """
+    Сведения об ордере, которые шлюз хранит по client_order_id
+    """
+
+    __slots__ = (
+        "client_order_id",
+        "order_id",
+        "event_id",
+        "symbol",
+        "status",
+        "filled",
+        "account",
+        "terminal_at",
+    )
+
+    def __init__(
+        self,
+        client_order_id: str,
+        order_id: Optional[str],
+        event_id: Optional[str],
+        symbol: Optional[str],
+        status: str = "open",
+        filled: Optional[float] = None,
+        account: Optional[int] = None,
+    ):
+        self.client_order_id = client_order_id
+        self.order_id = order_id
+        self.event_id = event_id
+        self.symbol = symbol
+        self.status = status
+        self.filled = filled
+        # Номер аккаунта, через который создан ордер
+        self.account = account
+        self.terminal_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "order_id": self.order_id,
+            "event_id": self.event_id,
+            "symbol": self.symbol,
+            "status": self.status,
+            "filled": self.filled,
+            "account": self.account,
+        }
+
+
+class OrderIndex:
+    """
+    Индекс ордеров в памяти процесса
+
+    Активные ордера хранятся без ограничений. Ордера в конечном статусе
+    вытесняются по времени жизни и по количеству, начиная с самых давних.
+    Memcached, если передан, используется только для восстановления после
+    перезапуска: записи отправляются в него в фоне.
+    """
+
+    def __init__(
+        self,
+        memcached: Optional[Memcached] = None,
+        terminal_ttl: float = DEFAULT_TERMINAL_TTL_S,
+        terminal_limit: int = DEFAULT_TERMINAL_LIMIT,
+    ):
+        self.memcached = memcached
+        self.terminal_ttl = terminal_ttl
+        self.terminal_limit = terminal_limit
+
+        self._active: dict[str, OrderRecord] = {}
+        self._terminal: OrderedDict[str, OrderRecord] = OrderedDict()
+        self._client_order_id_by_order_id: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._active) + len(self._terminal)
+
+    def add(
+        self,
+        client_order_id: str,
+        order_id: Optional[str],
+        event_id: Optional[str],
+        symbol: Optional[str],
+        status: str = "open",
+        filled: Optional[float] = None,
+        account: Optional[int] = None,
+    ) -> OrderRecord:
+        self._terminal.pop(client_order_id, None)
+        record = OrderRecord(
+            client_order_id, order_id, event_id, symbol, filled=filled, account=account
+        )
+        self._active[client_order_id] = record
+        if order_id is not None:
+            self._client_order_id_by_order_id[order_id] = client_order_id
+        self.set_status(client_order_id, status)
+        return record
+
+    def get(self, client_order_id: str) -> Optional[OrderRecord]:
+        if record := self._active.get(client_order_id):
+            return record
+
+        if record := self._terminal.get(client_order_id):
+            self._terminal.move_to_end(client_order_id)
+        return record
+
+    def get_by_order_id(self, order_id: str) -> Optional[OrderRecord]:
+        if client_order_id := self._client_order_id_by_order_id.get(order_id):
+            return self.get(client_order_id)
+
+    def get_order_id(self, client_order_id: str) -> Optional[str]:
+        if record := self.get(client_order_id):
+            return record.order_id
+
+    def get_event_id(self, client_order_id: str) -> Optional[str]:
+        if record := self.get(client_order_id):
+            return record.event_id
+
+    def get_account(self, client_order_id: str) -> Optional[int]:
+        if record := self.get(client_order_id):
+            return record.account
+
+    def update(
+        self, client_order_id: str, status: str, filled: Optional[float]
+    ) -> bool:
+        """
+        Обновить статус и исполненный объём ордера
+
+        :return: True, если состояние ордера изменилось
+        """
+        if not (record := self.get(client_order_id)):
+            return False
+
+        if record.status == status and record.filled == filled:
+            return False
+
+        record.filled = filled
+        self.set_status(client_order_id, status)
+        return True
+
+    def set_status(self, client_order_id: str, status: str) -> None:
+        """
+        Обновить статус ордера. Ордер в конечном статусе переходит в вытесняемую часть
+        """
+        if not (record := self.get(client_order_id)):
+            return
+
+        record.status = status
+        if status in TERMINAL_STATUSES:
+            self._make_evictable(record)
+
+        if self.memcached is not None:
+            self.memcached.set_later(client_order_id, record.to_dict())
+
+    def expire(self, client_order_id: str) -> None:
+        """
+        Перевести ордер в вытесняемую часть, не меняя статус. Шлюз больше
+        не следит за таким ордером, но может найти его, пока он не вытеснен
+        """
+        if record := self.get(client_order_id):
+            self._make_evictable(record)
+
+    def _make_evictable(self, record: OrderRecord) -> None:
+        if record.terminal_at is not None:
+            return
+
+        record.terminal_at = monotonic()
+        del self._active[record.client_order_id]
+        self._terminal[record.client_order_id] = record
+        self._evict()
+
+    def _evict(self) -> None:
+        expired_at = monotonic() - self.terminal_ttl
+        while self._terminal:
+            client_order_id, record = next(iter(self._terminal.items()))
+            if len(self._terminal) <= self.terminal_limit and (
+                record.terminal_at > expired_at
+            ):
+                break
+            del self._terminal[client_order_id]
+            self._client_order_id_by_order_id.pop(record.order_id, None)
+
+    async def recover(self, client_order_id: str) -> Optional[OrderRecord]:
+        """
+        Найти ордер в индексе, а при его отсутствии — в Memcached
+        """
+        if record := self.get(client_order_id):
+            return record
+
+        if self.memcached is None:
+            return None
+
+        if not (saved := await self.memcached.get_async(client_order_id)):
+            return None
+
+        return self.add(
+            client_order_id,
+            saved["order_id"],
+            saved["event_id"],
+            saved["symbol"],
+            saved["status"],
+            saved.get("filled"),
+            saved.get("account"),
+        )
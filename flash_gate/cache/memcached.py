@@ -1,16 +1,61 @@
+import asyncio
+import logging
+import threading
+from typing import NoReturn
 from pymemcache.client.base import Client
 from pymemcache.serde import pickle_serde
 
+FLUSH_INTERVAL_S = 0.5
+
 
 class Memcached:
     def __init__(self, key_prefix: str = ""):
+        self.logger = logging.getLogger(__name__)
         self.client = Client(
             "localhost", pickle_serde, default_noreply=False, key_prefix=key_prefix
         )
+        self._pending: dict = {}
+        # Клиент pymemcache не потокобезопасен, а запросы выполняются
+        # в разных потоках
+        self._lock = threading.Lock()
 
     def set(self, key, value) -> None:
-        self.client.set(key, value)
+        with self._lock:
+            self.client.set(key, value)
 
     def get(self, key: str):
-        value = self.client.get(key)
+        with self._lock:
+            value = self.client.get(key)
         return value
+
+    def set_many(self, values: dict) -> None:
+        with self._lock:
+            self.client.set_many(values)
+
+    def set_later(self, key, value) -> None:
+        """
+        Запомнить значение для фоновой записи. Не обращается к серверу
+        """
+        self._pending[key] = value
+
+    async def get_async(self, key: str):
+        """
+        Получить значение, не блокируя цикл событий
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    async def run(self) -> NoReturn:
+        """
+        Периодически записывать накопленные значения в отдельном потоке
+        """
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_S)
+            if self._pending:
+                await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self.set_many, pending)
+        except Exception as e:
+            self.logger.error("Memcached write error: %s", e)
@@ -1,2 +1,3 @@
+from .arrays import ArrayOrderBook
 from .exchanges import CcxtExchange
 from .pool import ExchangePool
@@ -0,0 +1,182 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import Iterator, Optional
+from .types import OrderBook
+from .utils import get_timestamp_in_us
+
+# Цены и объёмы сериализуются в little-endian
+SWAP_BYTES = sys.byteorder != "little"
+
+get_price = itemgetter(0)
+get_amount = itemgetter(1)
+
+
+class ArrayOrderBook(Mapping):
+    """
+    Стакан, уровни которого хранятся в колонках array("d")
+
+    Вместо списка пар [цена, объём] на каждую сторону хранятся два массива
+    float64: цены и объёмы. Сравнение, обрезка по глубине и сериализация
+    выполняются над массивами целиком. Для совместимости со словарём OrderBook
+    стакан доступен по ключам symbol, bids, asks и timestamp.
+    """
+
+    KEYS = ("symbol", "bids", "asks", "timestamp")
+
+    __slots__ = (
+        "symbol",
+        "timestamp",
+        "bid_prices",
+        "bid_amounts",
+        "ask_prices",
+        "ask_amounts",
+    )
+
+    def __init__(
+        self,
+        symbol: str,
+        bid_prices: array,
+        bid_amounts: array,
+        ask_prices: array,
+        ask_amounts: array,
+        timestamp: Optional[int] = None,
+    ):
+        self.symbol = symbol
+        self.timestamp = timestamp
+        self.bid_prices = bid_prices
+        self.bid_amounts = bid_amounts
+        self.ask_prices = ask_prices
+        self.ask_amounts = ask_amounts
+
+    @classmethod
+    def from_levels(
+        cls, symbol: str, bids: list, asks: list, timestamp: Optional[int] = None
+    ) -> "ArrayOrderBook":
+        """
+        Собрать стакан из уровней CCXT без промежуточных списков
+        """
+        return cls(
+            symbol,
+            array("d", map(get_price, bids)),
+            array("d", map(get_amount, bids)),
+            array("d", map(get_price, asks)),
+            array("d", map(get_amount, asks)),
+            timestamp,
+        )
+
+    @classmethod
+    def from_ccxt(cls, raw_order_book: dict) -> "ArrayOrderBook":
+        """
+        Собрать стакан из структуры CCXT. Время переводится в микросекунды
+        """
+        return cls.from_levels(
+            raw_order_book["symbol"],
+            raw_order_book["bids"],
+            raw_order_book["asks"],
+            get_timestamp_in_us(raw_order_book),
+        )
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArrayOrderBook):
+            return NotImplemented
+        return (
+            self.symbol == other.symbol
+            and self.bid_prices == other.bid_prices
+            and self.bid_amounts == other.bid_amounts
+            and self.ask_prices == other.ask_prices
+            and self.ask_amounts == other.ask_amounts
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"ArrayOrderBook({self.symbol!r}, bids={len(self.bid_prices)}, "
+            f"asks={len(self.ask_prices)}, timestamp={self.timestamp})"
+        )
+
+    @property
+    def bids(self) -> list[list[float]]:
+        return list(map(list, zip(self.bid_prices, self.bid_amounts)))
+
+    @property
+    def asks(self) -> list[list[float]]:
+        return list(map(list, zip(self.ask_prices, self.ask_amounts)))
+
+    def truncate(self, depth: int) -> "ArrayOrderBook":
+        """
+        Получить стакан, обрезанный до depth уровней с каждой стороны
+        """
+        if len(self.bid_prices) <= depth and len(self.ask_prices) <= depth:
+            return self
+
+        return ArrayOrderBook(
+            self.symbol,
+            self.bid_prices[:depth],
+            self.bid_amounts[:depth],
+            self.ask_prices[:depth],
+            self.ask_amounts[:depth],
+            self.timestamp,
+        )
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.bid_prices[0] if self.bid_prices else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.ask_prices[0] if self.ask_prices else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.bid_prices and self.ask_prices:
+            return (self.bid_prices[0] + self.ask_prices[0]) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.bid_prices and self.ask_prices:
+            return self.ask_prices[0] - self.bid_prices[0]
+
+    def imbalance(self, depth: Optional[int] = None) -> Optional[float]:
+        """
+        Дисбаланс объёмов в диапазоне от -1 (только аски) до 1 (только биды)
+
+        :param depth: Сколько уровней учитывать, по умолчанию все
+        """
+        bids_volume = sum(self.bid_amounts[:depth])
+        asks_volume = sum(self.ask_amounts[:depth])
+        if total := bids_volume + asks_volume:
+            return (bids_volume - asks_volume) / total
+
+    def to_dict(self) -> OrderBook:
+        return {
+            "symbol": self.symbol,
+            "bids": self.bids,
+            "asks": self.asks,
+            "timestamp": self.timestamp,
+        }
+
+    def to_bytes(self) -> bytes:
+        """
+        Колонки подряд в little-endian: цены бидов, объёмы бидов, цены асков,
+        объёмы асков
+        """
+        columns = (
+            self.bid_prices + self.bid_amounts + self.ask_prices + self.ask_amounts
+        )
+        if SWAP_BYTES:
+            columns.byteswap()
+        return columns.tobytes()
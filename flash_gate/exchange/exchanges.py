@@ -4,9 +4,21 @@ import itertools
 import logging
 from abc import ABC, abstractmethod
 import ccxtpro
+from ccxt.base.errors import DDoSProtection, OrderNotFound
+from flash_gate.tracing import TraceStage, mark
+from .arrays import ArrayOrderBook
 from .enums import StructureType
 from .formatters import CcxtFormatterFactory
-from .types import OrderBook, Balance, Order, FetchOrderParams, CreateOrderParams
+from .limits import RateLimitUsage
+from .store import DEFAULT_ORDER_STATE_MAX_AGE_S, OrderStore
+from .types import (
+    OrderBook,
+    OrderBookSnapshot,
+    Balance,
+    Order,
+    FetchOrderParams,
+    CreateOrderParams,
+)
 
 
 class Exchange(ABC):
@@ -108,39 +120,88 @@ class CcxtExchange(Exchange):
     Класс для взаимодействия с биржей через CCXT
     """
 
-    def __init__(self, exchange_id: str, config: dict):
+    def __init__(
+        self,
+        exchange_id: str,
+        config: dict,
+        order_state_max_age: float = DEFAULT_ORDER_STATE_MAX_AGE_S,
+    ):
+        """
+        :param exchange_id: Идентификатор биржи
+        :param config: Конфигурация CCXT
+        :param order_state_max_age: Сколько секунд известное состояние
+            открытого ордера отдаётся без запроса к бирже
+        """
         self.logger = logging.getLogger(__name__)
         self.exchange: ccxtpro.Exchange = getattr(ccxtpro, exchange_id)(config)
         self.exchange.nonce = self.nonce
 
+        # Использование лимитов обновляется по заголовкам каждого ответа
+        self.usage = RateLimitUsage()
+        self._fetch = self.exchange.fetch
+        self.exchange.fetch = self.fetch
+
+        # Состояние ордеров обновляется по ответам на все запросы ордеров
+        self.orders = OrderStore(order_state_max_age)
+
     @staticmethod
     def nonce():
         return time_ns()
 
-    async def fetch_order_book(self, symbol: str, limit: int) -> OrderBook:
+    async def fetch(self, *args, **kwargs):
+        """
+        HTTP-запрос CCXT, после которого читаются заголовки лимитов
+        """
+        self.exchange.last_response_headers = None
+        mark(TraceStage.REST_SENT)
+        try:
+            return await self._fetch(*args, **kwargs)
+        except DDoSProtection:
+            self.usage.set_rate_limited(self.exchange.last_response_headers)
+            raise
+        finally:
+            mark(TraceStage.REST_RECEIVED)
+            if headers := self.exchange.last_response_headers:
+                self.usage.update(headers)
+
+    async def fetch_order_book(self, symbol: str, limit: int) -> ArrayOrderBook:
         order_book = await self._fetch_order_book(symbol, limit)
         return order_book
 
-    async def _fetch_order_book(self, symbol: str, limit: int) -> OrderBook:
+    async def _fetch_order_book(self, symbol: str, limit: int) -> ArrayOrderBook:
         raw_order_book = await self.exchange.fetch_order_book(symbol, limit)
-        order_book = self._format(raw_order_book, StructureType.ORDER_BOOK)
+        order_book = ArrayOrderBook.from_ccxt(raw_order_book).truncate(limit)
         return order_book
 
+    async def fetch_order_book_snapshot(
+        self, symbol: str, limit: int
+    ) -> OrderBookSnapshot:
+        """
+        Запросить снимок стакана вместе с идентификатором последнего обновления
+        """
+        raw_order_book = await self.exchange.fetch_order_book(symbol, limit)
+        snapshot: OrderBookSnapshot = {
+            "symbol": symbol,
+            "bids": raw_order_book["bids"],
+            "asks": raw_order_book["asks"],
+            "nonce": raw_order_book["nonce"],
+        }
+        return snapshot
+
     async def fetch_order_books(
         self, symbols: list[str], limit: int
-    ) -> list[OrderBook]:
+    ) -> list[ArrayOrderBook]:
         order_book = await self._fetch_order_books(symbols, limit)
         return order_book
 
     async def _fetch_order_books(
         self, symbols: list[str], limit: int
-    ) -> list[OrderBook]:
+    ) -> list[ArrayOrderBook]:
         raw_order_books = await self.exchange.fetch_order_books(symbols, limit)
-        order_books = []
-        for symbol in symbols:
-            order_book = self._format(raw_order_books[symbol], StructureType.ORDER_BOOK)
-            order_books.append(order_book)
-
+        order_books = [
+            ArrayOrderBook.from_ccxt(raw_order_books[symbol]).truncate(limit)
+            for symbol in symbols
+        ]
         return order_books
 
     async def watch_order_book(self, symbol: str, limit: int) -> OrderBook:
@@ -185,35 +246,31 @@ class CcxtExchange(Exchange):
         return order
 
     async def _fetch_order(self, params: FetchOrderParams) -> Order:
-        if order := await self._fetch_order_from_open(params):
-            self.logger.debug("Fetched from open: %s", order)
-        elif order := await self._fetch_order_from_canceled(params):
-            self.logger.debug("Fetched from canceled: %s", order)
-        else:
+        # Состояние из хранилища не сохраняется повторно: иначе частые запросы
+        # продлевают его актуальность и ордер больше не запрашивается у биржи
+        if order := self.orders.get(params["id"]):
+            self.logger.debug("Fetched from store: %s", order)
+            return self._force_close_unpriced(order)
+
+        try:
             raw_order = await self.exchange.fetch_order(params["id"], params["symbol"])
-            order = self._format(raw_order, StructureType.ORDER)
-            self.logger.debug("Fetched from fetch: %s", order)
+        except OrderNotFound:
+            self.orders.discard(params["id"])
+            raise
+
+        order = self._format(raw_order, StructureType.ORDER)
+        self.logger.debug("Fetched from fetch: %s", order)
+
+        order = self._force_close_unpriced(order)
+        self.orders.put(order)
+        return order
 
+    def _force_close_unpriced(self, order: Order) -> Order:
         if order["price"] is None:
             order["status"] = "closed"
             self.logger.warning("Force closed status: %s", order)
-
         return order
 
-    async def _fetch_order_from_open(self, params: FetchOrderParams) -> Order:
-        open_orders = await self.fetch_open_orders([params["symbol"]])
-        for order in open_orders:
-            if order["id"] == params["id"]:
-                return order
-
-    async def _fetch_order_from_canceled(self, params: FetchOrderParams) -> Order:
-        raw_orders = await self.exchange.fetch_canceled_orders(params["symbol"])
-        for raw_order in raw_orders:
-            if raw_order["id"] == params["id"]:
-                raw_order["status"] = "canceled"
-                order = self._format(raw_order, StructureType.ORDER)
-                return order
-
     async def fetch_open_orders(self, symbols: list[str]) -> list[Order]:
         self.logger.debug("Trying to fetch open orders: %s", symbols)
         orders = await self._fetch_open_orders(symbols)
@@ -223,6 +280,7 @@ class CcxtExchange(Exchange):
     async def _fetch_open_orders(self, symbols: list[str]) -> list[Order]:
         raw_orders = await self._fetch_raw_open_orders(symbols)
         orders = [self._format(order, StructureType.ORDER) for order in raw_orders]
+        self.orders.sync_open_orders(symbols, orders)
         return orders
 
     async def watch_orders(self) -> list[Order]:
@@ -230,8 +288,11 @@ class CcxtExchange(Exchange):
         return orders
 
     async def _watch_orders(self) -> list[Order]:
+        # Ключ потока пользовательских данных CCXT продлевает сам
         raw_orders = await self.exchange.watch_orders()
         orders = [self._format(order, StructureType.ORDER) for order in raw_orders]
+        for order in orders:
+            self.orders.put(order)
         return orders
 
     async def create_orders(self, orders: list[CreateOrderParams]) -> list[Order]:
@@ -255,6 +316,7 @@ class CcxtExchange(Exchange):
             params["price"] if params["type"] != "market" else 0,
         )
         order = self._format(raw_order, StructureType.ORDER)
+        self.orders.put(order)
         self.logger.debug("Order has been successfully created: %s", order)
         return order
 
@@ -267,19 +329,41 @@ class CcxtExchange(Exchange):
 
     async def cancel_order(self, order: FetchOrderParams) -> None:
         self.logger.debug("Trying to cancel order: %s", order)
-        result = await self.exchange.cancel_order(order["id"], order["symbol"])
-        self.logger.debug("Order has been successfully cancelled: %s", result)
+        raw_order = await self.exchange.cancel_order(order["id"], order["symbol"])
+        self.orders.put(self._format(raw_order, StructureType.ORDER))
+        self.logger.debug("Order has been successfully cancelled: %s", raw_order)
 
-    async def cancel_all_orders(self, symbols: list[str]) -> None:
+    async def cancel_all_orders(self, symbols: list[str]) -> list[Order]:
         self.logger.debug("Trying to cancel all orders: %s", symbols)
-        await self._cancel_all_orders(symbols)
-        self.logger.debug("All orders has been successfully cancelled")
+        orders = await self._cancel_all_orders(symbols)
+        self.logger.debug("All orders has been successfully cancelled: %s", orders)
+        return orders
 
-    async def _cancel_all_orders(self, symbols: list[str]) -> None:
-        raw_orders = await self._fetch_raw_open_orders(symbols)
-        for raw_order in raw_orders:
-            await self.exchange.cancel_order(raw_order["id"], raw_order["symbol"])
-            await asyncio.sleep(0.3)
+    async def _cancel_all_orders(self, symbols: list[str]) -> list[Order]:
+        groups = await asyncio.gather(
+            *(self.cancel_symbol_orders(symbol) for symbol in symbols)
+        )
+        orders = list(itertools.chain.from_iterable(groups))
+        return orders
+
+    async def cancel_symbol_orders(self, symbol: str) -> list[Order]:
+        """
+        Отменить все открытые ордера тикера одним запросом
+        DELETE /api/v3/openOrders
+
+        :param symbol: Тикер
+        :return: Отменённые ордера
+        """
+        try:
+            raw_orders = await self.exchange.cancel_all_orders(symbol)
+        except OrderNotFound:
+            # Binance отвечает ошибкой, если открытых ордеров по тикеру нет
+            return []
+
+        orders = [self._format(order, StructureType.ORDER) for order in raw_orders]
+        for order in orders:
+            self.orders.put(order)
+        return orders
 
     async def _fetch_raw_open_orders(self, symbols: list[str]) -> list[dict]:
         groups = []
@@ -296,6 +380,7 @@ class CcxtExchange(Exchange):
         factory = CcxtFormatterFactory()
         formatter = factory.make_formatter(ccxt_structure_type)
         structure = formatter.format(ccxt_structure)
+        mark(TraceStage.FORMATTED)
         return structure
 
     async def close(self) -> None:
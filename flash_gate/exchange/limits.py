@@ -0,0 +1,229 @@
+from time import monotonic, time
+from typing import Callable, Mapping, Optional
+from .types import RateLimitStats
+
+# Лимит веса запросов Binance с одного IP-адреса за минуту. По умолчанию
+# используется 90% лимита: запас на запросы, которые CCXT делает сам,
+# например загрузку рынков
+WEIGHT_LIMIT_PER_MINUTE = 6000
+DEFAULT_WEIGHT_LIMIT = 5400
+# Доля бюджета, которую можно потратить сразу, не дожидаясь пополнения
+BURST_RATIO = 0.1
+# Во сколько раз можно ускориться, если биржа сообщает о запасе бюджета
+MAX_SPEEDUP = 2
+
+# Лимиты количества ордеров одного аккаунта
+ORDER_LIMITS = {"10s": 50, "1d": 160000}
+# Доля лимита, после которой запросы через IP-адрес или аккаунт приостанавливаются
+THROTTLE_RATIO = 0.9
+# Пауза после 429/418 без заголовка Retry-After
+DEFAULT_RETRY_AFTER_S = 60
+
+USED_WEIGHT_HEADER = "x-mbx-used-weight-"
+ORDER_COUNT_HEADER = "x-mbx-order-count-"
+RETRY_AFTER_HEADER = "retry-after"
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Вес запросов без параметров, влияющих на вес
+REQUEST_WEIGHTS = {
+    "fetch_ticker": 2,
+    "fetch_trades": 25,
+    "load_markets": 20,
+    "watch_order_book": 1,
+}
+DEFAULT_REQUEST_WEIGHT = 1
+
+
+def get_order_book_weight(limit: int) -> int:
+    """
+    Вес запроса стакана GET /api/v3/depth в зависимости от глубины
+    """
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def get_request_weight(method: str) -> int:
+    return REQUEST_WEIGHTS.get(method, DEFAULT_REQUEST_WEIGHT)
+
+
+def get_interval_seconds(interval: str) -> int:
+    """
+    Длительность интервала из заголовка в секундах: 10s -> 10, 1m -> 60
+    """
+    return int(interval[:-1]) * INTERVAL_UNITS[interval[-1]]
+
+
+class RateLimitUsage:
+    """
+    Использование лимитов по заголовкам ответов Binance
+
+    X-MBX-USED-WEIGHT-(интервал) — вес запросов IP-адреса,
+    X-MBX-ORDER-COUNT-(интервал) — количество ордеров аккаунта. Биржа считает
+    их в окнах, выровненных по времени, поэтому значение из прошлого окна
+    считается нулевым.
+    """
+
+    def __init__(self):
+        self.used_weight: dict[str, int] = {}
+        self.order_count: dict[str, int] = {}
+        self.updated_at: Optional[float] = None
+        self.retry_until = 0.0
+        self.on_update: Optional[Callable[["RateLimitUsage"], None]] = None
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Обновить использование по заголовкам ответа
+        """
+        used_weight = {}
+        order_count = {}
+        for name, value in headers.items():
+            name = name.lower()
+            if name.startswith(USED_WEIGHT_HEADER):
+                used_weight[name.removeprefix(USED_WEIGHT_HEADER)] = int(value)
+            elif name.startswith(ORDER_COUNT_HEADER):
+                order_count[name.removeprefix(ORDER_COUNT_HEADER)] = int(value)
+
+        if not used_weight and not order_count:
+            return
+
+        self.used_weight |= used_weight
+        self.order_count |= order_count
+        self.updated_at = time()
+        if self.on_update is not None:
+            self.on_update(self)
+
+    def set_rate_limited(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        Запомнить, что биржа ответила 429 или 418. Пауза берётся из Retry-After
+        """
+        retry_after = DEFAULT_RETRY_AFTER_S
+        for name, value in (headers or {}).items():
+            if name.lower() == RETRY_AFTER_HEADER:
+                retry_after = int(value)
+        self.retry_until = max(self.retry_until, monotonic() + retry_after)
+
+    @property
+    def retry_after(self) -> float:
+        return max(self.retry_until - monotonic(), 0)
+
+    def get_used_weight(self, interval: str = "1m") -> int:
+        return self._get_current(self.used_weight, interval)
+
+    def get_order_count(self, interval: str) -> int:
+        return self._get_current(self.order_count, interval)
+
+    def _get_current(self, counters: dict[str, int], interval: str) -> int:
+        if interval not in counters:
+            return 0
+
+        seconds = get_interval_seconds(interval)
+        if self.updated_at // seconds != time() // seconds:
+            return 0
+        return counters[interval]
+
+    def is_exhausted(self) -> bool:
+        """
+        Проверить, что запросы стоит приостановить до сброса лимитов
+        """
+        return self.is_weight_exhausted() or self.is_orders_exhausted()
+
+    def is_weight_exhausted(self) -> bool:
+        if self.retry_after > 0:
+            return True
+        return self.get_used_weight() >= WEIGHT_LIMIT_PER_MINUTE * THROTTLE_RATIO
+
+    def is_orders_exhausted(self) -> bool:
+        return any(
+            self.get_order_count(interval) >= limit * THROTTLE_RATIO
+            for interval, limit in ORDER_LIMITS.items()
+        )
+
+    def to_dict(self) -> RateLimitStats:
+        return {
+            "used_weight": {
+                interval: self.get_used_weight(interval)
+                for interval in self.used_weight
+            },
+            "order_count": {
+                interval: self.get_order_count(interval)
+                for interval in self.order_count
+            },
+            "retry_after": self.retry_after,
+        }
+
+
+class WeightBucket:
+    """
+    Бюджет веса запросов одного IP-адреса по алгоритму token bucket
+
+    Бюджет пополняется равномерно, а накопить можно не больше burst. Поэтому
+    в любое окно длиной в минуту укладывается не больше limit веса, как бы
+    это окно ни было выровнено относительно минутных окон биржи.
+
+    Если биржа сообщила использованный вес, остаток бюджета её текущего окна
+    распределяется равномерно до конца окна: при запасе скорость растёт
+    (не больше чем в MAX_SPEEDUP раз), при приближении к лимиту падает.
+    В новом окне скорость возвращается к базовой.
+    """
+
+    def __init__(self, limit: int, burst_ratio: float = BURST_RATIO):
+        """
+        :raises ValueError: Лимит слишком мал, чтобы бюджет пополнялся
+        """
+        self.limit = limit
+        self.capacity = max(limit * burst_ratio, 1)
+        self.base_rate = (limit - self.capacity) / 60
+        if self.base_rate <= 0:
+            raise ValueError(f"Weight limit is too small: {limit}")
+        self.rate = self.base_rate
+        self.tokens = self.capacity
+        self._updated = monotonic()
+        self._window_end: Optional[float] = None
+
+    def refill(self) -> float:
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+        if self._window_end is not None and time() >= self._window_end:
+            self.rate = self.base_rate
+            self._window_end = None
+        return self.tokens
+
+    def sync(self, used_weight: int) -> None:
+        """
+        Подстроить скорость под вес, использованный в текущем минутном окне биржи
+        """
+        self.refill()
+        now = time()
+        self._window_end = (now // 60 + 1) * 60
+
+        remaining = max(self.limit - used_weight, 0)
+        self.tokens = min(self.tokens, remaining)
+        rate = (remaining - max(self.tokens, 0)) / (self._window_end - now)
+        self.rate = min(rate, self.base_rate * MAX_SPEEDUP)
+
+    def can_take(self, weight: int) -> bool:
+        # Запрос тяжелее всего бюджета ждёт, пока бюджет не заполнится целиком
+        return self.tokens >= min(weight, self.capacity)
+
+    def take(self, weight: int) -> None:
+        self.tokens -= weight
+
+    def wait_time(self, weight: int) -> float:
+        """
+        Время до момента, когда бюджета хватит на запрос
+        """
+        missing = min(weight, self.capacity) - self.tokens
+        if missing <= 0:
+            return 0
+        if self.rate <= 0:
+            return max(self._window_end - time(), 0)
+        return missing / self.rate
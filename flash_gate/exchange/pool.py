@@ -1,34 +1,142 @@
 import asyncio
-from dataclasses import dataclass
-from queue import Queue
-from time import monotonic, sleep
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Optional
 from aiohttp import ClientSession, TCPConnector
+from ccxt.base.errors import NetworkError
 from .exchanges import CcxtExchange
+from .limits import (
+    DEFAULT_REQUEST_WEIGHT,
+    DEFAULT_WEIGHT_LIMIT,
+    ORDER_LIMITS,
+    THROTTLE_RATIO,
+    RateLimitUsage,
+    WeightBucket,
+)
+from .store import DEFAULT_ORDER_STATE_MAX_AGE_S
+from .types import RateLimitStats
+
+# Пауза перед повторной попыткой, если лимиты аккаунта исчерпаны
+THROTTLE_DELAY_S = 0.1
+ORDER_WINDOW_S = 10
+ORDER_LIMIT = int(ORDER_LIMITS["10s"] * THROTTLE_RATIO)
 
 
 @dataclass
-class AcquiredExchange:
+class PrivateAccount:
+    index: int
     exchange: CcxtExchange
-    last_acquire: float
     delay: float
+    in_flight: int = 0
+    errors: float = 0
+    last_request: float = float("-inf")
+    # Время отправки ордеров за последние ORDER_WINDOW_S
+    orders: deque[float] = field(default_factory=deque)
 
-    @property
-    def remaining(self):
+    def get_load(self) -> tuple:
+        return self.in_flight, self.errors, len(self.orders), self.last_request
+
+    def get_wait_time(self, orders: int, urgent: bool = False) -> float:
+        """
+        Время до момента, когда аккаунт сможет выполнить запрос
+
+        :param orders: Сколько ордеров создаёт запрос
+        :param urgent: Не выдерживать задержку после предыдущего запроса
+        """
         now = monotonic()
-        return self.last_acquire + self.delay - now
+        while self.orders and self.orders[0] <= now - ORDER_WINDOW_S:
+            self.orders.popleft()
+
+        wait_time = 0 if urgent else self.last_request + self.delay - now
+        usage = self.exchange.usage
+
+        # Отмены и запросы состояния не расходуют лимит ордеров
+        if orders and len(self.orders) + orders > ORDER_LIMIT:
+            wait_time = max(wait_time, self.orders[0] + ORDER_WINDOW_S - now)
+        if orders and usage.is_orders_exhausted():
+            wait_time = max(wait_time, THROTTLE_DELAY_S)
+
+        if usage.is_weight_exhausted():
+            wait_time = max(wait_time, usage.retry_after, THROTTLE_DELAY_S)
+        return max(wait_time, 0)
+
+    def reserve(self, orders: int) -> None:
+        self.in_flight += 1
+        self.last_request = monotonic()
+        self.orders.extend([self.last_request] * orders)
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+@dataclass
+class AccountWaiter:
+    priority: int
+    counter: int
+    candidates: list[PrivateAccount]
+    orders: int
+    urgent: bool
+    future: asyncio.Future
+
+    def get_wait_time(self) -> float:
+        return min(a.get_wait_time(self.orders, self.urgent) for a in self.candidates)
+
+
+@dataclass
+class PublicConnection:
+    local_host: str
+    exchange: CcxtExchange
+    bucket: WeightBucket
+
+    def sync(self, usage: RateLimitUsage) -> None:
+        self.bucket.sync(usage.get_used_weight())
 
 
 class ExchangePool:
+    """
+    Пул exchange для публичных запросов, по одному на IP-адрес
+
+    Каждый IP-адрес имеет собственный бюджет веса запросов. Запрос получает
+    IP-адрес с наибольшим остатком бюджета, а если бюджета нет ни у одного,
+    ждёт его пополнения, не блокируя цикл событий. Ожидающие запросы
+    обслуживаются в порядке очереди.
+    """
+
     # Ephemeral port
     _LOCAL_PORT = 0
 
-    def __init__(self, exchange_id: str, config: dict, local_hosts: list[str], delay):
+    def __init__(
+        self,
+        exchange_id: str,
+        config: dict,
+        local_hosts: list[str],
+        weight_limit: int = DEFAULT_WEIGHT_LIMIT,
+    ):
+        """
+        :param exchange_id: Идентификатор биржи
+        :param config: Конфигурация CCXT
+        :param local_hosts: IP-адреса, с которых отправляются запросы
+        :param weight_limit: Бюджет веса запросов одного IP-адреса в минуту
+        """
         self._exchange_id = exchange_id
         self._config = config | {"session": None}  # CCXT does not own session
 
-        self._queue: Queue[AcquiredExchange] = Queue()
-        for exchange in self._create_exchanges(local_hosts):
-            self._queue.put(AcquiredExchange(exchange, monotonic(), delay))
+        self._connections = [
+            PublicConnection(local_host, exchange, WeightBucket(weight_limit))
+            for local_host, exchange in zip(
+                local_hosts, self._create_exchanges(local_hosts)
+            )
+        ]
+        for connection in self._connections:
+            connection.exchange.usage.on_update = connection.sync
+        self._lock = asyncio.Lock()
+
+        # Счётчики ожидания бюджета
+        self.waits = 0
+        self.wait_time = 0.0
 
     def _create_exchanges(self, local_hosts: list[str]) -> list[CcxtExchange]:
         exchanges = [self._create_exchange(local_host) for local_host in local_hosts]
@@ -41,35 +149,110 @@ class ExchangePool:
         exchange.exchange.session = session
         return exchange
 
-    async def acquire(self) -> CcxtExchange:
-        acquired_exchange = self._queue.get()
-        if (remaining := acquired_exchange.remaining) > 0:
-            await asyncio.sleep(remaining)
+    async def acquire(self, weight: int = DEFAULT_REQUEST_WEIGHT) -> CcxtExchange:
+        """
+        Получить exchange с наибольшим остатком бюджета и списать с него вес
 
-        now = monotonic()
-        acquired_exchange.last_acquire = now
-        self._queue.put(acquired_exchange)
+        :param weight: Вес запроса, который будет отправлен
+        """
+        if not self._lock.locked() and (connection := self._take(weight)):
+            return connection.exchange
+
+        start = monotonic()
+        async with self._lock:
+            while not (connection := self._take(weight)):
+                await asyncio.sleep(self._get_wait_time(weight))
+
+        self.waits += 1
+        self.wait_time += monotonic() - start
+        return connection.exchange
+
+    def get_local_host(self, exchange: CcxtExchange) -> str:
+        """
+        Получить IP-адрес, через который отправляет запросы exchange
+        """
+        for connection in self._connections:
+            if connection.exchange is exchange:
+                return connection.local_host
+        raise ValueError("Exchange is not in the pool")
+
+    def _take(self, weight: int) -> Optional[PublicConnection]:
+        # IP-адреса, получившие 429 или 418, ждут окончания бана
+        connections = [c for c in self._connections if not c.exchange.usage.retry_after]
+        if not connections:
+            return None
+
+        connection = max(connections, key=lambda c: c.bucket.refill())
+        if not connection.bucket.can_take(weight):
+            return None
+
+        connection.bucket.take(weight)
+        return connection
 
-        return acquired_exchange.exchange
+    def _get_wait_time(self, weight: int) -> float:
+        return min(
+            c.exchange.usage.retry_after or c.bucket.wait_time(weight)
+            for c in self._connections
+        )
+
+    def usage(self) -> dict[str, RateLimitStats]:
+        """
+        Использование лимитов по IP-адресам
+        """
+        return {c.local_host: c.exchange.usage.to_dict() for c in self._connections}
 
     async def close(self):
-        while not self._queue.empty():
-            acquired_exchange = self._queue.get()
-            session = acquired_exchange.exchange.exchange.session
-            await session.close()
+        for connection in self._connections:
+            await connection.exchange.exchange.session.close()
 
 
 class PrivateExchangePool:
-    def __init__(self, exchange_id: str, config: dict, accounts: list[dict], delay=0):
+    """
+    Пул exchange с приватным соединением, по одному на аккаунт
+
+    Запрос получает наименее загруженный аккаунт: с наименьшим числом
+    запросов в работе, затем с наименьшим числом недавних сетевых ошибок
+    и ордеров, затем давнее всех использованный. Аккаунт недоступен, пока
+    не прошла задержка delay после его предыдущего запроса, пока исчерпан
+    лимит ордеров за 10 секунд или пока по заголовкам ответов исчерпан
+    лимит веса. Операции над существующим ордером закрепляются за
+    аккаунтом, который его создал.
+
+    Освободившийся аккаунт достаётся ожидающему запросу с наивысшим
+    приоритетом, внутри приоритета — в порядке поступления.
+    """
+
+    def __init__(
+        self,
+        exchange_id: str,
+        config: dict,
+        accounts: list[dict],
+        delay=0,
+        order_state_max_age: float = DEFAULT_ORDER_STATE_MAX_AGE_S,
+    ):
         """
-        Пул exchange с приватным соединением. Создает подключения с помощью переданных ключей.
+        :param exchange_id: Идентификатор биржи
+        :param config: Конфигурация CCXT
+        :param accounts: Ключи аккаунтов, дополняющие конфигурацию
+        :param delay: Минимальный интервал между запросами одного аккаунта
+        :param order_state_max_age: Время актуальности состояния открытого ордера
         """
         self._exchange_id = exchange_id
         self._config = config
+        self._order_state_max_age = order_state_max_age
+
+        self._accounts = [
+            PrivateAccount(index, exchange, delay)
+            for index, exchange in enumerate(self._create_exchanges(accounts))
+        ]
+
+        self._waiters: list[AccountWaiter] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
 
-        self._queue: Queue[AcquiredExchange] = Queue()
-        for exchange in self._create_exchanges(accounts):
-            self._queue.put(AcquiredExchange(exchange, monotonic(), delay))
+        # Счётчики ожидания свободного аккаунта
+        self.waits = 0
+        self.wait_time = 0.0
 
     def _create_exchanges(self, accounts: list[dict]) -> list[CcxtExchange]:
         """
@@ -84,13 +267,126 @@ class PrivateExchangePool:
         :param keys: словарь с ключами api_key, secret_key
         """
         config = self._config | keys
-        exchange = CcxtExchange(self._exchange_id, config)
+        exchange = CcxtExchange(self._exchange_id, config, self._order_state_max_age)
         return exchange
 
-    async def acquire(self) -> CcxtExchange:
+    @property
+    def exchanges(self) -> list[CcxtExchange]:
+        """
+        Все экземпляры exchange пула
+        """
+        return [account.exchange for account in self._accounts]
+
+    async def acquire(self, account: Optional[int] = None) -> CcxtExchange:
+        """
+        Получить exchange наименее загруженного или указанного аккаунта
+
+        :param account: Номер аккаунта, за которым закреплена операция
+        """
+        selected = await self._select(account, 0)
+        selected.release()
+        return selected.exchange
+
+    @asynccontextmanager
+    async def request(
+        self,
+        account: Optional[int] = None,
+        orders: int = 0,
+        urgent: bool = False,
+        priority: int = 0,
+    ):
+        """
+        Выполнить запрос через наименее загруженный или указанный аккаунт,
+        учитывая его в нагрузке и ошибках аккаунта
+
+        :param account: Номер аккаунта, за которым закреплена операция
+        :param orders: Сколько ордеров создаёт запрос
+        :param urgent: Не выдерживать задержку после предыдущего запроса
+            аккаунта. Лимиты веса и бан по 429/418 соблюдаются всегда
+        :param priority: Приоритет в очереди за аккаунтом. Меньшее значение
+            важнее
+        """
+        selected = await self._select(account, orders, urgent, priority)
+        try:
+            yield selected
+        except NetworkError:
+            selected.errors += 1
+            raise
+        else:
+            selected.errors /= 2
+        finally:
+            selected.release()
+
+    async def _select(
+        self,
+        account: Optional[int],
+        orders: int,
+        urgent: bool = False,
+        priority: int = 0,
+    ) -> PrivateAccount:
+        if account is not None and 0 <= account < len(self._accounts):
+            candidates = [self._accounts[account]]
+        else:
+            candidates = self._accounts
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = AccountWaiter(
+            priority, next(self._counter), candidates, orders, urgent, future
+        )
+        self._waiters.append(waiter)
+        self._dispatch()
+        if future.done():
+            return future.result()
+
+        start = monotonic()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Аккаунт уже выделен, но запрос отменён до начала
+            if future.done() and not future.cancelled():
+                future.result().release()
+            raise
+        finally:
+            self.waits += 1
+            self.wait_time += monotonic() - start
+
+    def _dispatch(self) -> None:
+        """
+        Выделить готовые аккаунты ожидающим запросам в порядке приоритета
+        и запланировать следующую проверку
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        waiters = sorted(
+            (w for w in self._waiters if not w.future.done()),
+            key=lambda w: (w.priority, w.counter),
+        )
+        self._waiters = []
+        for waiter in waiters:
+            ready = [
+                a
+                for a in waiter.candidates
+                if not a.get_wait_time(waiter.orders, waiter.urgent)
+            ]
+            if ready:
+                selected = min(ready, key=PrivateAccount.get_load)
+                selected.reserve(waiter.orders)
+                waiter.future.set_result(selected)
+            else:
+                self._waiters.append(waiter)
+
+        if self._waiters:
+            wait_time = min(waiter.get_wait_time() for waiter in self._waiters)
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(wait_time, self._dispatch)
+
+    def usage(self) -> dict[str, RateLimitStats]:
         """
-        Получить очередной экземпляр exchange
+        Использование лимитов по аккаунтам в порядке конфигурации
         """
-        acquired_exchange = self._queue.get()
-        self._queue.put(acquired_exchange)
-        return acquired_exchange.exchange
+        return {
+            str(account.index): account.exchange.usage.to_dict()
+            for account in self._accounts
+        }
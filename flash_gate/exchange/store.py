@@ -0,0 +1,95 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Iterable, Optional
+from flash_gate.cache.index import TERMINAL_STATUSES
+from .types import Order
+
+# Сколько секунд последнее известное состояние открытого ордера считается
+# актуальным
+DEFAULT_ORDER_STATE_MAX_AGE_S = 1
+DEFAULT_ORDER_STATE_LIMIT = 10000
+
+
+class OrderStore:
+    """
+    Последнее известное состояние ордеров аккаунта по идентификатору биржи
+
+    Состояние обновляется по ответам на создание и отмену ордеров, по спискам
+    открытых ордеров, запросам отдельных ордеров и потоку пользовательских
+    данных. Ордер в конечном статусе больше не меняется, поэтому его
+    состояние не устаревает. Состояние открытого ордера актуально max_age
+    секунд. Хранится не больше limit ордеров, давно обновлённые вытесняются
+    первыми.
+    """
+
+    def __init__(
+        self,
+        max_age: float = DEFAULT_ORDER_STATE_MAX_AGE_S,
+        limit: int = DEFAULT_ORDER_STATE_LIMIT,
+    ):
+        self.max_age = max_age
+        self.limit = limit
+        self._orders: OrderedDict[str, tuple[float, Order]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def put(self, order: Order) -> None:
+        """
+        Сохранить состояние ордера
+
+        Ответ, отправленный раньше, может прийти позже и вернуть ордер
+        в открытый статус, поэтому конечный статус не перезаписывается
+        """
+        if saved := self._orders.get(order["id"]):
+            _, saved_order = saved
+            if (
+                saved_order["status"] in TERMINAL_STATUSES
+                and order["status"] not in TERMINAL_STATUSES
+            ):
+                return
+
+        self._orders[order["id"]] = (monotonic(), order.copy())
+        self._orders.move_to_end(order["id"])
+        while len(self._orders) > self.limit:
+            self._orders.popitem(last=False)
+
+    def get(self, order_id: str) -> Optional[Order]:
+        """
+        Получить состояние ордера, если оно актуально
+        """
+        if not (saved := self._orders.get(order_id)):
+            return None
+
+        updated_at, order = saved
+        if order["status"] in TERMINAL_STATUSES:
+            return order.copy()
+        if monotonic() - updated_at <= self.max_age:
+            return order.copy()
+        return None
+
+    def discard(self, order_id: str) -> None:
+        self._orders.pop(order_id, None)
+
+    def sync_open_orders(self, symbols: Iterable[str], orders: list[Order]) -> None:
+        """
+        Обновить состояние по полному списку открытых ордеров тикеров
+
+        Ордера, которые считались открытыми, но пропали из списка, закрыты
+        или отменены. Их итоговый статус неизвестен, поэтому состояние
+        удаляется и будет запрошено заново.
+        """
+        symbols = set(symbols)
+        open_order_ids = {order["id"] for order in orders}
+        missing = [
+            order_id
+            for order_id, (_, order) in self._orders.items()
+            if order["symbol"] in symbols
+            and order["status"] not in TERMINAL_STATUSES
+            and order_id not in open_order_ids
+        ]
+        for order_id in missing:
+            del self._orders[order_id]
+
+        for order in orders:
+            self.put(order)
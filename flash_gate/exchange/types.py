@@ -8,6 +8,13 @@ class OrderBook(TypedDict):
     timestamp: Optional[int]
 
 
+class OrderBookSnapshot(TypedDict):
+    bids: list
+    asks: list
+    symbol: str
+    nonce: int
+
+
 class Balance(TypedDict):
     assets: dict
     timestamp: Optional[int]
@@ -38,3 +45,9 @@ class CreateOrderParams(TypedDict):
     side: str
     amount: float
     price: float
+
+
+class RateLimitStats(TypedDict):
+    used_weight: dict[str, int]
+    order_count: dict[str, int]
+    retry_after: float
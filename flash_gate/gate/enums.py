@@ -0,0 +1,49 @@
+from enum import Enum, IntEnum
+
+
+class OrderStatusMethod(str, Enum):
+    """
+    Способ отслеживания статусов открытых ордеров
+    """
+
+    # Отдельный запрос на каждый ордер
+    PER_ORDER = "per_order"
+    # Один запрос открытых ордеров на тикер и сверка с отслеживаемыми
+    RECONCILE = "reconcile"
+
+
+class DataCollectionMethod(str, Enum):
+    """
+    Способ получения данных с биржи
+    """
+
+    REST = "rest"
+    WEBSOCKET = "websocket"
+    # Локальный стакан, синхронизируемый с потоком изменений глубины
+    LOCAL = "local"
+
+
+class RequestPriority(IntEnum):
+    """
+    Класс приоритета запроса к приватному API. Меньшее значение важнее
+    """
+
+    CANCEL = 0
+    CREATE = 1
+    # Команды ядра на получение ордеров и баланса
+    QUERY = 2
+    # Периодический опрос баланса и статусов ордеров
+    POLLING = 3
+
+
+class PrivateAction(str, Enum):
+    """
+    Запрос к приватному API, по которому считается задержка
+    """
+
+    CREATE_ORDER = "create_order"
+    CANCEL_ORDER = "cancel_order"
+    CANCEL_ALL_ORDERS = "cancel_all_orders"
+    FETCH_ORDER = "fetch_order"
+    FETCH_OPEN_ORDERS = "fetch_open_orders"
+    FETCH_BALANCE = "fetch_balance"
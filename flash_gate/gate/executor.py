@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class OrderExecutor:
+    """
+    Параллельное выполнение операций над ордерами
+
+    Операции с одним ключом (client_order_id) выполняются строго в порядке
+    вызова run, операции с разными ключами — параллельно. Количество
+    одновременных запросов к одному аккаунту ограничивается через slot.
+    """
+
+    def __init__(self, max_in_flight_per_account: int):
+        self.max_in_flight_per_account = max_in_flight_per_account
+        self._tails: dict[Hashable, asyncio.Future] = {}
+        self._slots: dict[int, asyncio.Semaphore] = {}
+
+    async def run(
+        self, key: Hashable, func: Callable[..., Awaitable], *args: Any
+    ) -> Any:
+        """
+        Выполнить операцию после завершения предыдущих операций с тем же ключом
+
+        :param key: Ключ упорядочивания
+        :param func: Корутинная функция
+        :param args: Аргументы функции
+        """
+        previous = self._tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[key] = done
+
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            return await func(*args)
+        finally:
+            # Если ожидание прервано отменой, очередь продвигается только
+            # после завершения предыдущей операции
+            if previous is None or previous.done():
+                self._release(key, done)
+            else:
+                previous.add_done_callback(lambda _: self._release(key, done))
+
+    def _release(self, key: Hashable, done: asyncio.Future) -> None:
+        done.set_result(None)
+        if self._tails.get(key) is done:
+            del self._tails[key]
+
+    @asynccontextmanager
+    async def slot(self, account: object):
+        """
+        Занять место в лимите одновременных запросов аккаунта
+
+        :param account: Экземпляр биржи, через который отправляется запрос
+        """
+        semaphore = self._slots.get(id(account))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_in_flight_per_account)
+            self._slots[id(account)] = semaphore
+
+        async with semaphore:
+            yield
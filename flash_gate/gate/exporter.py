@@ -0,0 +1,185 @@
+import asyncio
+import logging
+from typing import Callable, Iterable, NoReturn, Optional
+from aiohttp import web
+from .statistics import LatencyHistogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRICS_PATH = "/metrics"
+DEFAULT_EXPORTER_HOST = "127.0.0.1"
+DEFAULT_EXPORTER_PORT = 9108
+METRIC_PREFIX = "flash_gate_"
+# Пауза перед повторным запуском сервера, который не удалось запустить
+START_RETRY_DELAY_S = 30
+
+# Границы корзин экспортируемых гистограмм задержек в секундах
+LATENCY_BUCKETS_S = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+LATENCY_BUCKETS_US = [int(bound * 1_000_000) for bound in LATENCY_BUCKETS_S]
+
+Labels = dict[str, str]
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape_label_value(str(value))}"' for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+class OpenMetricsWriter:
+    """
+    Сборка текста в формате OpenMetrics
+
+    Вызывается только при запросе метрик, поэтому на горячем пути шлюза
+    ничего не создаётся: там обновляются только счётчики и гистограммы.
+    """
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._lines: list[str] = []
+
+    def counter(
+        self, name: str, description: str, samples: Iterable[tuple[Labels, float]]
+    ) -> None:
+        name = self._describe(name, "counter", description)
+        for labels, value in samples:
+            self._lines.append(f"{name}_total{format_labels(labels)} {value}")
+
+    def gauge(
+        self, name: str, description: str, samples: Iterable[tuple[Labels, float]]
+    ) -> None:
+        name = self._describe(name, "gauge", description)
+        for labels, value in samples:
+            self._lines.append(f"{name}{format_labels(labels)} {value}")
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        samples: Iterable[tuple[Labels, LatencyHistogram]],
+    ) -> None:
+        """
+        Гистограмма задержек. Значения переводятся из микросекунд в секунды
+        """
+        name = self._describe(name, "histogram", description)
+        for labels, histogram in samples:
+            counts = histogram.get_cumulative_counts(LATENCY_BUCKETS_US)
+            for bound, count in zip(LATENCY_BUCKETS_S, counts):
+                bucket_labels = format_labels(labels | {"le": str(bound)})
+                self._lines.append(f"{name}_bucket{bucket_labels} {count}")
+
+            inf_labels = format_labels(labels | {"le": "+Inf"})
+            self._lines.append(f"{name}_bucket{inf_labels} {histogram.count}")
+            self._lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            self._lines.append(
+                f"{name}_sum{format_labels(labels)} {histogram.sum / 1_000_000}"
+            )
+
+    def _describe(self, name: str, metric_type: str, description: str) -> str:
+        name = self.prefix + name
+        self._lines.append(f"# TYPE {name} {metric_type}")
+        self._lines.append(f"# HELP {name} {description}")
+        return name
+
+    def text(self) -> str:
+        self._lines.append("# EOF")
+        return "\n".join(self._lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    HTTP-сервер, отдающий метрики шлюза в формате OpenMetrics для Prometheus
+
+    Ошибка запуска сервера, например занятый порт, не останавливает шлюз:
+    она записывается в лог, и запуск повторяется через retry_delay
+    """
+
+    def __init__(
+        self,
+        collect: Callable[[OpenMetricsWriter], None],
+        host: str = DEFAULT_EXPORTER_HOST,
+        port: int = DEFAULT_EXPORTER_PORT,
+        retry_delay: float = START_RETRY_DELAY_S,
+    ):
+        """
+        :param collect: Функция, записывающая метрики шлюза
+        :param host: Адрес, на котором принимаются запросы
+        :param port: Порт
+        :param retry_delay: Пауза перед повторным запуском после ошибки
+        """
+        self.logger = logging.getLogger(__name__)
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self.retry_delay = retry_delay
+        self._runner: Optional[web.AppRunner] = None
+
+    def render(self) -> str:
+        writer = OpenMetricsWriter()
+        self.collect(writer)
+        return writer.text()
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            body=self.render().encode(), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    async def run(self) -> NoReturn:
+        try:
+            while not await self.start():
+                await asyncio.sleep(self.retry_delay)
+            await asyncio.Future()
+        finally:
+            await self.close()
+
+    async def start(self) -> bool:
+        """
+        Запустить сервер
+
+        :return: False, если сервер не удалось запустить
+        """
+        app = web.Application()
+        app.router.add_get(METRICS_PATH, self.handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        try:
+            await self._runner.setup()
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+        except Exception as e:
+            self.logger.error(
+                "Metrics exporter failed to start on %s:%s: %s", self.host, self.port, e
+            )
+            await self.close()
+            return False
+
+        self.logger.info("Metrics exporter listening on %s:%s", self.host, self.port)
+        return True
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
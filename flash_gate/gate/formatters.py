@@ -1,6 +1,8 @@
+from typing import Optional
 from uuid import uuid4
 from flash_gate.transmitter.enums import EventAction
-from .typing import LatencyPercentile, Metrics
+from flash_gate.transmitter.types import QueueStats
+from .typing import EventLoopMetrics, LatencyPercentile, Metrics, RateLimitMetrics
 
 
 class EventFormatter:
@@ -14,18 +16,43 @@ class EventFormatter:
 
     @staticmethod
     def metrics_data(
-        orderbook_latency_percentile: LatencyPercentile,
+        *,
+        orderbook_latency_percentile: Optional[LatencyPercentile],
+        orderbook_latency_by_ip: dict[str, LatencyPercentile],
         orderbook_rps: int,
         private_api_total_rps: int,
+        private_api_latency_by_action: dict[str, LatencyPercentile],
+        private_api_latency_by_account: dict[str, LatencyPercentile],
+        command_backlog: int,
+        shed_requests: int,
+        transmitter: dict[str, QueueStats],
+        command_latency_percentile: Optional[LatencyPercentile],
+        commands: int,
+        response_latency_percentile: Optional[LatencyPercentile],
+        rate_limits: RateLimitMetrics,
+        event_loop: EventLoopMetrics,
     ) -> Metrics:
         return {
             "public_api": {
                 "orderbook": {
                     "latency_percentile": orderbook_latency_percentile,
                     "rps": orderbook_rps,
-                }
+                },
+                "latency_percentile_by_ip": orderbook_latency_by_ip,
             },
             "private_api": {
                 "total_rps": private_api_total_rps,
+                "command_backlog": command_backlog,
+                "shed_requests": shed_requests,
+                "latency_percentile_by_action": private_api_latency_by_action,
+                "latency_percentile_by_account": private_api_latency_by_account,
             },
+            "core_api": {
+                "receive_latency_percentile": command_latency_percentile,
+                "commands": commands,
+                "response_latency_percentile": response_latency_percentile,
+            },
+            "transmitter": transmitter,
+            "rate_limits": rate_limits,
+            "event_loop": event_loop,
         }
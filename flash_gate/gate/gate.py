@@ -1,21 +1,109 @@
 import asyncio
+import itertools
 import json
 import logging
+import random
 import uuid
-from asyncio import ALL_COMPLETED
-from time import monotonic_ns
-from typing import NoReturn, Coroutine
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from time import monotonic_ns, time_ns
+from typing import Hashable, NoReturn, Coroutine, Optional
 import ccxt.base.errors
+from flash_gate.cache.index import OrderIndex
 from flash_gate.cache.memcached import Memcached
 from flash_gate.exchange import CcxtExchange, ExchangePool
+from flash_gate.exchange.limits import (
+    ORDER_LIMITS,
+    WEIGHT_LIMIT_PER_MINUTE,
+    get_order_book_weight,
+    get_request_weight,
+)
+from flash_gate.exchange.types import Balance, Order, OrderBook, OrderBookSnapshot
 from flash_gate.exchange.pool import PrivateExchangePool
+from flash_gate.orderbook import DepthStream
+from flash_gate.orderbook.stream import SANDBOX_STREAM_URL, STREAM_URL
+from flash_gate.tracing import (
+    CommandTrace,
+    TraceStage,
+    branch,
+    current_trace,
+    fragment_received_at,
+    mark,
+)
 from flash_gate.transmitter import AeronTransmitter
 from flash_gate.transmitter.enums import EventAction, Destination
 from flash_gate.transmitter.types import Event, EventNode, EventType
+from .enums import (
+    DataCollectionMethod,
+    OrderStatusMethod,
+    PrivateAction,
+    RequestPriority,
+)
+from .executor import OrderExecutor
+from .exporter import MetricsExporter, OpenMetricsWriter
+from .monitor import LoopLagMonitor, SlowCallback, SlowCallbackTracer
 from .formatters import EventFormatter
+from .orderbooks import OrderBookCache
 from .parsers import ConfigParser
-from .statistics import latency_percentile, ns_to_us
-from .typing import Metrics
+from .scheduler import PrivateRequestScheduler, RequestShed
+from .statistics import (
+    LatencyHistogram,
+    latency_percentile,
+    latency_percentiles,
+    ns_to_us,
+)
+from .typing import EventLoopMetrics, Metrics, RateLimitMetrics
+
+# Пауза перед переподключением WebSocket-потока стакана
+RECONNECT_DELAY_S = 1
+# Сколько обновлений ордеров, пришедших раньше ответа на создание, хранится
+UNTRACKED_UPDATES_LIMIT = 1000
+
+# Гистограммы задержек, экспортируемые в формате OpenMetrics: имя, описание
+# и метка, по которой различаются гистограммы семейства
+LATENCY_METRICS = {
+    "orderbook": (
+        "orderbook_latency_seconds",
+        "Order book request latency or age of streamed order books",
+        None,
+    ),
+    "orderbook_request": (
+        "orderbook_request_latency_seconds",
+        "Order book request latency by local IP",
+        "ip",
+    ),
+    "private_request": (
+        "private_request_latency_seconds",
+        "Private API request latency by action",
+        "action",
+    ),
+    "private_account_request": (
+        "private_account_request_latency_seconds",
+        "Private API request latency by account",
+        "account",
+    ),
+    "command_receive": (
+        "command_receive_latency_seconds",
+        "Delay between core command timestamp and its receipt",
+        None,
+    ),
+    "command_response": (
+        "command_response_latency_seconds",
+        "Time from receiving a core command to offering its response",
+        None,
+    ),
+    "event_loop_lag": (
+        "event_loop_lag_seconds",
+        "Event loop wake-up delay of the lag sampler",
+        None,
+    ),
+}
+
+# Время получения команды ядра, которую выполняет текущая задача
+command_received_at: ContextVar[Optional[int]] = ContextVar(
+    "command_received_at", default=None
+)
 
 logger = logging.getLogger(__name__)
 lock = asyncio.Lock()
@@ -29,82 +117,238 @@ class Gate:
     def __init__(self, config: dict):
         config_parser = ConfigParser(config)
         exchange_id = config_parser.exchange_id
-        exchange_config = config_parser.exchange_config
 
-        self.event_id_by_client_order_id = Memcached(key_prefix="event_id")
-        self.order_id_by_client_order_id = Memcached(key_prefix="order_id")
-        self.transmitter = AeronTransmitter(self.handler, config)
-
-        self._exchange = (
-            CcxtExchange(exchange_id, exchange_config)
-            if config_parser.accounts is None
-            else None
+        self.memcached = (
+            Memcached(key_prefix="order") if config_parser.memcached else None
         )
-        self._private_exchange_pool = (
-            PrivateExchangePool(
-                exchange_id=exchange_id,
-                config=exchange_config,
-                accounts=config_parser.accounts,
-            )
-            if config_parser.accounts is not None
-            else None
+        self.order_index = OrderIndex(
+            self.memcached,
+            config_parser.terminal_order_ttl,
+            config_parser.terminal_orders_limit,
         )
+        self.transmitter = AeronTransmitter(self.handler, config)
+
+        self._private_exchange_pool = self.create_private_exchange_pool(config_parser)
 
         self.exchange_pool = ExchangePool(
             exchange_id,
             config_parser.public_config,
             config_parser.public_ip,
-            config_parser.public_delay,
+            config_parser.public_weight_limit,
         )
 
         self.tickers = config_parser.tickers
         self.assets = config_parser.assets
         self.open_orders = set()
+        # Обновления из потока пользовательских данных для ордеров, ответ
+        # на создание которых ещё не получен
+        self.untracked_updates: OrderedDict[str, Order] = OrderedDict()
+
+        self.order_executor = OrderExecutor(config_parser.max_in_flight_orders)
+        self.private_scheduler = PrivateRequestScheduler(
+            config_parser.max_private_requests, config_parser.max_command_backlog
+        )
 
         self.balance_delay = config_parser.balance_delay
         self.orders_delay = config_parser.order_status_delay
+        self.order_status_method = config_parser.order_status_method
+        self.orders_method = config_parser.orders_method
+        self.balance_method = config_parser.balance_method
+        self.consistency_check_delay = config_parser.consistency_check_delay
+        self.order_book_method = config_parser.order_book_method
+        self.order_book_limit = config_parser.order_book_limit
+        self.local_order_book_depth = config_parser.local_order_book_depth
+        self.depth_stream = (
+            DepthStream(
+                self.tickers,
+                self.fetch_orderbook_snapshot,
+                self.offer_local_orderbook,
+                self.order_book_limit,
+                SANDBOX_STREAM_URL if config_parser.sandbox_mode else STREAM_URL,
+            )
+            if self.order_book_method == DataCollectionMethod.LOCAL
+            else None
+        )
+        self.orderbook_cache = OrderBookCache(
+            config_parser.skip_unchanged_order_books,
+            config_parser.order_book_deltas,
+            config_parser.order_book_snapshot_interval,
+        )
 
         # Метрики
-        self.orderbook_latencies = []
+        self.orderbook_latencies = LatencyHistogram()
         self.orderbook_rps = 0
         self.private_api_total_rps = 0
+        self.command_latencies = LatencyHistogram()
+        self.response_latencies = LatencyHistogram()
+        self.orderbook_latencies_by_ip = defaultdict(LatencyHistogram)
+        self.private_latencies_by_action = defaultdict(LatencyHistogram)
+        self.private_latencies_by_account = defaultdict(LatencyHistogram)
+        self.loop_monitor = LoopLagMonitor(config_parser.loop_lag_interval)
+        threshold = config_parser.slow_callback_threshold
+        self.slow_callback_tracer = (
+            SlowCallbackTracer(threshold, self.offer_slow_callback)
+            if threshold is not None
+            else None
+        )
+        self.trace_sample_rate = config_parser.trace_sample_rate
+        # Гистограммы с момента запуска, в которые переносятся интервальные
+        self.latency_totals = defaultdict(lambda: defaultdict(LatencyHistogram))
+
+        exporter_config = config_parser.metrics_exporter
+        self.metrics_exporter = (
+            MetricsExporter(self.collect_openmetrics, **exporter_config)
+            if exporter_config is not None
+            else None
+        )
 
         # Strong references to tasks
         self.background_tasks = set()
 
-        # References to tasks that are considered priority. Periodic data
-        # will not be requested if the list of priority tasks is not empty
-        self.priority_tasks = set()
-
     async def run(self) -> NoReturn:
         tasks = self.get_periodical_tasks()
         await asyncio.gather(*tasks)
 
+    @staticmethod
+    def create_private_exchange_pool(
+        config_parser: ConfigParser,
+    ) -> PrivateExchangePool:
+        """
+        Создать пул аккаунтов. Без мульти-аккаунтов пул состоит из одного
+        аккаунта с ключами из конфигурации биржи
+        """
+        return PrivateExchangePool(
+            exchange_id=config_parser.exchange_id,
+            config=config_parser.exchange_config,
+            accounts=config_parser.accounts or [{}],
+            delay=config_parser.private_delay,
+            order_state_max_age=config_parser.order_state_max_age,
+        )
+
     def get_periodical_tasks(self) -> list[Coroutine]:
-        return [
+        tasks = [
             self.transmitter.run(),
             self.watch_orderbooks(),
             self.watch_balance(),
             self.watch_orders(),
             self.metrics(),
+            self.loop_monitor.run(),
         ]
+        if self.slow_callback_tracer is not None:
+            tasks.append(self.slow_callback_tracer.run())
+        if self.memcached is not None:
+            tasks.append(self.memcached.run())
+        if self.metrics_exporter is not None:
+            tasks.append(self.metrics_exporter.run())
+        return tasks
 
     def handler(self, message: str):
+        received_at = monotonic_ns()
+        trace = self.sample_trace()
         logger.debug("Message: %s", message)
         event = self.deserialize_message(message)
-        self.create_task(event)
+        if trace is not None:
+            trace.mark(TraceStage.DESERIALIZED)
+        self.save_command_metric(event)
+        self.create_task(event, received_at, trace)
+
+    def sample_trace(self) -> Optional[CommandTrace]:
+        """
+        Начать трассу команды, если она попала в выборку. Отсчёт идёт от чтения
+        фрагмента подписчиком, если он известен
+        """
+        if random.random() >= self.trace_sample_rate:
+            return None
+        return CommandTrace(fragment_received_at.get(), self.offer_command_trace)
 
-    async def get_exchange(self):
+    def save_command_metric(self, event: Event) -> None:
         """
-        Получить экземпляр биржи
+        Сохранить задержку получения команды: от отметки времени ядра до обработчика
+        """
+        if event and (timestamp := event.get("timestamp")):
+            latency = time_ns() // 1_000 - timestamp
+            self.command_latencies.record(latency)
 
-        Возваращет очередной экземпляр из пула или один и тот же экземлпяр, если мульти-аккаунты не используются.
-        Позволяет работать с пулом таким образом, как если бы это был атрибут класса.
+    def offer(self, event: Event, *destinations: Destination) -> None:
+        """
+        Отправить событие. Если это ответ на команду ядра, сохраняется задержка
+        от получения команды до отправки ответа
         """
-        self.private_api_total_rps += 1
-        if self._private_exchange_pool is not None:
-            return await self._private_exchange_pool.acquire()
-        return self._exchange
+        received_at = command_received_at.get()
+        is_response = destinations != (Destination.LOGS,)
+        if received_at is not None and is_response:
+            self.response_latencies.record(ns_to_us(monotonic_ns() - received_at))
+        self.transmitter.offer(event, *destinations)
+
+        if is_response and (trace := current_trace.get()) is not None:
+            trace.respond(event.get("event_id"), event.get("action"))
+
+    def offer_command_trace(self, trace: CommandTrace) -> None:
+        """
+        Отправить в логи трассу завершённой ветви команды с идентификатором
+        её ответа
+        """
+        event: Event = {
+            "event_id": trace.event_id,
+            "action": EventAction.COMMAND_TRACE,
+            "data": trace.to_dict(),
+        }
+        self.transmitter.offer(event, Destination.LOGS)
+
+    @asynccontextmanager
+    async def private_request(
+        self,
+        priority: RequestPriority,
+        action: PrivateAction,
+        account: Optional[int] = None,
+        orders: int = 0,
+        urgent: bool = False,
+        order_slot: bool = False,
+    ):
+        """
+        Выполнить запрос к приватному API через планировщик и пул аккаунтов
+
+        Задержка запроса считается после всех ожиданий и не включает время
+        в очередях шлюза
+
+        :param priority: Класс приоритета запроса
+        :param action: Запрос, по которому считается задержка
+        :param account: Номер аккаунта, если операция закреплена за ним
+        :param orders: Сколько ордеров создаёт запрос
+        :param urgent: Не выдерживать задержку между запросами аккаунта
+        :param order_slot: Занять место в лимите одновременных операций
+            над ордерами аккаунта
+        :raises RequestShed: Запрос опроса отброшен из-за очереди команд
+        """
+        mark(TraceStage.REQUEST_QUEUED)
+        async with self.private_scheduler.slot(priority):
+            mark(TraceStage.REQUEST_SCHEDULED)
+            async with self._private_exchange_pool.request(
+                account, orders, urgent, priority
+            ) as selected:
+                mark(TraceStage.ACCOUNT_ACQUIRED)
+                slot = (
+                    self.order_executor.slot(selected.exchange)
+                    if order_slot
+                    else nullcontext()
+                )
+                async with slot:
+                    self.private_api_total_rps += 1
+                    start = monotonic_ns()
+                    try:
+                        yield selected
+                    finally:
+                        latency = ns_to_us(monotonic_ns() - start)
+                        self.private_latencies_by_action[action.value].record(latency)
+                        self.private_latencies_by_account[selected.index].record(
+                            latency
+                        )
+
+    def get_private_exchanges(self) -> list[CcxtExchange]:
+        """
+        Получить все экземпляры биржи с приватным соединением
+        """
+        return self._private_exchange_pool.exchanges
 
     def deserialize_message(self, message: str) -> Event:
         try:
@@ -117,21 +361,21 @@ class Gate:
     def log(self, event: Event):
         event = event.copy()
         event["node"] = EventNode.GATE
-        self.transmitter.offer(event, Destination.LOGS)
-
-    def create_task(self, event: Event):
-        priority_task = False
-
+        self.offer(event, Destination.LOGS)
+
+    def create_task(
+        self,
+        event: Event,
+        received_at: Optional[int] = None,
+        trace: Optional[CommandTrace] = None,
+    ):
         match event.get("action"):
             case EventAction.CREATE_ORDERS:
-                priority_task = True
                 action = self.create_orders(event)
             case EventAction.CANCEL_ORDERS:
-                priority_task = True
                 action = self.cancel_orders(event)
             case EventAction.CANCEL_ALL_ORDERS:
-                priority_task = True
-                action = self.cancel_all_orders()
+                action = self.cancel_all_orders(event)
             case EventAction.GET_ORDERS:
                 action = self.get_orders(event)
             case EventAction.GET_BALANCE:
@@ -140,44 +384,142 @@ class Gate:
                 logger.error("Unsupported action: %s", event.get("action"))
                 action = asyncio.create_task(asyncio.sleep(0))
 
-        task = asyncio.create_task(action)
+        task = asyncio.create_task(self.run_command(action, received_at, trace))
+        if trace is not None:
+            trace.mark(TraceStage.TASK_CREATED)
 
         # Save reference to result, to avoid task disappearing
         self.background_tasks.add(task)
         task.add_done_callback(self.background_tasks.discard)
 
-        if priority_task:
-            self.priority_tasks.add(task)
-            task.add_done_callback(self.priority_tasks.discard)
+    @staticmethod
+    async def run_command(
+        action: Coroutine,
+        received_at: Optional[int],
+        trace: Optional[CommandTrace] = None,
+    ):
+        """
+        Выполнить команду ядра. Время получения команды доступно всем
+        её запросам и ответам через command_received_at, трасса — через
+        current_trace
+        """
+        command_received_at.set(received_at)
+        current_trace.set(trace)
+        mark(TraceStage.TASK_STARTED)
+        try:
+            await action
+        finally:
+            if trace is not None:
+                trace.finish()
 
     async def create_orders(self, event: Event):
-        for param in event.get("data", []):
-            await self.create_order(param, event.get("event_id"))
+        event_id = event.get("event_id")
+        await asyncio.gather(
+            *(
+                self.order_executor.run(
+                    param.get("client_order_id"), self.create_order, param, event_id
+                )
+                for param in event.get("data", [])
+            )
+        )
 
     async def get_orders(self, event: Event):
         for param in event.get("data", []):
             await self.get_order(param)
 
     async def cancel_orders(self, event: Event):
-        for param in event.get("data", []):
-            await self.cancel_order(param)
+        await asyncio.gather(
+            *(
+                self.order_executor.run(
+                    param.get("client_order_id"), self.cancel_order, param
+                )
+                for param in event.get("data", [])
+            )
+        )
+
+    async def cancel_all_orders(self, event: Event):
+        """
+        Отменить все открытые ордера на всех аккаунтах
+
+        По каждому аккаунту и тикеру отправляется один запрос отмены всех
+        открытых ордеров, все запросы — одновременно и без задержки между
+        запросами аккаунта. Отменённые ордера отправляются ядру одним событием,
+        ошибки — отдельно по каждому тикеру.
+        """
+        groups = await asyncio.gather(
+            *(
+                self.cancel_symbol_orders(account, symbol, event.get("event_id"))
+                for account in range(len(self.get_private_exchanges()))
+                for symbol in self.tickers
+            )
+        )
+
+        orders = list(itertools.chain.from_iterable(groups))
+        for order in orders:
+            if record := self.order_index.get_by_order_id(order["id"]):
+                order["client_order_id"] = record.client_order_id
+                self.open_orders.discard((record.client_order_id, order["symbol"]))
+                self.order_index.update(
+                    record.client_order_id, order["status"], order["filled"]
+                )
+
+        result_event: Event = {
+            "event_id": event.get("event_id"),
+            "action": EventAction.CANCEL_ALL_ORDERS,
+            "data": orders,
+        }
+        self.offer(result_event, Destination.CORE, Destination.LOGS)
+
+    async def cancel_symbol_orders(
+        self, account: int, symbol: str, event_id: Optional[str]
+    ) -> list[Order]:
+        """
+        Отменить открытые ордера тикера на аккаунте
 
-    async def cancel_all_orders(self):
+        :return: Отменённые ордера, при ошибке — пустой список
+        """
         try:
-            exchange = await self.get_exchange()
-            await exchange.cancel_all_orders(self.tickers)
+            async with self.private_request(
+                RequestPriority.CANCEL,
+                PrivateAction.CANCEL_ALL_ORDERS,
+                account,
+                urgent=True,
+            ) as selected:
+                return await selected.exchange.cancel_symbol_orders(symbol)
 
         except Exception as e:
-            logger.exception(e)
+            message = self.describe_exception(e)
+            log_event: Event = {
+                "event_id": event_id,
+                "event": EventType.ERROR,
+                "action": EventAction.CANCEL_ALL_ORDERS,
+                "message": message,
+                "data": [{"symbol": symbol}],
+            }
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
+            return []
 
+    @branch
     async def create_order(self, param: dict, event_id: str):
         try:
-            exchange = await self.get_exchange()
-            order = await exchange.create_order(param)
+            async with self.private_request(
+                RequestPriority.CREATE,
+                PrivateAction.CREATE_ORDER,
+                orders=1,
+                order_slot=True,
+            ) as account:
+                order = await account.exchange.create_order(param)
 
             order["client_order_id"] = param["client_order_id"]
-            self.event_id_by_client_order_id.set(order["client_order_id"], event_id)
-            self.order_id_by_client_order_id.set(order["client_order_id"], order["id"])
+            self.order_index.add(
+                order["client_order_id"],
+                order["id"],
+                event_id,
+                order["symbol"],
+                order["status"],
+                order["filled"],
+                account.index,
+            )
             self.open_orders.add((order["client_order_id"], order["symbol"]))
 
             event: Event = {
@@ -185,8 +527,10 @@ class Gate:
                 "action": EventAction.CREATE_ORDERS,
                 "data": [order],
             }
-            self.transmitter.offer(event, Destination.CORE)
-            self.transmitter.offer(event, Destination.LOGS)
+            self.offer(event, Destination.CORE, Destination.LOGS)
+
+            if update := self.untracked_updates.pop(order["id"], None):
+                self.on_order_update(update)
 
         except Exception as e:
             message = self.describe_exception(e)
@@ -197,22 +541,27 @@ class Gate:
                 "message": message,
                 "data": [param],
             }
-            self.transmitter.offer(log_event, Destination.CORE)
-            self.transmitter.offer(log_event, Destination.LOGS)
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
 
+    @branch
     async def cancel_order(self, param: dict):
-        order_id = self.order_id_by_client_order_id.get(param["client_order_id"])
+        record = await self.order_index.recover(param["client_order_id"])
+        order_id = record.order_id if record else None
         symbol = param["symbol"]
 
         try:
-            exchange = await self.get_exchange()
-            await exchange.cancel_order({"id": order_id, "symbol": symbol})
+            async with self.private_request(
+                RequestPriority.CANCEL,
+                PrivateAction.CANCEL_ORDER,
+                record.account if record else None,
+                order_slot=True,
+            ) as account:
+                await account.exchange.cancel_order({"id": order_id, "symbol": symbol})
 
         except ccxt.base.errors.OrderNotFound as e:
+            self.order_index.set_status(param["client_order_id"], "canceled")
             event: Event = {
-                "event_id": self.event_id_by_client_order_id.get(
-                    param["client_order_id"]
-                ),
+                "event_id": record.event_id if record else None,
                 "action": EventAction.ORDERS_UPDATE,
                 "data": [
                     {
@@ -229,8 +578,7 @@ class Gate:
                     }
                 ],
             }
-            self.transmitter.offer(event, Destination.CORE)
-            self.transmitter.offer(event, Destination.LOGS)
+            self.offer(event, Destination.CORE, Destination.LOGS)
 
             logger.exception(e)
             log_event: Event = {
@@ -240,8 +588,7 @@ class Gate:
                 "message": str(e),
                 "data": [param],
             }
-            self.transmitter.offer(log_event, Destination.CORE)
-            self.transmitter.offer(log_event, Destination.LOGS)
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
 
         except Exception as e:
             message = self.describe_exception(e)
@@ -252,28 +599,35 @@ class Gate:
                 "message": message,
                 "data": [param],
             }
-            self.transmitter.offer(log_event, Destination.CORE)
-            self.transmitter.offer(log_event, Destination.LOGS)
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
 
+    @branch
     async def get_order(self, param: dict):
         try:
-            order_id = self.order_id_by_client_order_id.get(param["client_order_id"])
+            record = await self.order_index.recover(param["client_order_id"])
+            order_id = record.order_id if record else None
             symbol = param["symbol"]
 
-            exchange = await self.get_exchange()
-            order = await exchange.fetch_order({"id": order_id, "symbol": symbol})
+            async with self.private_request(
+                RequestPriority.QUERY,
+                PrivateAction.FETCH_ORDER,
+                record.account if record else None,
+            ) as account:
+                order = await account.exchange.fetch_order(
+                    {"id": order_id, "symbol": symbol}
+                )
 
             order["client_order_id"] = param["client_order_id"]
+            self.order_index.update(
+                order["client_order_id"], order["status"], order["filled"]
+            )
 
             event: Event = {
-                "event_id": self.event_id_by_client_order_id.get(
-                    order["client_order_id"]
-                ),
+                "event_id": record.event_id if record else None,
                 "action": EventAction.GET_ORDERS,
                 "data": [order],
             }
-            self.transmitter.offer(event, Destination.CORE)
-            self.transmitter.offer(event, Destination.LOGS)
+            self.offer(event, Destination.CORE, Destination.LOGS)
 
         except Exception as e:
             message = self.describe_exception(e)
@@ -284,8 +638,7 @@ class Gate:
                 "message": message,
                 "data": [param],
             }
-            self.transmitter.offer(log_event, Destination.CORE)
-            self.transmitter.offer(log_event, Destination.LOGS)
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
 
     @staticmethod
     def describe_exception(exception: Exception):
@@ -302,21 +655,23 @@ class Gate:
             message = str(exception)
         return message
 
+    @branch
     async def get_balance(self, event: Event):
         if not (assets := event.get("data", [])):
             assets = self.assets
 
         try:
-            exchange = await self.get_exchange()
-            balance = await exchange.fetch_partial_balance(assets)
+            async with self.private_request(
+                RequestPriority.QUERY, PrivateAction.FETCH_BALANCE
+            ) as account:
+                balance = await account.exchange.fetch_partial_balance(assets)
 
             event: Event = {
                 "event_id": event["event_id"],
                 "action": EventAction.GET_BALANCE,
                 "data": balance,
             }
-            self.transmitter.offer(event, Destination.BALANCE)
-            self.transmitter.offer(event, Destination.LOGS)
+            self.offer(event, Destination.BALANCE, Destination.LOGS)
 
         except Exception as e:
             message = self.describe_exception(e)
@@ -327,132 +682,403 @@ class Gate:
                 "message": message,
                 "data": assets,
             }
-            self.transmitter.offer(log_event, Destination.CORE)
-            self.transmitter.offer(log_event, Destination.LOGS)
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
 
     async def watch_orderbooks(self):
+        match self.order_book_method:
+            case DataCollectionMethod.WEBSOCKET:
+                streams = [self.stream_orderbook(symbol) for symbol in self.tickers]
+                await asyncio.gather(*streams)
+            case DataCollectionMethod.LOCAL:
+                await self.depth_stream.run()
+            case _:
+                while True:
+                    await self.poll_orderbooks()
+
+    async def poll_orderbooks(self):
+        """
+        Запросить стаканы всех тикеров по HTTP и опубликовать их
+
+        Каждый тикер запрашивается отдельно и параллельно с остальными через
+        следующий IP-адрес пула. Стакан публикуется сразу после получения,
+        а цикл длится столько, сколько самый медленный запрос.
+        """
+        await asyncio.gather(*(self.fetch_orderbook(symbol) for symbol in self.tickers))
+
+    async def stream_orderbook(self, symbol: str):
+        """
+        Публиковать стакан тикера из WebSocket-потока
+
+        После ошибки стакан один раз запрашивается по HTTP, а поток
+        переподключается через IP-адрес, заново полученный из пула: адрес
+        с исчерпанным лимитом или баном сменится
+        """
+        weight = get_request_weight("watch_order_book")
+        exchange = None
         while True:
             try:
-                exchange = await self.exchange_pool.acquire()
+                if exchange is None:
+                    exchange = await self.exchange_pool.acquire(weight)
+                orderbook = await exchange.watch_order_book(
+                    symbol, self.order_book_limit
+                )
+                self.save_orderbook_age_metric(orderbook)
+                self.offer_orderbook(orderbook)
 
-                start = monotonic_ns()
-                orderbooks = await exchange.fetch_order_books(self.tickers, 10)
-                end = monotonic_ns()
+            except Exception as e:
+                exchange = None
+                self.offer_orderbook_error(e, [symbol])
+                await self.fetch_orderbook(symbol)
+                await asyncio.sleep(RECONNECT_DELAY_S)
 
-                self.save_orderbook_metric(start, end)
+    async def fetch_orderbook(self, symbol: str):
+        """
+        Запросить стакан тикера по HTTP и опубликовать его
+        """
+        try:
+            weight = get_order_book_weight(self.order_book_limit)
+            exchange = await self.exchange_pool.acquire(weight)
 
-                for orderbook in orderbooks:
-                    event: Event = {
-                        "event_id": str(uuid.uuid4()),
-                        "action": EventAction.ORDER_BOOK_UPDATE,
-                        "data": orderbook,
-                    }
-                    self.transmitter.offer(event, Destination.ORDER_BOOK)
+            start = monotonic_ns()
+            orderbook = await exchange.fetch_order_book(symbol, self.order_book_limit)
+            end = monotonic_ns()
 
-            except Exception as e:
-                message = self.describe_exception(e)
-                log_event: Event = {
-                    "event_id": str(uuid.uuid4()),
-                    "event": EventType.ERROR,
-                    "action": EventAction.ORDER_BOOK_UPDATE,
-                    "message": message,
-                    "data": self.tickers,
-                }
-                self.transmitter.offer(log_event, Destination.CORE)
-                self.transmitter.offer(log_event, Destination.LOGS)
+            self.save_orderbook_metric(
+                start, end, self.exchange_pool.get_local_host(exchange)
+            )
+            self.offer_orderbook(orderbook)
+
+        except Exception as e:
+            self.offer_orderbook_error(e, [symbol])
 
-    def save_orderbook_metric(self, start: int, end: int) -> None:
+    async def fetch_orderbook_snapshot(self, symbol: str) -> OrderBookSnapshot:
+        """
+        Запросить снимок стакана для синхронизации локального стакана
+        """
+        weight = get_order_book_weight(self.local_order_book_depth)
+        exchange = await self.exchange_pool.acquire(weight)
+        snapshot = await exchange.fetch_order_book_snapshot(
+            symbol, self.local_order_book_depth
+        )
+        return snapshot
+
+    def offer_local_orderbook(self, orderbook: OrderBook):
+        self.save_orderbook_age_metric(orderbook)
+        self.offer_orderbook(orderbook)
+
+    def offer_orderbook(self, orderbook: OrderBook):
+        if not (update := self.orderbook_cache.update(orderbook)):
+            return
+
+        action, data = update
+        event: Event = {
+            "event_id": str(uuid.uuid4()),
+            "action": action,
+            "data": data,
+        }
+        self.offer(event, Destination.ORDER_BOOK)
+
+    def offer_orderbook_error(self, exception: Exception, symbols: list[str]):
+        message = self.describe_exception(exception)
+        log_event: Event = {
+            "event_id": str(uuid.uuid4()),
+            "event": EventType.ERROR,
+            "action": EventAction.ORDER_BOOK_UPDATE,
+            "message": message,
+            "data": symbols,
+        }
+        self.offer(log_event, Destination.CORE, Destination.LOGS)
+
+    def save_orderbook_metric(self, start: int, end: int, local_host: str) -> None:
         """
         Сохранить целевые метрики для ордербука
         """
         latency = ns_to_us(end - start)
-        self.orderbook_latencies.append(latency)
+        self.orderbook_latencies.record(latency)
+        self.orderbook_latencies_by_ip[local_host].record(latency)
+        self.orderbook_rps += 1
+
+    def save_orderbook_age_metric(self, orderbook: OrderBook) -> None:
+        """
+        Сохранить метрики для стакана из потока. Вместо времени запроса
+        учитывается возраст стакана относительно отметки времени биржи
+        """
+        if timestamp := orderbook.get("timestamp"):
+            self.orderbook_latencies.record(time_ns() // 1_000 - timestamp)
         self.orderbook_rps += 1
 
     async def watch_balance(self):
+        match self.balance_method:
+            case DataCollectionMethod.WEBSOCKET:
+                streams = [
+                    self.stream_balance(exchange)
+                    for exchange in self.get_private_exchanges()
+                ]
+                await asyncio.gather(*streams)
+            case _:
+                while True:
+                    await self.update_balance()
+                    await asyncio.sleep(self.balance_delay)
+
+    async def update_balance(self):
+        """
+        Запросить баланс по HTTP и опубликовать его
+        """
+        try:
+            async with self.private_request(
+                RequestPriority.POLLING, PrivateAction.FETCH_BALANCE
+            ) as account:
+                balance = await account.exchange.fetch_partial_balance(self.assets)
+            self.offer_balance_update(balance)
+
+        except RequestShed as e:
+            logger.debug("Balance update deferred: %s", e)
+
+        except Exception as e:
+            self.offer_balance_error(e)
+
+    async def stream_balance(self, exchange: CcxtExchange):
+        """
+        Публиковать баланс аккаунта из потока пользовательских данных
+
+        При обрыве потока баланс запрашивается по HTTP, пока поток не восстановится
+        """
         while True:
             try:
-                # Wait for priority commands to complete
-                if self.priority_tasks:
-                    await asyncio.wait(self.priority_tasks, return_when=ALL_COMPLETED)
+                balance = await exchange.watch_partial_balance(self.assets)
+                self.offer_balance_update(balance)
 
-                exchange = await self.get_exchange()
-                balance = await exchange.fetch_partial_balance(self.assets)
+            except Exception as e:
+                self.offer_balance_error(e)
+                await self.update_balance()
+                await asyncio.sleep(self.balance_delay)
+
+    def offer_balance_update(self, balance: Balance):
+        event: Event = {
+            "event_id": str(uuid.uuid4()),
+            "action": EventAction.BALANCE_UPDATE,
+            "data": balance,
+        }
+        self.offer(event, Destination.BALANCE, Destination.LOGS)
+
+    def offer_balance_error(self, exception: Exception):
+        message = self.describe_exception(exception)
+        log_event: Event = {
+            "event_id": str(uuid.uuid4()),
+            "event": EventType.ERROR,
+            "action": EventAction.BALANCE_UPDATE,
+            "message": message,
+            "data": self.assets,
+        }
+        self.offer(log_event, Destination.CORE, Destination.LOGS)
 
-                event: Event = {
-                    "event_id": str(uuid.uuid4()),
-                    "action": EventAction.BALANCE_UPDATE,
-                    "data": balance,
-                }
-                self.transmitter.offer(event, Destination.BALANCE)
-                self.transmitter.offer(event, Destination.LOGS)
+    async def watch_orders(self):
+        match self.orders_method:
+            case DataCollectionMethod.WEBSOCKET:
+                streams = [
+                    self.stream_orders(exchange)
+                    for exchange in self.get_private_exchanges()
+                ]
+                await asyncio.gather(self.check_consistency(), *streams)
+            case _:
+                while True:
+                    await self.check_orders()
+                    await asyncio.sleep(0)
+
+    async def check_orders(self):
+        """
+        Выполнить один цикл проверки статусов ордеров по HTTP
+        """
+        match self.order_status_method:
+            case OrderStatusMethod.RECONCILE:
+                await self.reconcile_orders()
+            case _:
+                await self.poll_orders()
+
+    async def stream_orders(self, exchange: CcxtExchange):
+        """
+        Публиковать изменения ордеров аккаунта из потока пользовательских данных
+
+        При обрыве потока статусы проверяются по HTTP, пока поток не восстановится
+        """
+        while True:
+            try:
+                orders = await exchange.watch_orders()
+                for order in orders:
+                    self.on_order_update(order)
 
             except Exception as e:
                 message = self.describe_exception(e)
                 log_event: Event = {
                     "event_id": str(uuid.uuid4()),
                     "event": EventType.ERROR,
-                    "action": EventAction.BALANCE_UPDATE,
+                    "action": EventAction.ORDERS_UPDATE,
                     "message": message,
-                    "data": self.assets,
+                    "data": [],
                 }
-                self.transmitter.offer(log_event, Destination.CORE)
-                self.transmitter.offer(log_event, Destination.LOGS)
+                self.offer(log_event, Destination.CORE, Destination.LOGS)
+                await self.check_orders()
+                await asyncio.sleep(self.orders_delay)
+
+    def on_order_update(self, order: Order):
+        """
+        Обработать ордер из потока пользовательских данных
 
-            await asyncio.sleep(self.balance_delay)
+        Биржа обычно присылает обновление раньше ответа на создание ордера.
+        Такое обновление сохраняется и применяется в create_order после
+        ответа, иначе исполнение ордера стало бы известно только при сверке
+        """
+        if not (record := self.order_index.get_by_order_id(order["id"])):
+            logger.debug("Untracked order update: %s", order)
+            self.untracked_updates[order["id"]] = order
+            self.untracked_updates.move_to_end(order["id"])
+            while len(self.untracked_updates) > UNTRACKED_UPDATES_LIMIT:
+                self.untracked_updates.popitem(last=False)
+            return
+
+        order["client_order_id"] = record.client_order_id
+        if order["status"] != "open":
+            self.open_orders.discard((record.client_order_id, order["symbol"]))
+
+        if self.order_index.update(
+            record.client_order_id, order["status"], order["filled"]
+        ):
+            self.offer_order_update(order)
+
+    async def check_consistency(self):
+        """
+        Периодически сверять состояние ордеров и баланс по HTTP
 
-    async def watch_orders(self):
+        Закрывает пропуски в потоке пользовательских данных, которые не привели
+        к его обрыву
+        """
         while True:
-            for client_order_id, symbol in self.open_orders.copy():
-                try:
-                    order_id = self.order_id_by_client_order_id.get(client_order_id)
+            await asyncio.sleep(self.consistency_check_delay)
+            await self.check_orders()
+            await self.update_balance()
 
-                    # Wait for priority commands to complete
-                    await asyncio.wait(self.priority_tasks, return_when=ALL_COMPLETED)
+    async def poll_orders(self):
+        """
+        Запросить статус каждого открытого ордера по отдельности
+        """
+        for client_order_id, symbol in self.open_orders.copy():
+            await self.update_order(client_order_id, symbol)
 
-                    exchange = await self.get_exchange()
-                    order = await exchange.fetch_order(
-                        {"id": order_id, "symbol": symbol}
-                    )
+            logger.info("Open orders: %s", len(self.open_orders))
+            await asyncio.sleep(self.orders_delay)
 
-                    order["client_order_id"] = client_order_id
+    async def reconcile_orders(self):
+        """
+        Сверить отслеживаемые ордера с открытыми ордерами на бирже
 
-                    if order["status"] != "open":
-                        self.open_orders.discard((client_order_id, symbol))
+        Открытые ордера запрашиваются одним запросом на тикер. Публикуются только
+        изменившиеся ордера. Ордера, пропавшие из списка открытых, запрашиваются
+        по отдельности, чтобы узнать их итоговый статус.
+        """
+        # Открытые ордера запрашиваются у аккаунта, который их создал
+        client_order_ids_by_symbol = defaultdict(list)
+        for client_order_id, symbol in self.open_orders:
+            account = self.order_index.get_account(client_order_id)
+            client_order_ids_by_symbol[account, symbol].append(client_order_id)
 
-                    event: Event = {
-                        "event_id": self.event_id_by_client_order_id.get(
-                            order["client_order_id"]
-                        ),
-                        "action": EventAction.ORDERS_UPDATE,
-                        "data": [order],
-                    }
-                    self.transmitter.offer(event, Destination.CORE)
-                    self.transmitter.offer(event, Destination.LOGS)
-
-                except Exception as e:
-                    message = self.describe_exception(e)
-                    log_event: Event = {
-                        "event_id": str(uuid.uuid4()),
-                        "event": EventType.ERROR,
-                        "action": EventAction.ORDERS_UPDATE,
-                        "message": message,
-                        "data": [
-                            {"client_order_id": client_order_id, "symbol": symbol}
-                        ],
-                    }
-                    self.transmitter.offer(log_event, Destination.CORE)
-                    self.transmitter.offer(log_event, Destination.LOGS)
-                    self.open_orders.discard((client_order_id, symbol))
+        for (account, symbol), client_order_ids in client_order_ids_by_symbol.items():
+            try:
+                async with self.private_request(
+                    RequestPriority.POLLING, PrivateAction.FETCH_OPEN_ORDERS, account
+                ) as selected:
+                    open_orders = await selected.exchange.fetch_open_orders([symbol])
 
-                logger.info("Open orders: %s", len(self.open_orders))
+            except RequestShed as e:
+                logger.debug("Open orders check deferred: %s", e)
                 await asyncio.sleep(self.orders_delay)
-            await asyncio.sleep(0)
+                continue
+
+            except Exception as e:
+                message = self.describe_exception(e)
+                log_event: Event = {
+                    "event_id": str(uuid.uuid4()),
+                    "event": EventType.ERROR,
+                    "action": EventAction.ORDERS_UPDATE,
+                    "message": message,
+                    "data": [{"symbol": symbol}],
+                }
+                self.offer(log_event, Destination.CORE, Destination.LOGS)
+                await asyncio.sleep(self.orders_delay)
+                continue
+
+            await asyncio.sleep(self.orders_delay)
+            open_order_by_id = {order["id"]: order for order in open_orders}
+
+            for client_order_id in client_order_ids:
+                if (client_order_id, symbol) not in self.open_orders:
+                    continue
+
+                order_id = self.order_index.get_order_id(client_order_id)
+                if order := open_order_by_id.get(order_id):
+                    order["client_order_id"] = client_order_id
+                    if self.order_index.update(
+                        client_order_id, order["status"], order["filled"]
+                    ):
+                        self.offer_order_update(order)
+                else:
+                    await self.update_order(client_order_id, symbol)
+                    await asyncio.sleep(self.orders_delay)
+
+        logger.info("Open orders: %s", len(self.open_orders))
+
+    async def update_order(self, client_order_id: str, symbol: str):
+        """
+        Запросить ордер с биржи и опубликовать его состояние
+        """
+        try:
+            order_id = self.order_index.get_order_id(client_order_id)
+
+            async with self.private_request(
+                RequestPriority.POLLING,
+                PrivateAction.FETCH_ORDER,
+                self.order_index.get_account(client_order_id),
+            ) as account:
+                order = await account.exchange.fetch_order(
+                    {"id": order_id, "symbol": symbol}
+                )
+
+            order["client_order_id"] = client_order_id
+
+            if order["status"] != "open":
+                self.open_orders.discard((client_order_id, symbol))
+            self.order_index.update(client_order_id, order["status"], order["filled"])
+
+            self.offer_order_update(order)
+
+        except RequestShed as e:
+            logger.debug("Order update deferred: %s", e)
+
+        except Exception as e:
+            message = self.describe_exception(e)
+            log_event: Event = {
+                "event_id": str(uuid.uuid4()),
+                "event": EventType.ERROR,
+                "action": EventAction.ORDERS_UPDATE,
+                "message": message,
+                "data": [{"client_order_id": client_order_id, "symbol": symbol}],
+            }
+            self.offer(log_event, Destination.CORE, Destination.LOGS)
+            self.open_orders.discard((client_order_id, symbol))
+            self.order_index.expire(client_order_id)
+
+    def offer_order_update(self, order: Order):
+        event: Event = {
+            "event_id": self.order_index.get_event_id(order["client_order_id"]),
+            "action": EventAction.ORDERS_UPDATE,
+            "data": [order],
+        }
+        self.offer(event, Destination.CORE, Destination.LOGS)
 
     async def metrics(self) -> NoReturn:
         while True:
-            if len(self.orderbook_latencies) > 1:
-                self.offer_metrics()
+            # Метрики отправляются и без стаканов: задержки команд и цикла
+            # событий нужнее всего как раз при сбоях рыночных данных
+            self.offer_metrics()
             await asyncio.sleep(1)
 
     def offer_metrics(self) -> None:
@@ -461,27 +1087,212 @@ class Gate:
         """
         data = self.get_metrics()
         event = EventFormatter.metrics(data)
-        self.transmitter.offer(event, Destination.LOGS)
+        self.offer(event, Destination.LOGS)
         self.reset_metrics()
 
     def get_metrics(self) -> Metrics:
         """
         Получить целевые метрики
         """
-        percentile = latency_percentile(self.orderbook_latencies)
-        orderbook_rps = self.orderbook_rps
-        private_rps = self.private_api_total_rps
-
-        data = EventFormatter.metrics_data(percentile, orderbook_rps, private_rps)
+        orderbooks = self.orderbook_latencies
+        commands = self.command_latencies
+        responses = self.response_latencies
+        data = EventFormatter.metrics_data(
+            orderbook_latency_percentile=(
+                latency_percentile(orderbooks) if orderbooks else None
+            ),
+            orderbook_latency_by_ip=latency_percentiles(self.orderbook_latencies_by_ip),
+            orderbook_rps=self.orderbook_rps,
+            private_api_total_rps=self.private_api_total_rps,
+            private_api_latency_by_action=latency_percentiles(
+                self.private_latencies_by_action
+            ),
+            private_api_latency_by_account=latency_percentiles(
+                self.private_latencies_by_account
+            ),
+            command_backlog=self.private_scheduler.backlog,
+            shed_requests=self.private_scheduler.shed,
+            transmitter=self.transmitter.queue_stats(),
+            command_latency_percentile=(
+                latency_percentile(commands) if len(commands) > 1 else None
+            ),
+            commands=len(commands),
+            response_latency_percentile=(
+                latency_percentile(responses) if responses else None
+            ),
+            rate_limits=self.get_rate_limit_metrics(),
+            event_loop=self.get_event_loop_metrics(),
+        )
         return data
 
+    def get_event_loop_metrics(self) -> EventLoopMetrics:
+        lags = self.loop_monitor.lags
+        tracer = self.slow_callback_tracer
+        return {
+            "lag_percentile": latency_percentile(lags) if lags else None,
+            "slow_callbacks": tracer.slow_callbacks if tracer else 0,
+        }
+
+    def offer_slow_callback(self, record: SlowCallback) -> None:
+        """
+        Отправить в логи сведения о вызове, надолго занявшем цикл событий
+        """
+        logger.warning(
+            "Event loop blocked for %.3f s in %s:\n%s",
+            record["duration"],
+            record["coroutine"] or "callback",
+            "".join(record["stack"]),
+        )
+        event: Event = {
+            "event_id": str(uuid.uuid4()),
+            "action": EventAction.SLOW_CALLBACK,
+            "data": record,
+        }
+        self.offer(event, Destination.LOGS)
+
+    def get_rate_limit_metrics(self) -> RateLimitMetrics:
+        """
+        Использование лимитов биржи по заголовкам последних ответов
+        """
+        return {
+            "public": self.exchange_pool.usage(),
+            "private": self._private_exchange_pool.usage(),
+        }
+
     def reset_metrics(self) -> None:
         """
-        Сбросить данные, по которым считаются метрики
+        Сбросить данные, по которым считаются метрики. Гистограммы задержек
+        переносятся в накопленные с запуска
         """
-        self.orderbook_latencies = []
         self.orderbook_rps = 0
         self.private_api_total_rps = 0
+        for family, histograms in self.get_latency_histograms().items():
+            for key, histogram in histograms.items():
+                self.latency_totals[family][key].merge(histogram)
+                histogram.reset()
+
+    def get_latency_histograms(self) -> dict[str, dict[Hashable, LatencyHistogram]]:
+        """
+        Гистограммы задержек текущего интервала метрик по семействам
+        """
+        return {
+            "orderbook": {None: self.orderbook_latencies},
+            "orderbook_request": self.orderbook_latencies_by_ip,
+            "private_request": self.private_latencies_by_action,
+            "private_account_request": self.private_latencies_by_account,
+            "command_receive": {None: self.command_latencies},
+            "command_response": {None: self.response_latencies},
+            "event_loop_lag": {None: self.loop_monitor.lags},
+        }
+
+    def collect_openmetrics(self, writer: OpenMetricsWriter) -> None:
+        """
+        Записать накопленные с запуска метрики для экспорта в Prometheus
+        """
+        queues = self.transmitter.queue_stats()
+        writer.counter(
+            "aeron_offers",
+            "Messages offered to Aeron publishers by result",
+            (
+                ({"destination": destination, "result": result}, stats[result])
+                for destination, stats in queues.items()
+                for result in ("sent", "back_pressured", "not_connected", "failed")
+            ),
+        )
+        writer.counter(
+            "aeron_dropped",
+            "Messages dropped from outbound queues",
+            (({"destination": d}, stats["dropped"]) for d, stats in queues.items()),
+        )
+        writer.gauge(
+            "aeron_queue_depth",
+            "Messages waiting in outbound queues",
+            (({"destination": d}, stats["depth"]) for d, stats in queues.items()),
+        )
+
+        waiting = {
+            "public": self.exchange_pool,
+            "private": self._private_exchange_pool,
+            "scheduler": self.private_scheduler,
+        }
+        writer.counter(
+            "pool_waits",
+            "Requests that waited for request budget, account or scheduler slot",
+            (({"pool": pool}, source.waits) for pool, source in waiting.items()),
+        )
+        writer.counter(
+            "pool_wait_seconds",
+            "Time spent waiting for request budget, account or scheduler slot",
+            (({"pool": pool}, source.wait_time) for pool, source in waiting.items()),
+        )
+        writer.gauge(
+            "private_command_backlog",
+            "Core commands in flight or waiting for the private API",
+            [({}, self.private_scheduler.backlog)],
+        )
+        writer.counter(
+            "private_requests_shed",
+            "Polling requests shed because of the command backlog",
+            [({}, self.private_scheduler.shed)],
+        )
+
+        rate_limits = self.get_rate_limit_metrics()
+        connections = [
+            ({"pool": pool, "connection": connection}, stats)
+            for pool, usage in rate_limits.items()
+            for connection, stats in usage.items()
+        ]
+        writer.gauge(
+            "rate_limit_weight_headroom",
+            "Request weight left in the current minute by exchange headers",
+            (
+                (labels, WEIGHT_LIMIT_PER_MINUTE - stats["used_weight"].get("1m", 0))
+                for labels, stats in connections
+            ),
+        )
+        writer.gauge(
+            "rate_limit_order_headroom",
+            "Orders left in the current interval by exchange headers",
+            (
+                (
+                    {"account": account, "interval": interval},
+                    limit - stats["order_count"].get(interval, 0),
+                )
+                for account, stats in rate_limits["private"].items()
+                for interval, limit in ORDER_LIMITS.items()
+            ),
+        )
+        writer.gauge(
+            "rate_limit_retry_after_seconds",
+            "Time left until a 429 or 418 ban is lifted",
+            ((labels, stats["retry_after"]) for labels, stats in connections),
+        )
+
+        writer.gauge(
+            "open_orders", "Tracked open orders", [({}, len(self.open_orders))]
+        )
+        writer.gauge(
+            "background_tasks",
+            "Running core command tasks",
+            [({}, len(self.background_tasks))],
+        )
+        if self.slow_callback_tracer is not None:
+            writer.counter(
+                "slow_callbacks",
+                "Callbacks that blocked the event loop longer than the threshold",
+                [({}, self.slow_callback_tracer.slow_callbacks)],
+            )
+
+        for family, histograms in self.get_latency_histograms().items():
+            name, description, label = LATENCY_METRICS[family]
+            totals = self.latency_totals[family]
+            samples = []
+            for key in sorted(totals.keys() | histograms.keys(), key=str):
+                histogram = totals[key].snapshot()
+                if key in histograms:
+                    histogram.merge(histograms[key])
+                samples.append(({label: key} if label else {}, histogram))
+            writer.histogram(name, description, samples)
 
     async def close(self):
         await self.exchange_pool.close()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from time import monotonic, monotonic_ns, sleep
+from typing import Callable, NoReturn, Optional, TypedDict
+from .statistics import LatencyHistogram
+
+# Период замера задержки цикла событий
+DEFAULT_LAG_INTERVAL_S = 0.05
+# Сколько кадров стека сохраняется для медленного обратного вызова
+STACK_LIMIT = 20
+
+
+class SlowCallback(TypedDict):
+    duration: float
+    task: Optional[str]
+    coroutine: Optional[str]
+    stack: list[str]
+
+
+class LoopLagMonitor:
+    """
+    Замер задержки цикла событий
+
+    Раз в interval корутина засыпает и измеряет, насколько позже срока она
+    проснулась. Задержка показывает, как долго цикл был занят другими
+    обратными вызовами. Стоимость — одно пробуждение за период.
+    """
+
+    def __init__(self, interval: float = DEFAULT_LAG_INTERVAL_S):
+        self.interval = interval
+        # Задержки в микросекундах за интервал метрик
+        self.lags = LatencyHistogram()
+        self.last_lag = 0.0
+
+    async def run(self) -> NoReturn:
+        interval_ns = int(self.interval * 1e9)
+        while True:
+            start = monotonic_ns()
+            await asyncio.sleep(self.interval)
+            lag_ns = max(monotonic_ns() - start - interval_ns, 0)
+            self.lags.record(lag_ns // 1_000)
+            self.last_lag = lag_ns / 1e9
+
+
+class SlowCallbackTracer:
+    """
+    Поиск обратных вызовов, надолго занявших цикл событий
+
+    Корутина в цикле событий обновляет отметку времени, а отдельный поток
+    проверяет её. Если цикл не обновлял отметку дольше threshold, поток
+    сохраняет стек потока цикла и выполняемую задачу. Когда цикл освобождается,
+    запись вместе с полной длительностью блокировки передаётся в on_slow
+    уже из цикла событий. В отличие от режима отладки asyncio, обычные
+    обратные вызовы ничего не стоят.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        on_slow: Callable[[SlowCallback], None],
+    ):
+        """
+        :param threshold: Сколько секунд цикл может быть занят одним вызовом
+        :param on_slow: Обработчик записи о медленном вызове
+        """
+        self.logger = logging.getLogger(__name__)
+        self.threshold = threshold
+        self.on_slow = on_slow
+        self.check_interval = threshold / 2
+
+        self._heartbeat = monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._captured: Optional[tuple[float, SlowCallback]] = None
+        self._stopped = threading.Event()
+
+        # Счётчики
+        self.slow_callbacks = 0
+
+    async def run(self) -> NoReturn:
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = monotonic()
+        self._stopped.clear()
+        watchdog = threading.Thread(
+            target=self._watch, name="slow-callback-watchdog", daemon=True
+        )
+        watchdog.start()
+
+        try:
+            while True:
+                await asyncio.sleep(self.check_interval)
+                self._beat()
+        finally:
+            self._stopped.set()
+
+    def _beat(self) -> None:
+        now = monotonic()
+        captured, self._captured = self._captured, None
+        if captured is not None:
+            blocked_since, record = captured
+            record["duration"] = now - blocked_since
+            self.slow_callbacks += 1
+            self.on_slow(record)
+        self._heartbeat = now
+
+    def _watch(self) -> None:
+        while not self._stopped.is_set():
+            sleep(self.check_interval)
+            heartbeat = self._heartbeat
+            blocked_since = heartbeat + self.check_interval
+            if self._captured is not None:
+                continue
+            if monotonic() - blocked_since < self.threshold:
+                continue
+
+            try:
+                self._captured = (blocked_since, self._capture())
+            except Exception as e:
+                self.logger.warning("Slow callback capture error: %s", e)
+
+    def _capture(self) -> SlowCallback:
+        """
+        Сохранить стек потока цикла событий и выполняемую задачу
+        """
+        frame = sys._current_frames().get(self._thread_id)
+        stack = traceback.format_stack(frame, STACK_LIMIT) if frame else []
+
+        task = asyncio.current_task(self._loop)
+        return {
+            "duration": 0.0,
+            "task": task.get_name() if task else None,
+            "coroutine": task.get_coro().__qualname__ if task else None,
+            "stack": stack,
+        }
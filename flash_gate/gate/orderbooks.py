@@ -0,0 +1,116 @@
+from typing import Optional
+from flash_gate.exchange.arrays import ArrayOrderBook
+from flash_gate.exchange.types import OrderBook
+from flash_gate.transmitter.enums import EventAction
+
+DEFAULT_SNAPSHOT_INTERVAL = 100
+
+
+class OrderBookCache:
+    """
+    Последние опубликованные стаканы по тикерам
+
+    Не пропускает стаканы, уровни которых не изменились. В режиме дельт вместо
+    полного стакана отдаёт только изменившиеся уровни (удалённый уровень
+    передаётся с нулевым объёмом) и полный стакан раз в snapshot_interval
+    обновлений. Снимки и дельты одного тикера нумеруются общим счётчиком
+    sequence: дельту можно применить, только если её номер на единицу больше
+    номера последнего применённого сообщения.
+    """
+
+    def __init__(
+        self,
+        skip_unchanged: bool = True,
+        deltas: bool = False,
+        snapshot_interval: int = DEFAULT_SNAPSHOT_INTERVAL,
+    ):
+        self.skip_unchanged = skip_unchanged
+        self.deltas = deltas
+        self.snapshot_interval = snapshot_interval
+
+        self._books: dict[str, OrderBook] = {}
+        self._sequences: dict[str, int] = {}
+
+        # Счётчики
+        self.unchanged = 0
+
+    def update(
+        self, orderbook: OrderBook | ArrayOrderBook
+    ) -> Optional[tuple[EventAction, dict]]:
+        """
+        Запомнить стакан и получить данные для публикации
+
+        :return: Действие и данные события или None, если публиковать нечего
+        """
+        symbol = orderbook["symbol"]
+        previous = self._books.get(symbol)
+
+        if previous is not None and self._is_unchanged(previous, orderbook):
+            self.unchanged += 1
+            if self.skip_unchanged:
+                return None
+
+        self._books[symbol] = self._copy(orderbook)
+
+        if not self.deltas:
+            return EventAction.ORDER_BOOK_UPDATE, orderbook
+
+        sequence = self._sequences.get(symbol, -1) + 1
+        self._sequences[symbol] = sequence
+
+        if previous is None or sequence % self.snapshot_interval == 0:
+            return EventAction.ORDER_BOOK_UPDATE, {**orderbook, "sequence": sequence}
+
+        delta = {
+            "symbol": symbol,
+            "sequence": sequence,
+            "bids": get_changed_levels(previous["bids"], orderbook["bids"], True),
+            "asks": get_changed_levels(previous["asks"], orderbook["asks"], False),
+            "timestamp": orderbook["timestamp"],
+        }
+        return EventAction.ORDER_BOOK_DELTA, delta
+
+    @staticmethod
+    def _copy(orderbook: OrderBook | ArrayOrderBook) -> OrderBook | ArrayOrderBook:
+        # Стакан на массивах создаётся заново на каждый запрос, а уровни
+        # стаканов из WebSocket-потока изменяются на месте и копируются
+        if isinstance(orderbook, ArrayOrderBook):
+            return orderbook
+        return {
+            "symbol": orderbook["symbol"],
+            "bids": [list(level) for level in orderbook["bids"]],
+            "asks": [list(level) for level in orderbook["asks"]],
+            "timestamp": orderbook["timestamp"],
+        }
+
+    @staticmethod
+    def _is_unchanged(
+        previous: OrderBook | ArrayOrderBook, orderbook: OrderBook | ArrayOrderBook
+    ) -> bool:
+        if isinstance(previous, ArrayOrderBook) and isinstance(
+            orderbook, ArrayOrderBook
+        ):
+            return previous == orderbook
+        return (
+            previous["bids"] == orderbook["bids"]
+            and previous["asks"] == orderbook["asks"]
+        )
+
+
+def get_changed_levels(previous: list, current: list, descending: bool) -> list:
+    """
+    Получить уровни, которые появились, изменились или исчезли
+    """
+    previous_amounts = {price: amount for price, amount, *_ in previous}
+    current_amounts = {price: amount for price, amount, *_ in current}
+
+    changed = [
+        [price, amount]
+        for price, amount in current_amounts.items()
+        if previous_amounts.get(price) != amount
+    ]
+    changed.extend(
+        [price, 0.0] for price in previous_amounts if price not in current_amounts
+    )
+    changed.sort(reverse=descending)
+    return changed
@@ -1,3 +1,24 @@
+from typing import Optional
+from flash_gate.cache.index import DEFAULT_TERMINAL_LIMIT, DEFAULT_TERMINAL_TTL_S
+from flash_gate.exchange.limits import DEFAULT_WEIGHT_LIMIT
+from flash_gate.exchange.store import DEFAULT_ORDER_STATE_MAX_AGE_S
+from flash_gate.tracing import DEFAULT_TRACE_SAMPLE_RATE
+from .enums import DataCollectionMethod, OrderStatusMethod
+from .monitor import DEFAULT_LAG_INTERVAL_S
+from .orderbooks import DEFAULT_SNAPSHOT_INTERVAL
+
+# Одновременные запросы на создание и отмену ордеров через один аккаунт
+DEFAULT_MAX_IN_FLIGHT_ORDERS = 10
+# Одновременные запросы к приватному API и очередь команд, после которой
+# откладывается периодический опрос
+DEFAULT_MAX_PRIVATE_REQUESTS = 20
+DEFAULT_MAX_COMMAND_BACKLOG = 20
+# Глубина снимка, с которого начинается локальный стакан
+DEFAULT_LOCAL_ORDER_BOOK_DEPTH = 1000
+# Период сверки по HTTP при получении данных из потока пользовательских данных
+DEFAULT_CONSISTENCY_CHECK_DELAY = 30
+
+
 class ConfigParser:
     """
     Класс для получения необходимых шлюзу данных из конфигурации
@@ -61,9 +82,37 @@ class ConfigParser:
 
     @property
     def data_collection_method(self) -> dict:
-        data_collection_method = self._gate_config["data_collection_method"]
+        data_collection_method = self._gate_config.get("data_collection_method", {})
         return data_collection_method
 
+    @property
+    def order_book_method(self) -> DataCollectionMethod:
+        order_book_method = self.data_collection_method.get(
+            "order_book", DataCollectionMethod.REST
+        )
+        return DataCollectionMethod(order_book_method)
+
+    @property
+    def orders_method(self) -> DataCollectionMethod:
+        orders_method = self.data_collection_method.get(
+            "orders", DataCollectionMethod.REST
+        )
+        return DataCollectionMethod(orders_method)
+
+    @property
+    def balance_method(self) -> DataCollectionMethod:
+        balance_method = self.data_collection_method.get(
+            "balance", DataCollectionMethod.REST
+        )
+        return DataCollectionMethod(balance_method)
+
+    @property
+    def consistency_check_delay(self) -> float:
+        consistency_check_delay = self._gate_config["gate"].get(
+            "consistency_check_delay", DEFAULT_CONSISTENCY_CHECK_DELAY
+        )
+        return consistency_check_delay
+
     @property
     def subscribe_delay(self) -> int:
         subscribe_delay = self._rate_limits["subscribe_timeout"]
@@ -85,6 +134,95 @@ class ConfigParser:
         order_book_limit = self._gate_config["gate"]["order_book_depth"]
         return order_book_limit
 
+    @property
+    def local_order_book_depth(self) -> int:
+        local_order_book_depth = self._gate_config["gate"].get(
+            "local_order_book_depth", DEFAULT_LOCAL_ORDER_BOOK_DEPTH
+        )
+        return local_order_book_depth
+
+    @property
+    def memcached(self) -> bool:
+        memcached = self._gate_config["gate"].get("memcached", False)
+        return memcached
+
+    @property
+    def terminal_order_ttl(self) -> float:
+        terminal_order_ttl = self._gate_config["gate"].get(
+            "terminal_order_ttl", DEFAULT_TERMINAL_TTL_S
+        )
+        return terminal_order_ttl
+
+    @property
+    def terminal_orders_limit(self) -> int:
+        terminal_orders_limit = self._gate_config["gate"].get(
+            "terminal_orders_limit", DEFAULT_TERMINAL_LIMIT
+        )
+        return terminal_orders_limit
+
+    @property
+    def order_state_max_age(self) -> float:
+        order_state_max_age = self._gate_config["gate"].get(
+            "order_state_max_age", DEFAULT_ORDER_STATE_MAX_AGE_S
+        )
+        return order_state_max_age
+
+    @property
+    def metrics_exporter(self) -> Optional[dict]:
+        """
+        Адрес HTTP-сервера метрик в формате OpenMetrics: host и port.
+        Без этого раздела сервер не запускается
+        """
+        metrics_exporter = self._gate_config["gate"].get("metrics_exporter")
+        return metrics_exporter
+
+    @property
+    def loop_lag_interval(self) -> float:
+        loop_lag_interval = self._gate_config["gate"].get(
+            "loop_lag_interval", DEFAULT_LAG_INTERVAL_S
+        )
+        return loop_lag_interval
+
+    @property
+    def slow_callback_threshold(self) -> Optional[float]:
+        """
+        Порог поиска медленных обратных вызовов в секундах. Без него поиск
+        выключен
+        """
+        slow_callback_threshold = self._gate_config["gate"].get(
+            "slow_callback_threshold"
+        )
+        return slow_callback_threshold
+
+    @property
+    def trace_sample_rate(self) -> float:
+        """
+        Доля команд ядра, для которых в логи отправляется трасса этапов
+        """
+        trace_sample_rate = self._gate_config["gate"].get(
+            "trace_sample_rate", DEFAULT_TRACE_SAMPLE_RATE
+        )
+        return trace_sample_rate
+
+    @property
+    def skip_unchanged_order_books(self) -> bool:
+        skip_unchanged_order_books = self._gate_config["gate"].get(
+            "skip_unchanged_order_books", True
+        )
+        return skip_unchanged_order_books
+
+    @property
+    def order_book_deltas(self) -> bool:
+        order_book_deltas = self._gate_config["gate"].get("order_book_deltas", False)
+        return order_book_deltas
+
+    @property
+    def order_book_snapshot_interval(self) -> int:
+        order_book_snapshot_interval = self._gate_config["gate"].get(
+            "order_book_snapshot_interval", DEFAULT_SNAPSHOT_INTERVAL
+        )
+        return order_book_snapshot_interval
+
     @property
     def assets(self) -> list[str]:
         assets_labels = self.config["data"]["assets_labels"]
@@ -125,8 +263,11 @@ class ConfigParser:
         return private_ip
 
     @property
-    def public_delay(self) -> float:
-        return 0
+    def public_weight_limit(self) -> int:
+        public_weight_limit = self.api_requests_per_seconds["public"].get(
+            "weight_limit", DEFAULT_WEIGHT_LIMIT
+        )
+        return public_weight_limit
 
     @property
     def private_delay(self) -> float:
@@ -134,6 +275,34 @@ class ConfigParser:
         private_delay = 1 / rps
         return private_delay
 
+    @property
+    def max_in_flight_orders(self) -> int:
+        max_in_flight_orders = self._rate_limits.get(
+            "max_in_flight_orders", DEFAULT_MAX_IN_FLIGHT_ORDERS
+        )
+        return max_in_flight_orders
+
+    @property
+    def max_private_requests(self) -> int:
+        max_private_requests = self._rate_limits.get(
+            "max_private_requests", DEFAULT_MAX_PRIVATE_REQUESTS
+        )
+        return max_private_requests
+
+    @property
+    def max_command_backlog(self) -> int:
+        max_command_backlog = self._rate_limits.get(
+            "max_command_backlog", DEFAULT_MAX_COMMAND_BACKLOG
+        )
+        return max_command_backlog
+
+    @property
+    def order_status_method(self) -> OrderStatusMethod:
+        order_status_method = self._gate_config["gate"].get(
+            "order_status_method", OrderStatusMethod.PER_ORDER
+        )
+        return OrderStatusMethod(order_status_method)
+
     @property
     def balance_delay(self) -> float:
         rps = self.api_requests_per_seconds["private"]["balance"]
@@ -0,0 +1,134 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+from time import monotonic
+from .enums import RequestPriority
+
+# Доля одновременных запросов, которую может занять периодический опрос
+POLLING_SHARE = 4
+
+
+class RequestShed(Exception):
+    """
+    Низкоприоритетный запрос отброшен из-за очереди команд
+    """
+
+
+class PrivateRequestScheduler:
+    """
+    Планировщик запросов к приватному API
+
+    Одновременно выполняется не больше max_concurrency запросов, причём опрос
+    занимает не больше четверти мест: остальные всегда свободны для команд
+    ядра. Ожидающие запросы запускаются в порядке приоритета, внутри класса —
+    в порядке поступления. Если команд в работе и в очереди не меньше
+    max_backlog, новые запросы опроса отбрасываются с RequestShed, и опрос
+    переносится на следующий цикл.
+    """
+
+    def __init__(self, max_concurrency: int, max_backlog: int):
+        self.max_concurrency = max_concurrency
+        self.max_polling = max(max_concurrency // POLLING_SHARE, 1)
+        self.max_backlog = max_backlog
+
+        self._in_flight = dict.fromkeys(RequestPriority, 0)
+        self._waiters: list[tuple[RequestPriority, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+        # Счётчики
+        self.shed = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    @property
+    def backlog(self) -> int:
+        """
+        Команды ядра в работе и в очереди
+        """
+        in_flight = self.in_flight - self._in_flight[RequestPriority.POLLING]
+        waiting = sum(
+            1
+            for priority, _, waiter in self._waiters
+            if priority < RequestPriority.POLLING and not waiter.done()
+        )
+        return in_flight + waiting
+
+    def is_overloaded(self) -> bool:
+        return self.backlog >= self.max_backlog
+
+    @asynccontextmanager
+    async def slot(self, priority: RequestPriority):
+        """
+        Занять место для запроса с указанным приоритетом
+
+        :raises RequestShed: Запрос опроса отброшен из-за очереди команд
+        """
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    async def _acquire(self, priority: RequestPriority) -> None:
+        if priority >= RequestPriority.POLLING and self.is_overloaded():
+            self.shed += 1
+            raise RequestShed(f"Command backlog: {self.backlog}")
+
+        if not self._has_waiters_ahead(priority) and self._can_start(priority):
+            self._in_flight[priority] += 1
+            return
+
+        start = monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Место уже выделено, но запрос отменён до начала
+            if waiter.done() and not waiter.cancelled():
+                self._release(priority)
+            raise
+        finally:
+            self.waits += 1
+            self.wait_time += monotonic() - start
+
+    def _has_waiters_ahead(self, priority: RequestPriority) -> bool:
+        return any(
+            waiting <= priority and not waiter.done()
+            for waiting, _, waiter in self._waiters
+        )
+
+    def _can_start(self, priority: RequestPriority) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        if priority == RequestPriority.POLLING:
+            return self._in_flight[priority] < self.max_polling
+        return True
+
+    def _release(self, priority: RequestPriority) -> None:
+        self._in_flight[priority] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """
+        Запустить ожидающие запросы, которым хватает мест
+        """
+        blocked = []
+        while self._waiters and self.in_flight < self.max_concurrency:
+            priority, counter, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+
+            if self._can_start(priority):
+                self._in_flight[priority] += 1
+                waiter.set_result(None)
+            else:
+                blocked.append((priority, counter, waiter))
+
+        for item in blocked:
+            heapq.heappush(self._waiters, item)
@@ -1,7 +1,20 @@
-import statistics
+import math
+from array import array
 from decimal import Decimal
+from typing import Hashable, Optional
 from .typing import LatencyPercentile
 
+# Точность гистограммы: значение хранится с относительной ошибкой не больше
+# 1 / 2 ** (SUB_BUCKET_BITS - 1), то есть меньше 1%. Значения меньше
+# SUB_BUCKET_COUNT хранятся точно
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT // 2
+# Наибольшее значение, которое различает гистограмма: 2 ** 36 мкс — около 19 часов.
+# Большие значения учитываются как наибольшее
+MAX_VALUE_BITS = 36
+PERCENTILES = ("50", "90", "99", "99.99")
+
 
 def ns_to_us(ns: int) -> int:
     """
@@ -11,22 +24,161 @@ def ns_to_us(ns: int) -> int:
     return us
 
 
-def latency_percentile(data: list) -> LatencyPercentile:
+def latency_percentile(histogram: "LatencyHistogram") -> LatencyPercentile:
     """
-    Получить 50, 90, 99 и 99.99 процентили из переданного списка
+    Получить 50, 90, 99 и 99.99 процентили из гистограммы
     """
-    quantiles = statistics.quantiles(data, n=10000, method="inclusive")
-    percentiles = {
-        "50": int(percentile(quantiles, "50")),
-        "90": int(percentile(quantiles, "90")),
-        "99": int(percentile(quantiles, "99")),
-        "99.99": int(percentile(quantiles, "99.99")),
-    }
+    percentiles = {n: histogram.percentile(float(n)) for n in PERCENTILES}
     return percentiles
 
 
+def latency_percentiles(
+    histograms: dict[Hashable, "LatencyHistogram"],
+) -> dict[str, LatencyPercentile]:
+    """
+    Получить процентили по каждой непустой гистограмме
+    """
+    return {
+        str(key): latency_percentile(histogram)
+        for key, histogram in histograms.items()
+        if histogram.count
+    }
+
+
 def percentile(quantiles: list, n: str) -> float:
     """
     Получить n-й процентиль из квантилей
     """
     return quantiles[int(len(quantiles) * (Decimal(n) / 100) - 1)]
+
+
+def get_bucket_index(value: int) -> int:
+    """
+    Номер корзины гистограммы, в которую попадает значение
+    """
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return (
+        SUB_BUCKET_COUNT
+        + (shift - 1) * SUB_BUCKET_HALF_COUNT
+        + ((value >> shift) - SUB_BUCKET_HALF_COUNT)
+    )
+
+
+def get_bucket_value(index: int) -> int:
+    """
+    Наибольшее значение, попадающее в корзину
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift, offset = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF_COUNT)
+    shift += 1
+    return ((SUB_BUCKET_HALF_COUNT + offset + 1) << shift) - 1
+
+
+BUCKET_COUNT = get_bucket_index((1 << MAX_VALUE_BITS) - 1) + 1
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в микросекундах с логарифмическими корзинами
+
+    Как в HdrHistogram, каждая степень двойки делится на одинаковое число
+    корзин, поэтому относительная ошибка одинакова для любых значений.
+    Запись выполняется за O(1), память постоянна, гистограммы можно
+    складывать, а любой процентиль вычисляется по запросу.
+    """
+
+    __slots__ = ("counts", "count", "sum", "min", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.sum = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, value: int) -> None:
+        """
+        Учесть значение. Отрицательные значения, например из-за расхождения
+        часов с биржей, учитываются как 0
+        """
+        value = min(max(int(value), 0), (1 << MAX_VALUE_BITS) - 1)
+        self.counts[get_bucket_index(value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, n: float) -> int:
+        """
+        Получить n-й процентиль: наибольшее значение корзины, в которой
+        накопилось n% значений
+
+        :raises ValueError: Гистограмма пуста
+        """
+        if not self.count:
+            raise ValueError("Histogram is empty")
+
+        rank = max(math.ceil(self.count * n / 100), 1)
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                return min(max(get_bucket_value(index), self.min), self.max)
+        return self.max
+
+    def get_cumulative_counts(self, bounds: list[int]) -> list[int]:
+        """
+        Получить количество значений, не превышающих каждую из границ
+
+        Корзина, в которую попадает граница, учитывается целиком, поэтому
+        значения могут превышать границу не больше чем на точность гистограммы
+
+        :param bounds: Границы в порядке возрастания
+        """
+        cumulative_counts = []
+        total = 0
+        start = 0
+        for bound in bounds:
+            end = min(get_bucket_index(max(bound, 0)), BUCKET_COUNT - 1) + 1
+            for index in range(start, end):
+                total += self.counts[index]
+            start = max(start, end)
+            cumulative_counts.append(total)
+        return cumulative_counts
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Добавить значения другой гистограммы
+        """
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def snapshot(self) -> "LatencyHistogram":
+        """
+        Получить независимую копию гистограммы
+        """
+        histogram = LatencyHistogram()
+        histogram.merge(self)
+        return histogram
+
+    def reset(self) -> None:
+        self.counts = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
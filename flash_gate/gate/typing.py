@@ -1,4 +1,6 @@
-from typing import TypedDict
+from typing import Optional, TypedDict
+from flash_gate.exchange.types import RateLimitStats
+from flash_gate.transmitter.types import QueueStats
 
 LatencyPercentile = TypedDict(
     "LatencyPercentile",
@@ -12,18 +14,44 @@ LatencyPercentile = TypedDict(
 
 
 class OrderbookMetrics(TypedDict):
-    latency_percentile: LatencyPercentile
+    latency_percentile: Optional[LatencyPercentile]
     rps: int
 
 
 class PublicApiMetrics(TypedDict):
     orderbook: OrderbookMetrics
+    latency_percentile_by_ip: dict[str, LatencyPercentile]
 
 
 class PrivateApiMetrics(TypedDict):
     total_rps: int
+    command_backlog: int
+    shed_requests: int
+    latency_percentile_by_action: dict[str, LatencyPercentile]
+    latency_percentile_by_account: dict[str, LatencyPercentile]
+
+
+class CoreApiMetrics(TypedDict):
+    receive_latency_percentile: Optional[LatencyPercentile]
+    commands: int
+    # От получения команды до отправки ответа на неё
+    response_latency_percentile: Optional[LatencyPercentile]
+
+
+class EventLoopMetrics(TypedDict):
+    lag_percentile: Optional[LatencyPercentile]
+    slow_callbacks: int
+
+
+class RateLimitMetrics(TypedDict):
+    public: dict[str, RateLimitStats]
+    private: dict[str, RateLimitStats]
 
 
 class Metrics(TypedDict):
     public_api: PublicApiMetrics
     private_api: PrivateApiMetrics
+    core_api: CoreApiMetrics
+    transmitter: dict[str, QueueStats]
+    rate_limits: RateLimitMetrics
+    event_loop: EventLoopMetrics
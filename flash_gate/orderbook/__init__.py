@@ -0,0 +1,3 @@
+from .book import LocalOrderBook
+from .stream import DepthStream
+from .sync import DepthSynchronizer, SequenceGap
@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+from typing import Iterable
+
+
+class BookSide:
+    """
+    Сторона стакана: отсортированные по возрастанию цены и объёмы по цене
+    """
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self.prices: list[float] = []
+        self.amounts: dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def clear(self) -> None:
+        self.prices.clear()
+        self.amounts.clear()
+
+    def load(self, levels: Iterable) -> None:
+        self.amounts = {
+            float(price): float(amount)
+            for price, amount in levels
+            if float(amount) != 0
+        }
+        self.prices = sorted(self.amounts)
+
+    def apply(self, levels: Iterable) -> None:
+        """
+        Применить уровни с абсолютными объёмами. Нулевой объём удаляет уровень
+        """
+        for price, amount in levels:
+            price = float(price)
+            amount = float(amount)
+
+            if amount == 0:
+                if self.amounts.pop(price, None) is not None:
+                    del self.prices[bisect_left(self.prices, price)]
+            else:
+                if price not in self.amounts:
+                    insort(self.prices, price)
+                self.amounts[price] = amount
+
+    def top(self, limit: int) -> list[list[float]]:
+        """
+        Получить limit лучших уровней
+        """
+        if self.descending:
+            prices = self.prices[: -limit - 1 : -1] if limit else []
+        else:
+            prices = self.prices[:limit]
+        return [[price, self.amounts[price]] for price in prices]
+
+
+class LocalOrderBook:
+    """
+    Полный стакан тикера, который поддерживается в памяти
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+
+    def clear(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+
+    def load(self, bids: Iterable, asks: Iterable) -> None:
+        self.bids.load(bids)
+        self.asks.load(asks)
+
+    def apply(self, bids: Iterable, asks: Iterable) -> None:
+        self.bids.apply(bids)
+        self.asks.apply(asks)
+
+    def top(self, limit: int) -> dict:
+        """
+        Получить limit лучших уровней в формате стакана CCXT
+        """
+        return {
+            "symbol": self.symbol,
+            "bids": self.bids.top(limit),
+            "asks": self.asks.top(limit),
+        }
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, NoReturn
+import aiohttp
+from flash_gate.exchange.formatters import CcxtOrderBookFormatter
+from flash_gate.exchange.types import OrderBook, OrderBookSnapshot
+from .book import LocalOrderBook
+from .sync import DepthSynchronizer, SequenceGap
+
+STREAM_URL = "wss://stream.binance.com:9443/stream"
+SANDBOX_STREAM_URL = "wss://testnet.binance.vision/stream"
+# Биржа присылает изменения стакана раз в 100 мс
+DEPTH_STREAM = "depth@100ms"
+RECONNECT_DELAY_S = 1
+SNAPSHOT_RETRY_DELAY_S = 1
+
+
+def get_market_id(symbol: str) -> str:
+    """
+    Получить идентификатор спотового рынка Binance: BTC/USDT -> BTCUSDT
+    """
+    return symbol.replace("/", "")
+
+
+class DepthStream:
+    """
+    Локальные стаканы тикеров, синхронизируемые с потоком изменений глубины
+
+    Все тикеры получаются через одно WebSocket-соединение. Снимок стакана
+    по HTTP запрашивается только при первой синхронизации, после пропуска
+    событий и после переподключения.
+    """
+
+    def __init__(
+        self,
+        symbols: list[str],
+        fetch_snapshot: Callable[[str], Awaitable[OrderBookSnapshot]],
+        on_update: Callable[[OrderBook], None],
+        depth: int,
+        url: str = STREAM_URL,
+    ):
+        """
+        :param symbols: Тикеры
+        :param fetch_snapshot: Корутинная функция, запрашивающая снимок стакана
+        :param on_update: Обработчик изменившегося стакана
+        :param depth: Количество публикуемых уровней стакана
+        :param url: Адрес комбинированного потока
+        """
+        self.logger = logging.getLogger(__name__)
+        self.fetch_snapshot = fetch_snapshot
+        self.on_update = on_update
+        self.depth = depth
+        self.url = url
+        self.formatter = CcxtOrderBookFormatter()
+
+        self.symbols = {get_market_id(symbol): symbol for symbol in symbols}
+        self.synchronizers = {
+            symbol: DepthSynchronizer(LocalOrderBook(symbol)) for symbol in symbols
+        }
+        self._snapshot_tasks: dict[str, asyncio.Task] = {}
+
+        # Счётчики
+        self.resyncs = 0
+
+    @property
+    def stream_url(self) -> str:
+        streams = "/".join(
+            f"{market_id.lower()}@{DEPTH_STREAM}" for market_id in self.symbols
+        )
+        return f"{self.url}?streams={streams}"
+
+    async def run(self) -> NoReturn:
+        while True:
+            try:
+                await self._listen()
+            except Exception as e:
+                self.logger.warning("Depth stream error: %s", e)
+
+            self._reset()
+            await asyncio.sleep(RECONNECT_DELAY_S)
+
+    async def _listen(self) -> None:
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.stream_url) as ws:
+                # События копятся в буферах, пока загружаются снимки
+                for symbol in self.synchronizers:
+                    self._resync(symbol)
+
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    self.on_message(json.loads(message.data))
+
+    def on_message(self, message: dict) -> None:
+        event = message["data"]
+        if not (symbol := self.symbols.get(event["s"])):
+            return
+
+        try:
+            changed = self.synchronizers[symbol].on_event(event)
+        except SequenceGap as e:
+            self.logger.warning("%s order book is out of sync: %s", symbol, e)
+            self._resync(symbol)
+            return
+
+        if changed:
+            self._publish(symbol, event["E"])
+
+    def _resync(self, symbol: str) -> None:
+        self.resyncs += 1
+        self.synchronizers[symbol].reset()
+        if task := self._snapshot_tasks.get(symbol):
+            task.cancel()
+        self._snapshot_tasks[symbol] = asyncio.create_task(self._load_snapshot(symbol))
+
+    async def _load_snapshot(self, symbol: str) -> None:
+        synchronizer = self.synchronizers[symbol]
+        while True:
+            try:
+                snapshot = await self.fetch_snapshot(symbol)
+                synchronizer.on_snapshot(snapshot)
+                break
+            except SequenceGap as e:
+                self.logger.warning("%s snapshot is too old: %s", symbol, e)
+                synchronizer.reset()
+            except Exception as e:
+                self.logger.warning("%s snapshot error: %s", symbol, e)
+            await asyncio.sleep(SNAPSHOT_RETRY_DELAY_S)
+
+        del self._snapshot_tasks[symbol]
+        self._publish(symbol, None)
+
+    def _publish(self, symbol: str, timestamp: int | None) -> None:
+        raw_order_book = self.synchronizers[symbol].book.top(self.depth)
+        raw_order_book["timestamp"] = timestamp
+        self.on_update(self.formatter.format(raw_order_book))
+
+    def _reset(self) -> None:
+        for task in self._snapshot_tasks.values():
+            task.cancel()
+        self._snapshot_tasks.clear()
+        for synchronizer in self.synchronizers.values():
+            synchronizer.reset()
@@ -0,0 +1,92 @@
+from typing import Optional
+from flash_gate.exchange.types import OrderBookSnapshot
+from .book import LocalOrderBook
+
+# Сколько событий хранить, пока загружается снимок стакана
+MAX_BUFFERED_EVENTS = 1000
+
+
+class SequenceGap(Exception):
+    """
+    Пропуск в последовательности событий потока глубины
+    """
+
+
+class DepthSynchronizer:
+    """
+    Синхронизация локального стакана с потоком изменений глубины Binance
+
+    Пока нет снимка, события копятся в буфере. После загрузки снимка
+    отбрасываются события с u <= lastUpdateId, первое применённое событие
+    должно удовлетворять U <= lastUpdateId + 1 <= u, а каждое следующее —
+    U == u предыдущего + 1. Нарушение порядка вызывает SequenceGap, после
+    чего стакан нужно синхронизировать заново.
+    """
+
+    def __init__(self, book: LocalOrderBook):
+        self.book = book
+        self.last_update_id: Optional[int] = None
+        self._first = True
+        self._buffer: list[dict] = []
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None
+
+    def reset(self) -> None:
+        self.book.clear()
+        self.last_update_id = None
+        self._first = True
+        self._buffer.clear()
+
+    def on_event(self, event: dict) -> bool:
+        """
+        Обработать событие потока
+
+        :return: True, если стакан изменился
+        """
+        if not self.synced:
+            if len(self._buffer) >= MAX_BUFFERED_EVENTS:
+                raise SequenceGap("Depth event buffer overflow")
+            self._buffer.append(event)
+            return False
+
+        return self._apply(event)
+
+    def on_snapshot(self, snapshot: OrderBookSnapshot) -> bool:
+        """
+        Загрузить снимок стакана и применить накопленные события
+
+        :param snapshot: Снимок стакана с lastUpdateId в поле nonce
+        """
+        self.book.load(snapshot["bids"], snapshot["asks"])
+        self.last_update_id = snapshot["nonce"]
+        self._first = True
+
+        buffer, self._buffer = self._buffer, []
+        for event in buffer:
+            self._apply(event)
+        return True
+
+    def _apply(self, event: dict) -> bool:
+        first_update_id = event["U"]
+        final_update_id = event["u"]
+
+        if final_update_id <= self.last_update_id:
+            return False
+
+        if self._first:
+            if first_update_id > self.last_update_id + 1:
+                raise SequenceGap(
+                    f"First event U={first_update_id} is after "
+                    f"lastUpdateId={self.last_update_id}"
+                )
+            self._first = False
+        elif first_update_id != self.last_update_id + 1:
+            raise SequenceGap(
+                f"Event U={first_update_id} does not follow u={self.last_update_id}"
+            )
+
+        self.book.apply(event["b"], event["a"])
+        self.last_update_id = final_update_id
+        return True
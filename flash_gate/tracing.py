@@ -0,0 +1,145 @@
+import functools
+from contextvars import ContextVar
+from enum import Enum
+from time import monotonic_ns
+from typing import Awaitable, Callable, Optional, TypedDict
+
+# Доля команд, для которых записывается трасса
+DEFAULT_TRACE_SAMPLE_RATE = 0.01
+
+
+class TraceStage(str, Enum):
+    """
+    Этапы выполнения команды ядра
+    """
+
+    # Фрагмент Aeron прочитан подписчиком
+    RECEIVED = "received"
+    DESERIALIZED = "deserialized"
+    TASK_CREATED = "task_created"
+    TASK_STARTED = "task_started"
+    # Запрос к приватному API ждёт места в планировщике
+    REQUEST_QUEUED = "request_queued"
+    REQUEST_SCHEDULED = "request_scheduled"
+    # Пул выдал аккаунт
+    ACCOUNT_ACQUIRED = "account_acquired"
+    REST_SENT = "rest_sent"
+    REST_RECEIVED = "rest_received"
+    FORMATTED = "formatted"
+    OFFERED = "offered"
+
+
+class CommandTraceData(TypedDict):
+    event_id: Optional[str]
+    action: Optional[str]
+    # Этапы и время от получения команды в микросекундах
+    stages: list[tuple[str, int]]
+
+
+class CommandTrace:
+    """
+    Отметки времени этапов выполнения одной команды ядра
+
+    Этапы записываются по monotonic_ns в порядке прохождения и могут
+    повторяться, например при нескольких HTTP-запросах. Трасса, по которой
+    отправлен ответ, передаётся в on_finish один раз при завершении ветви.
+    """
+
+    __slots__ = ("marks", "on_finish", "event_id", "action", "responded")
+
+    def __init__(
+        self,
+        received_at: Optional[int] = None,
+        on_finish: Optional[Callable[["CommandTrace"], None]] = None,
+    ):
+        self.marks: list[tuple[TraceStage, int]] = [
+            (TraceStage.RECEIVED, received_at or monotonic_ns())
+        ]
+        self.on_finish = on_finish
+        # Первый ответ, отправленный по трассе
+        self.event_id: Optional[str] = None
+        self.action: Optional[str] = None
+        self.responded = False
+
+    def mark(self, stage: TraceStage) -> None:
+        self.marks.append((stage, monotonic_ns()))
+
+    def respond(self, event_id: Optional[str], action: Optional[str]) -> None:
+        """
+        Отметить отправку ответа
+        """
+        self.mark(TraceStage.OFFERED)
+        if not self.responded:
+            self.event_id = event_id
+            self.action = action
+            self.responded = True
+
+    def finish(self) -> None:
+        """
+        Передать трассу в on_finish, если по ней был отправлен ответ
+        """
+        on_finish, self.on_finish = self.on_finish, None
+        if self.responded and on_finish is not None:
+            on_finish(self)
+
+    def fork(self) -> "CommandTrace":
+        """
+        Получить копию для отдельной ветви команды, например одного ордера
+        """
+        trace = CommandTrace(on_finish=self.on_finish)
+        trace.marks = self.marks.copy()
+        return trace
+
+    def to_dict(self) -> CommandTraceData:
+        start = self.marks[0][1]
+        return {
+            "event_id": self.event_id,
+            "action": self.action,
+            "stages": [
+                (stage.value, (ns - start) // 1_000) for stage, ns in self.marks
+            ],
+        }
+
+
+# Время, когда подписчик прочитал фрагмент, если его читает отдельный поток
+fragment_received_at: ContextVar[Optional[int]] = ContextVar(
+    "fragment_received_at", default=None
+)
+# Трасса команды, которую выполняет текущая задача. Есть только у команд,
+# попавших в выборку
+current_trace: ContextVar[Optional[CommandTrace]] = ContextVar(
+    "current_trace", default=None
+)
+
+
+def mark(stage: TraceStage) -> None:
+    """
+    Отметить этап трассы текущей команды, если она трассируется
+    """
+    if (trace := current_trace.get()) is not None:
+        trace.mark(stage)
+
+
+def branch(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """
+    Выполнять корутинную функцию в отдельной ветви трассы
+
+    Этапы, отмеченные внутри, не попадают в трассы других ветвей той же
+    команды, даже если ветви выполняются последовательно в одной задаче.
+    Трасса ветви завершается при выходе из функции
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if (trace := current_trace.get()) is None:
+            return await func(*args, **kwargs)
+
+        fork = trace.fork()
+        token = current_trace.set(fork)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_trace.reset(token)
+            fork.finish()
+
+    return wrapper
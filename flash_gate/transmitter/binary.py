@@ -0,0 +1,155 @@
+import struct
+import sys
+from array import array
+from typing import Optional
+from .enums import EventAction, EventType
+from .formatters import MonotonicClock
+from .types import Event
+
+# Заголовок: сигнатура, версия, флаги, количество бидов, количество асков,
+# время события и время стакана в микросекундах
+HEADER = struct.Struct("<4sBBHHqq")
+STRING_LENGTH = struct.Struct("<B")
+MAGIC = b"FGOB"
+VERSION = 1
+SEQUENCE = struct.Struct("<q")
+FLAG_BOOK_TIMESTAMP = 0x01
+# Номер стакана в режиме дельт, передаётся после массивов
+FLAG_SEQUENCE = 0x02
+
+PRICE_SIZE = array("d").itemsize
+# Цены и объёмы передаются в little-endian
+SWAP_BYTES = sys.byteorder != "little"
+
+
+class BinaryOrderBookFormatter:
+    """
+    Компактный бинарный формат для событий ORDER_BOOK_UPDATE
+
+    После заголовка идут строки с однобайтовой длиной (биржа, event_id, тикер)
+    и четыре массива float64: цены бидов, объёмы бидов, цены асков, объёмы асков.
+    Формат разбирается функцией decode_order_book.
+    """
+
+    def __init__(self, config: dict, clock: MonotonicClock):
+        gate_config = config["data"]["configs"]["gate_config"]
+
+        self.clock = clock
+        self._exchange = encode_string(gate_config["exchange"]["exchange_id"])
+
+    @staticmethod
+    def supports(event: Event) -> bool:
+        return (
+            event.get("action") == EventAction.ORDER_BOOK_UPDATE
+            and event.get("event", EventType.DATA) == EventType.DATA
+        )
+
+    def format(self, event: Event) -> bytes:
+        order_book = event["data"]
+
+        flags = 0
+        if (book_timestamp := order_book.get("timestamp")) is not None:
+            flags |= FLAG_BOOK_TIMESTAMP
+        else:
+            book_timestamp = 0
+
+        sequence = order_book.get("sequence")
+        if sequence is not None:
+            flags |= FLAG_SEQUENCE
+
+        if (timestamp := event.get("timestamp")) is None:
+            timestamp = self.clock.now_us()
+
+        # Стакан на массивах сериализуется напрямую из своих колонок
+        if hasattr(order_book, "to_bytes"):
+            bids_count = len(order_book.bid_prices)
+            asks_count = len(order_book.ask_prices)
+            levels = order_book.to_bytes()
+        else:
+            bids_count = len(order_book["bids"])
+            asks_count = len(order_book["asks"])
+            levels = encode_levels(order_book["bids"], order_book["asks"])
+
+        header = HEADER.pack(
+            MAGIC, VERSION, flags, bids_count, asks_count, timestamp, book_timestamp
+        )
+        strings = (
+            self._exchange
+            + encode_string(event.get("event_id"))
+            + encode_string(order_book["symbol"])
+        )
+        message = header + strings + levels
+        if sequence is not None:
+            message += SEQUENCE.pack(sequence)
+        return message
+
+
+def encode_string(value: Optional[str]) -> bytes:
+    encoded = value.encode() if value is not None else b""
+    return STRING_LENGTH.pack(len(encoded)) + encoded
+
+
+def encode_levels(bids: list, asks: list) -> bytes:
+    columns = array("d", [level[0] for level in bids])
+    columns.extend([level[1] for level in bids])
+    columns.extend([level[0] for level in asks])
+    columns.extend([level[1] for level in asks])
+
+    if SWAP_BYTES:
+        columns.byteswap()
+    return columns.tobytes()
+
+
+def decode_string(message: bytes, offset: int) -> tuple[str, int]:
+    (length,) = STRING_LENGTH.unpack_from(message, offset)
+    offset += STRING_LENGTH.size
+    value = bytes(message[offset : offset + length]).decode()
+    return value, offset + length
+
+
+def decode_order_book(message: bytes) -> Event:
+    """
+    Эталонный декодер сообщений BinaryOrderBookFormatter
+
+    Возвращает событие с данными в том же виде, что и CcxtOrderBookFormatter
+    """
+    magic, version, flags, bids_count, asks_count, timestamp, book_timestamp = (
+        HEADER.unpack_from(message)
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Invalid order book message: {magic!r} v{version}")
+
+    offset = HEADER.size
+    exchange, offset = decode_string(message, offset)
+    event_id, offset = decode_string(message, offset)
+    symbol, offset = decode_string(message, offset)
+
+    size = 2 * (bids_count + asks_count) * PRICE_SIZE
+    columns = array("d")
+    columns.frombytes(message[offset : offset + size])
+    if SWAP_BYTES:
+        columns.byteswap()
+
+    asks_offset = 2 * bids_count
+    data = {
+        "symbol": symbol,
+        "bids": decode_levels(columns, 0, bids_count),
+        "asks": decode_levels(columns, asks_offset, asks_count),
+        "timestamp": book_timestamp if flags & FLAG_BOOK_TIMESTAMP else None,
+    }
+    if flags & FLAG_SEQUENCE:
+        (data["sequence"],) = SEQUENCE.unpack_from(message, offset + size)
+
+    return {
+        "event_id": event_id,
+        "exchange": exchange,
+        "action": EventAction.ORDER_BOOK_UPDATE,
+        "timestamp": timestamp,
+        "data": data,
+    }
+
+
+def decode_levels(columns: array, offset: int, count: int) -> list[list[float]]:
+    prices = columns[offset : offset + count]
+    amounts = columns[offset + count : offset + 2 * count]
+    return [[price, amount] for price, amount in zip(prices, amounts)]
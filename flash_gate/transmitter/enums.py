@@ -19,10 +19,13 @@ class EventAction(str, Enum):
     CANCEL_ALL_ORDERS = "cancel_all_orders"
     GET_ORDERS = "get_orders"
     ORDER_BOOK_UPDATE = "order_book_update"
+    ORDER_BOOK_DELTA = "order_book_delta"
     BALANCE_UPDATE = "balance_update"
     ORDERS_UPDATE = "orders_update"
     PING = "ping"
     METRICS = "metrics"
+    SLOW_CALLBACK = "slow_callback"
+    COMMAND_TRACE = "command_trace"
 
 
 class Destination(str, Enum):
@@ -30,3 +33,43 @@ class Destination(str, Enum):
     BALANCE = "balances"
     CORE = "core"
     LOGS = "logs"
+
+
+class OverflowPolicy(str, Enum):
+    """
+    Поведение очереди издателя при переполнении
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    # Хранить только последнее сообщение по ключу (например, стакан по тикеру)
+    KEEP_LATEST = "keep_latest"
+    NEVER_DROP = "never_drop"
+
+
+class Encoding(str, Enum):
+    """
+    Формат сообщений издателя
+    """
+
+    JSON = "json"
+    BINARY = "binary"
+
+
+class PollingMode(str, Enum):
+    """
+    Где опрашивается подписчик Aeron
+    """
+
+    LOOP = "loop"
+    THREAD = "thread"
+
+
+class IdleStrategyType(str, Enum):
+    """
+    Стратегия ожидания потока опроса, когда новых фрагментов нет
+    """
+
+    BUSY_SPIN = "busy_spin"
+    YIELD = "yield"
+    BACKOFF = "backoff"
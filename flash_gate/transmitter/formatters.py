@@ -1,10 +1,33 @@
 import json
-from datetime import datetime
+from time import monotonic_ns, time_ns
 from .types import Event
 from .enums import EventType
 
 
+class MonotonicClock:
+    """
+    Часы с микросекундной точностью, привязанные к монотонному времени.
+
+    Реальное время снимается один раз при создании, дальше к нему прибавляется
+    прирост монотонных часов. Такие часы не идут назад при коррекции системного
+    времени и не создают объект datetime на каждое сообщение
+    """
+
+    def __init__(self):
+        self._anchor_us = time_ns() // 1_000
+        self._anchor_ns = monotonic_ns()
+
+    def now_us(self) -> int:
+        return self._anchor_us + (monotonic_ns() - self._anchor_ns) // 1_000
+
+
 class JsonFormatter:
+    # Поля, которые меняются от события к событию. Если событие содержит только
+    # их, конверт собирается из заранее сериализованной статической части
+    DYNAMIC_KEYS = frozenset(
+        {"event_id", "event", "action", "message", "timestamp", "data"}
+    )
+
     def __init__(self, config: dict):
         gate_config = config["data"]["configs"]["gate_config"]
 
@@ -13,11 +36,57 @@ class JsonFormatter:
         self.instance = gate_config["info"]["instance"]
         self.exchange = gate_config["exchange"]["exchange_id"]
 
+        self.clock = MonotonicClock()
+        self._static = self._encode_static()
+
+    def _encode_static(self) -> str:
+        static = {
+            "exchange": self.exchange,
+            "node": self.node,
+            "instance": self.instance,
+            "algo": self.algo,
+        }
+        # Без фигурных скобок, чтобы вставлять внутрь конверта
+        return json.dumps(static)[1:-1]
+
     def format(self, event: Event) -> str:
+        if event.keys() <= self.DYNAMIC_KEYS:
+            return self._format_envelope(event)
+
         template = self._get_template()
         filled = self._fill_template(template, event)
         return self._serialize(filled)
 
+    def _format_envelope(self, event: Event) -> str:
+        """
+        Сериализовать событие, подставив заранее закодированные статические поля.
+        Результат совпадает с сериализацией заполненного шаблона
+        """
+        if "timestamp" in event:
+            timestamp = json.dumps(event["timestamp"])
+        else:
+            timestamp = str(self.clock.now_us())
+
+        return "".join(
+            (
+                '{"event_id": ',
+                json.dumps(event.get("event_id")),
+                ', "event": ',
+                json.dumps(event.get("event", EventType.DATA)),
+                ", ",
+                self._static,
+                ', "action": ',
+                json.dumps(event.get("action")),
+                ', "message": ',
+                json.dumps(event.get("message")),
+                ', "timestamp": ',
+                timestamp,
+                ', "data": ',
+                json.dumps(event.get("data"), default=encode_default),
+                "}",
+            )
+        )
+
     def _get_template(self) -> dict:
         return {
             "event_id": None,
@@ -32,9 +101,8 @@ class JsonFormatter:
             "data": None,
         }
 
-    @staticmethod
-    def _get_timestamp_in_us() -> int:
-        return int(datetime.now().timestamp() * 1_000_000)
+    def _get_timestamp_in_us(self) -> int:
+        return self.clock.now_us()
 
     @staticmethod
     def _fill_template(template: dict, data: dict) -> dict:
@@ -45,4 +113,14 @@ class JsonFormatter:
 
     @staticmethod
     def _serialize(message: dict) -> str:
-        return json.dumps(message)
+        return json.dumps(message, default=encode_default)
+
+
+def encode_default(value):
+    """
+    Сериализовать объекты, которые умеют представлять себя словарём,
+    например стакан на массивах
+    """
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
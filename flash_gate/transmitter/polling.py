@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from time import monotonic_ns, sleep
+from typing import Callable, Optional
+from aeron import Subscriber
+from flash_gate.tracing import fragment_received_at
+from .enums import IdleStrategyType
+
+# Параметры стратегии BACKOFF: сначала активное ожидание, затем уступка
+# процессора, затем сон с экспоненциально растущей длительностью
+MAX_SPINS = 100
+MAX_YIELDS = 100
+MIN_PARK_S = 0.000001
+MAX_PARK_S = 0.001
+
+JOIN_TIMEOUT_S = 1
+
+
+class IdleStrategy(ABC):
+    """
+    Стратегия ожидания для синхронного цикла опроса
+    """
+
+    @abstractmethod
+    def idle(self, work_count: int) -> None:
+        """
+        Подождать, если цикл не выполнил полезной работы
+
+        :param work_count: Количество прочитанных фрагментов
+        """
+        ...
+
+
+class BusySpinIdleStrategy(IdleStrategy):
+    def idle(self, work_count: int) -> None:
+        pass
+
+
+class YieldingIdleStrategy(IdleStrategy):
+    def idle(self, work_count: int) -> None:
+        if work_count <= 0:
+            os.sched_yield()
+
+
+class BackoffIdleStrategy(IdleStrategy):
+    def __init__(
+        self,
+        max_spins: int = MAX_SPINS,
+        max_yields: int = MAX_YIELDS,
+        min_park: float = MIN_PARK_S,
+        max_park: float = MAX_PARK_S,
+    ):
+        self.max_spins = max_spins
+        self.max_yields = max_yields
+        self.min_park = min_park
+        self.max_park = max_park
+
+        self._spins = 0
+        self._yields = 0
+        self._park = min_park
+
+    def idle(self, work_count: int) -> None:
+        if work_count > 0:
+            self._reset()
+        elif self._spins < self.max_spins:
+            self._spins += 1
+        elif self._yields < self.max_yields:
+            self._yields += 1
+            os.sched_yield()
+        else:
+            sleep(self._park)
+            self._park = min(self._park * 2, self.max_park)
+
+    def _reset(self) -> None:
+        self._spins = 0
+        self._yields = 0
+        self._park = self.min_park
+
+
+def make_idle_strategy(strategy_type: IdleStrategyType) -> IdleStrategy:
+    match strategy_type:
+        case IdleStrategyType.BUSY_SPIN:
+            return BusySpinIdleStrategy()
+        case IdleStrategyType.YIELD:
+            return YieldingIdleStrategy()
+        case IdleStrategyType.BACKOFF:
+            return BackoffIdleStrategy()
+        case _:
+            raise ValueError(f"Invalid idle strategy: {strategy_type}")
+
+
+class PollingThread:
+    """
+    Поток, опрашивающий подписчика Aeron вне цикла событий
+
+    Фрагменты, прочитанные за один опрос, передаются в цикл событий одной
+    пачкой через call_soon_threadsafe и обрабатываются там исходным обработчиком.
+    """
+
+    def __init__(self, handler: Callable[[str], None], idle_strategy: IdleStrategy):
+        self.logger = logging.getLogger(__name__)
+        self.handler = handler
+        self.idle_strategy = idle_strategy
+
+        self._batch: list[tuple[int, str]] = []
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def collect(self, message: str) -> None:
+        """
+        Обработчик фрагментов для подписчика. Вызывается в потоке опроса
+        """
+        self._batch.append((monotonic_ns(), message))
+
+    def start(self, subscriber: Subscriber, loop: asyncio.AbstractEventLoop) -> None:
+        self._thread = threading.Thread(
+            target=self._run, args=(subscriber, loop), name="aeron-poll", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, subscriber: Subscriber, loop: asyncio.AbstractEventLoop) -> None:
+        while not self._stopped.is_set():
+            try:
+                fragments_read = subscriber.poll()
+            except Exception as e:
+                self.logger.exception(e)
+                fragments_read = 0
+
+            if self._batch:
+                batch, self._batch = self._batch, []
+                try:
+                    loop.call_soon_threadsafe(self._dispatch, batch)
+                except RuntimeError as e:
+                    # Цикл событий закрыт
+                    self.logger.error(e)
+                    break
+
+            self.idle_strategy.idle(fragments_read)
+
+    def _dispatch(self, batch: list[tuple[int, str]]) -> None:
+        for received_at, message in batch:
+            fragment_received_at.set(received_at)
+            try:
+                self.handler(message)
+            except Exception as e:
+                self.logger.exception(e)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(JOIN_TIMEOUT_S)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Hashable, NoReturn, Optional
+import aeron
+from aeron import Publisher
+from .enums import OverflowPolicy
+
+# Первые попытки повторной отправки только уступают управление циклу событий,
+# последующие ждут с экспоненциально растущей задержкой
+YIELD_ATTEMPTS = 8
+MAX_RETRIES = 16
+BACKOFF_BASE_S = 0.0001
+BACKOFF_MAX_S = 0.01
+
+
+class OutboundQueue:
+    """
+    Очередь исходящих сообщений одного издателя Aeron
+
+    Сообщение отправляется сразу, если очередь пуста и издатель его принял.
+    Иначе оно ставится в очередь, которую разбирает отдельная корутина,
+    и цикл событий не блокируется на обратном давлении.
+    """
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        policy: OverflowPolicy,
+        capacity: int,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.publisher = publisher
+        self.policy = policy
+        self.capacity = capacity
+        self.max_retries = max_retries
+
+        self._messages: deque[tuple[Optional[Hashable], str | bytes]] = deque()
+        self._ready = asyncio.Event()
+        # Сообщение из головы очереди ждёт повторной отправки
+        self._retrying = False
+
+        # Счётчики
+        self.sent = 0
+        self.dropped = 0
+        self.not_connected = 0
+        self.back_pressured = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._messages) + self._retrying
+
+    def offer(self, message: str | bytes, key: Optional[Hashable] = None) -> None:
+        """
+        Отправить сообщение или поставить его в очередь
+
+        Пока предыдущее сообщение ждёт повторной отправки, новые только
+        ставятся в очередь, чтобы не обогнать его
+
+        :param message: Сообщение
+        :param key: Ключ, по которому политика KEEP_LATEST заменяет устаревшие сообщения
+        """
+        if not self._messages and not self._retrying and self._try_offer(message):
+            return
+        self._put(message, key)
+
+    def _try_offer(self, message: str | bytes) -> bool:
+        """
+        Попытаться отправить сообщение
+
+        Повторяются только отправки, отклонённые из-за обратного давления или
+        служебных действий издателя. Сообщение, вызвавшее другую ошибку,
+        отбрасывается, чтобы не блокировать очередь
+
+        :return: False, если издатель не принял сообщение и попытку стоит повторить
+        """
+        try:
+            self.publisher.offer(message)
+            self.sent += 1
+            return True
+        except aeron.AeronPublicationNotConnectedError as e:
+            self.logger.debug(e)
+            self.not_connected += 1
+            return True
+        except (
+            aeron.AeronPublicationBackPressuredError,
+            aeron.AeronPublicationAdminActionError,
+        ) as e:
+            self.logger.debug(e)
+            self.back_pressured += 1
+            return False
+        except Exception as e:
+            self.logger.warning("Message dropped: %s", e)
+            self.failed += 1
+            return True
+
+    def _put(self, message: str | bytes, key: Optional[Hashable]) -> None:
+        if self.policy == OverflowPolicy.KEEP_LATEST and key is not None:
+            self._discard_key(key)
+
+        if len(self._messages) >= self.capacity and not self._make_room():
+            self.dropped += 1
+            return
+
+        self._messages.append((key, message))
+        self._ready.set()
+
+    def _discard_key(self, key: Hashable) -> None:
+        for index, (queued_key, _) in enumerate(self._messages):
+            if queued_key == key:
+                del self._messages[index]
+                self.dropped += 1
+                return
+
+    def _make_room(self) -> bool:
+        """
+        Освободить место в переполненной очереди
+
+        :return: False, если новое сообщение нужно отбросить
+        """
+        match self.policy:
+            case OverflowPolicy.DROP_NEWEST:
+                return False
+            case OverflowPolicy.NEVER_DROP:
+                if len(self._messages) == self.capacity:
+                    self.logger.warning("Queue is over capacity: %s", self.capacity)
+                return True
+            case _:
+                self._messages.popleft()
+                self.dropped += 1
+                return True
+
+    async def drain(self) -> NoReturn:
+        """
+        Разбирать очередь, пока в ней есть сообщения
+        """
+        while True:
+            await self._ready.wait()
+
+            while self._messages:
+                key, message = self._messages.popleft()
+                self._retrying = True
+                try:
+                    sent = await self._offer_with_backoff(message)
+                finally:
+                    self._retrying = False
+                if sent:
+                    continue
+
+                if self.policy == OverflowPolicy.NEVER_DROP:
+                    self._messages.appendleft((key, message))
+                    await asyncio.sleep(BACKOFF_MAX_S)
+                else:
+                    self.logger.warning(
+                        "Message dropped after %s retries", self.max_retries
+                    )
+                    self.dropped += 1
+
+            self._ready.clear()
+
+    async def _offer_with_backoff(self, message: str | bytes) -> bool:
+        for attempt in range(self.max_retries):
+            if self._try_offer(message):
+                return True
+            await asyncio.sleep(self._get_backoff(attempt))
+        return False
+
+    @staticmethod
+    def _get_backoff(attempt: int) -> float:
+        if attempt < YIELD_ATTEMPTS:
+            return 0
+        return min(BACKOFF_BASE_S * 2 ** (attempt - YIELD_ATTEMPTS), BACKOFF_MAX_S)
+
+    def close(self) -> None:
+        self.publisher.close()
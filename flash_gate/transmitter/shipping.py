@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from collections import deque
+from typing import NoReturn, Optional
+from .enums import EventAction, EventType
+from .formatters import JsonFormatter
+from .queues import OutboundQueue
+from .types import Event
+
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_BATCH_BYTES = 65536
+DEFAULT_FLUSH_INTERVAL_MS = 100
+# Сколько событий может накопиться до того, как малоценные события начнут
+# отбрасываться
+DEFAULT_MAX_PENDING = 8192
+# Действия, события которых можно отбросить при переполнении, помимо
+# прореживаемых
+LOW_VALUE_ACTIONS = frozenset(
+    {
+        EventAction.ORDER_BOOK_UPDATE,
+        EventAction.ORDER_BOOK_DELTA,
+        EventAction.BALANCE_UPDATE,
+        EventAction.METRICS,
+        EventAction.PING,
+    }
+)
+
+
+class LogShipper:
+    """
+    Стадия отправки событий на сервер логирования
+
+    События копятся в памяти и сериализуются уже при отправке, вне обработки
+    команд ядра. Отправка происходит пачками по размеру или по таймеру.
+    Пачка из нескольких событий отправляется как JSON-массив, одно событие —
+    как обычный JSON-объект. Пока очередь издателя заполнена, события
+    остаются в памяти шлюза. Если накопилось max_pending событий, новые
+    малоценные события отбрасываются, а события ордеров и ошибки
+    сохраняются всегда.
+    """
+
+    def __init__(
+        self,
+        formatter: JsonFormatter,
+        queue: OutboundQueue,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_bytes: int = DEFAULT_BATCH_BYTES,
+        flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+        sampling: Optional[dict[str, int]] = None,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        """
+        :param formatter: Форматтер событий
+        :param queue: Очередь издателя логов
+        :param batch_size: Максимальное количество событий в пачке
+        :param batch_bytes: Максимальный размер пачки в байтах
+        :param flush_interval_ms: Максимальное время ожидания неполной пачки
+        :param sampling: Для действия N — отправлять каждое N-е событие
+        :param max_pending: Сколько событий накапливается до отбрасывания
+            малоценных
+        """
+        self.logger = logging.getLogger(__name__)
+        self.formatter = formatter
+        self.queue = queue
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.flush_interval = flush_interval_ms / 1000
+        self.sampling = sampling or {}
+        self.max_pending = max_pending
+
+        for action, rate in self.sampling.items():
+            if not isinstance(rate, int) or rate < 1:
+                raise ValueError(f"Invalid sampling rate for {action}: {rate}")
+
+        self._pending: deque[Event | str] = deque()
+        self._sample_counters = dict.fromkeys(self.sampling, 0)
+        self._full = asyncio.Event()
+
+        # Счётчики
+        self.sampled_out = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def put(self, event: Event, message: Optional[str] = None) -> None:
+        """
+        Добавить событие в очередь на отправку
+
+        :param event: Событие
+        :param message: Уже сериализованное событие, если оно есть
+        """
+        if not self._is_sampled(event):
+            self.sampled_out += 1
+            return
+
+        if message is None:
+            # Время события фиксируется сейчас, а не при сериализации.
+            # Собственное время события, например команды ядра, сохраняется
+            message = {"timestamp": self.formatter.clock.now_us()} | event
+
+        if len(self._pending) >= self.max_pending and self._is_droppable(event):
+            self.dropped += 1
+            return
+
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    def _is_sampled(self, event: Event) -> bool:
+        action = event.get("action")
+        if action not in self._sample_counters:
+            return True
+
+        # Ошибки отправляются всегда
+        if event.get("event", EventType.DATA) == EventType.ERROR:
+            return True
+
+        counter = self._sample_counters[action]
+        self._sample_counters[action] = (counter + 1) % self.sampling[action]
+        return counter == 0
+
+    def _is_droppable(self, event: Event) -> bool:
+        if event.get("event", EventType.DATA) == EventType.ERROR:
+            return False
+
+        action = event.get("action")
+        return action in self.sampling or action in LOW_VALUE_ACTIONS
+
+    async def run(self) -> NoReturn:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._full.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Сериализовать накопленные события и отправить их пачками
+
+        Пока очередь издателя заполнена, события не забираются, чтобы
+        при переполнении отбрасывались только малоценные
+        """
+        batch = []
+        batch_bytes = 0
+
+        while self._pending and self.queue.depth < self.queue.capacity:
+            message = self._serialize(self._pending.popleft())
+            if message is None:
+                continue
+
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_bytes + len(message) > self.batch_bytes
+            ):
+                self._offer_batch(batch)
+                batch = []
+                batch_bytes = 0
+
+            batch.append(message)
+            batch_bytes += len(message) + 1
+
+        if batch:
+            self._offer_batch(batch)
+
+    def _serialize(self, message: Event | str) -> Optional[str]:
+        if isinstance(message, str):
+            return message
+        try:
+            return self.formatter.format(message)
+        except Exception as e:
+            self.logger.error(e)
+
+    def _offer_batch(self, batch: list[str]) -> None:
+        self.batches += 1
+        if len(batch) == 1:
+            self.queue.offer(batch[0])
+        else:
+            self.queue.offer("[" + ",".join(batch) + "]")
@@ -1,33 +1,156 @@
+import asyncio
 import logging
-from typing import Callable, NoReturn
-import aeron
+from typing import Callable, Hashable, NoReturn, Optional
 from aeron import Publisher, Subscriber
 from aeron.concurrent import AsyncSleepingIdleStrategy
+from .binary import BinaryOrderBookFormatter
 from .formatters import JsonFormatter
-from .types import Event
-from .enums import Destination
-
+from .polling import PollingThread, make_idle_strategy
+from .queues import OutboundQueue
+from .shipping import LogShipper
+from .types import Event, QueueStats
+from .enums import (
+    Destination,
+    Encoding,
+    EventAction,
+    EventType,
+    IdleStrategyType,
+    OverflowPolicy,
+    PollingMode,
+)
 
 IDLE_SLEEP_MS = 1
+DEFAULT_QUEUE_SIZE = 1024
+
+# Параметры издателя, которые читает шлюз, а не Aeron
+PUBLISHER_OPTIONS = ("queue_size", "overflow_policy", "encoding")
+SHIPPING_OPTIONS = (
+    "batch_size",
+    "batch_bytes",
+    "flush_interval_ms",
+    "sampling",
+    "max_pending",
+)
+POLLING_OPTIONS = ("polling", "idle_strategy")
+
+# Политики переполнения по умолчанию. Переопределяются полем overflow_policy
+# в конфигурации издателя
+DEFAULT_OVERFLOW_POLICIES = {
+    Destination.ORDER_BOOK: OverflowPolicy.KEEP_LATEST,
+    Destination.BALANCE: OverflowPolicy.KEEP_LATEST,
+    Destination.CORE: OverflowPolicy.NEVER_DROP,
+    # Логи копит LogShipper, который при переполнении отбрасывает только
+    # малоценные события
+    Destination.LOGS: OverflowPolicy.NEVER_DROP,
+}
 
 
 class AeronTransmitter:
     def __init__(self, handler: Callable[[str], None], config: dict):
         aeron_config = config["data"]["configs"]["gate_config"]["aeron"]
-        subscribers = aeron_config["subscribers"]
-        publishers = aeron_config["publishers"]
+        subscriber = aeron_config["subscribers"]["core"].copy()
+        polling = self._pop_options(subscriber, POLLING_OPTIONS)
+        publishers = {
+            destination: aeron_config["publishers"][destination].copy()
+            for destination in Destination
+        }
+        shipping = self._pop_options(publishers[Destination.LOGS], SHIPPING_OPTIONS)
+        options = {
+            destination: self._pop_options(publishers[destination], PUBLISHER_OPTIONS)
+            for destination in Destination
+        }
 
         self.logger = logging.getLogger(__name__)
         self.formatter = JsonFormatter(config)
+        self.binary_formatter = BinaryOrderBookFormatter(config, self.formatter.clock)
         self.idle_strategy = AsyncSleepingIdleStrategy(IDLE_SLEEP_MS)
 
-        self.subscriber = Subscriber(handler, **subscribers["core"])
-        self.order_book = Publisher(**publishers["orderbooks"])
-        self.balance = Publisher(**publishers["balances"])
-        self.core = Publisher(**publishers["core"])
-        self.logs = Publisher(**publishers["logs"])
+        self.polling_mode = PollingMode(polling.get("polling", PollingMode.LOOP))
+        self.polling_thread: Optional[PollingThread] = None
+        if self.polling_mode == PollingMode.THREAD:
+            idle_strategy = IdleStrategyType(
+                polling.get("idle_strategy", IdleStrategyType.BACKOFF)
+            )
+            self.polling_thread = PollingThread(
+                handler, make_idle_strategy(idle_strategy)
+            )
+            handler = self.polling_thread.collect
+
+        self.subscriber = Subscriber(handler, **subscriber)
+        self.queues: dict[Destination, OutboundQueue] = {
+            destination: self._create_queue(
+                destination, publishers[destination], options[destination]
+            )
+            for destination in Destination
+        }
+        self.encodings: dict[Destination, Encoding] = {
+            destination: self._get_publisher_encoding(destination, options[destination])
+            for destination in Destination
+        }
+        self.log_shipper = LogShipper(
+            self.formatter, self.queues[Destination.LOGS], **shipping
+        )
+
+    @staticmethod
+    def _pop_options(config: dict, keys: tuple[str, ...]) -> dict:
+        """
+        Извлечь из конфигурации издателя параметры, которые не передаются в Aeron
+        """
+        return {key: config.pop(key) for key in keys if key in config}
+
+    def _create_queue(
+        self, destination: Destination, config: dict, options: dict
+    ) -> OutboundQueue:
+        """
+        Создать издателя и очередь исходящих сообщений для него
+
+        :param destination: Направление
+        :param config: Конфигурация издателя Aeron
+        :param options: Параметры издателя, которые читает шлюз
+        """
+        capacity = options.get("queue_size", DEFAULT_QUEUE_SIZE)
+        policy = OverflowPolicy(
+            options.get("overflow_policy", DEFAULT_OVERFLOW_POLICIES[destination])
+        )
+
+        # Ответы на команды ядра и пачки логов с ордерами и ошибками
+        # не отбрасываются ни при каких настройках
+        if (
+            destination in (Destination.CORE, Destination.LOGS)
+            and policy != OverflowPolicy.NEVER_DROP
+        ):
+            self.logger.warning(
+                "Overflow policy %s ignored for %s", policy, destination.value
+            )
+            policy = OverflowPolicy.NEVER_DROP
+
+        return OutboundQueue(Publisher(**config), policy, capacity)
+
+    def _get_publisher_encoding(
+        self, destination: Destination, options: dict
+    ) -> Encoding:
+        encoding = Encoding(options.get("encoding", Encoding.JSON))
+
+        # Пачки логов собираются из JSON-сообщений
+        if destination == Destination.LOGS and encoding != Encoding.JSON:
+            self.logger.warning("Encoding %s ignored for logs", encoding)
+            encoding = Encoding.JSON
+
+        return encoding
 
     async def run(self) -> NoReturn:
+        tasks = [queue.drain() for queue in self.queues.values()]
+        tasks.append(self.log_shipper.run())
+
+        if self.polling_thread is not None:
+            loop = asyncio.get_running_loop()
+            self.polling_thread.start(self.subscriber, loop)
+        else:
+            tasks.append(self._poll_forever())
+
+        await asyncio.gather(*tasks)
+
+    async def _poll_forever(self) -> NoReturn:
         while True:
             await self._poll()
 
@@ -35,46 +158,95 @@ class AeronTransmitter:
         fragments_read = self.subscriber.poll()
         await self.idle_strategy.idle(fragments_read)
 
-    def offer(self, event: Event, destination: Destination) -> None:
-        try:
-            self._offer(event, destination)
-        except Exception as e:
-            self.logger.error(e)
+    def offer(self, event: Event, *destinations: Destination) -> None:
+        """
+        Отправить событие в одно или несколько направлений
 
-    def _offer(self, event: Event, destination: Destination):
-        publisher = self._get_publisher(destination)
-        message = self.formatter.format(event)
-        self._offer_while_not_successful(publisher, message)
+        Событие сериализуется один раз, и полученное сообщение публикуется
+        во все переданные направления. Событие, которое отправляется только
+        в логи, сериализуется позже, при отправке пачки логов.
+        """
+        if destinations == (Destination.LOGS,):
+            self.log_shipper.put(event)
+            return
 
-    def _offer_while_not_successful(self, publisher: Publisher, message: str) -> None:
-        while True:
+        key = self._get_key(event)
+        messages: dict[Encoding, str | bytes] = {}
+
+        for destination in destinations:
             try:
-                result = publisher.offer(message)
-                break
-            except aeron.AeronPublicationNotConnectedError as e:
-                self.logger.debug(e)
-                break
-            except aeron.AeronPublicationAdminActionError as e:
-                self.logger.warning(e)
+                encoding = self._get_encoding(event, destination)
+                if encoding not in messages:
+                    messages[encoding] = self._format(event, encoding)
+                self._offer(event, messages[encoding], destination, key)
             except Exception as e:
-                self.logger.exception(e)
-
-    def _get_publisher(self, destination) -> Publisher:
-        match destination:
-            case Destination.ORDER_BOOK:
-                return self.order_book
-            case Destination.BALANCE:
-                return self.balance
-            case Destination.CORE:
-                return self.core
-            case Destination.LOGS:
-                return self.logs
+                self.logger.error(e)
+
+    def _get_encoding(self, event: Event, destination: Destination) -> Encoding:
+        encoding = self.encodings[destination]
+        if encoding == Encoding.BINARY and not self.binary_formatter.supports(event):
+            return Encoding.JSON
+        return encoding
+
+    def _format(self, event: Event, encoding: Encoding) -> str | bytes:
+        match encoding:
+            case Encoding.BINARY:
+                return self.binary_formatter.format(event)
             case _:
-                raise ValueError(f"Invalid destination: {destination}")
+                return self.formatter.format(event)
+
+    def _offer(
+        self,
+        event: Event,
+        message: str | bytes,
+        destination: Destination,
+        key: Optional[Hashable],
+    ):
+        if destination == Destination.LOGS:
+            self.log_shipper.put(event, message)
+        else:
+            queue = self._get_queue(destination)
+            queue.offer(message, key)
+
+    @staticmethod
+    def _get_key(event: Event) -> Optional[Hashable]:
+        """
+        Получить ключ, по которому более новое сообщение вытесняет старое из очереди
+        """
+        if event.get("event", EventType.DATA) != EventType.DATA:
+            return None
+
+        match event.get("action"):
+            case EventAction.ORDER_BOOK_UPDATE:
+                return EventAction.ORDER_BOOK_UPDATE, event["data"]["symbol"]
+            case EventAction.BALANCE_UPDATE:
+                return EventAction.BALANCE_UPDATE
+
+    def _get_queue(self, destination) -> OutboundQueue:
+        try:
+            return self.queues[destination]
+        except KeyError:
+            raise ValueError(f"Invalid destination: {destination}")
+
+    def queue_stats(self) -> dict[str, QueueStats]:
+        """
+        Получить глубину очередей и счётчики отброшенных сообщений
+        """
+        return {
+            destination.value: {
+                "depth": queue.depth,
+                "sent": queue.sent,
+                "dropped": queue.dropped,
+                "back_pressured": queue.back_pressured,
+                "not_connected": queue.not_connected,
+                "failed": queue.failed,
+            }
+            for destination, queue in self.queues.items()
+        }
 
     def close(self):
+        if self.polling_thread is not None:
+            self.polling_thread.stop()
         self.subscriber.close()
-        self.order_book.close()
-        self.balance.close()
-        self.core.close()
-        self.logs.close()
+        for queue in self.queues.values():
+            queue.close()
@@ -13,3 +13,12 @@ class Event(TypedDict, total=False):
     message: str
     timestamp: int
     data: Any
+
+
+class QueueStats(TypedDict):
+    depth: int
+    sent: int
+    dropped: int
+    back_pressured: int
+    not_connected: int
+    failed: int
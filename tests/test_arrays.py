@@ -0,0 +1,56 @@
+import json
+from flash_gate.exchange.arrays import ArrayOrderBook
+from flash_gate.exchange.formatters import CcxtOrderBookFormatter
+from flash_gate.gate.orderbooks import OrderBookCache
+from flash_gate.transmitter.binary import BinaryOrderBookFormatter, decode_order_book
+from flash_gate.transmitter.enums import EventAction
+from flash_gate.transmitter.formatters import JsonFormatter, MonotonicClock
+from .test_binary import RAW_ORDER_BOOK
+from .test_formatters import CONFIG
+
+
+class TestArrayOrderBook:
+    def test_same_shape_as_formatter(self):
+        order_book = ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK)
+        assert order_book.to_dict() == CcxtOrderBookFormatter().format(RAW_ORDER_BOOK)
+        assert dict(order_book) == order_book.to_dict()
+
+    def test_truncate(self):
+        order_book = ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK).truncate(1)
+        assert order_book.bids == [[20102.37, 0.00521]]
+        assert order_book.asks == [[20102.38, 0.4]]
+
+    def test_mid_spread_imbalance(self):
+        order_book = ArrayOrderBook.from_levels("BTC/USDT", [[99, 3]], [[101, 1]])
+        assert order_book.mid == 100
+        assert order_book.spread == 2
+        assert order_book.imbalance() == 0.5
+        assert ArrayOrderBook.from_levels("BTC/USDT", [], []).mid is None
+
+    def test_equality(self):
+        assert ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK) == ArrayOrderBook.from_ccxt(
+            RAW_ORDER_BOOK | {"timestamp": 1}
+        )
+        assert ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK) != ArrayOrderBook.from_ccxt(
+            RAW_ORDER_BOOK | {"bids": [[1.0, 1.0]]}
+        )
+
+    def test_unchanged_book_is_skipped(self):
+        cache = OrderBookCache()
+        assert cache.update(ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK))
+        assert cache.update(ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK)) is None
+
+    def test_serialization(self):
+        order_book = ArrayOrderBook.from_ccxt(RAW_ORDER_BOOK)
+        event = {
+            "event_id": "1f0b1c3e-5cde-4a5f-9d11-c1d1c3c9a001",
+            "action": EventAction.ORDER_BOOK_UPDATE,
+            "timestamp": 1656000000200000,
+            "data": order_book,
+        }
+
+        message = json.loads(JsonFormatter(CONFIG).format(event))
+        assert message["data"] == order_book.to_dict()
+
+        binary = BinaryOrderBookFormatter(CONFIG, MonotonicClock()).format(event)
+        assert decode_order_book(binary)["data"] == order_book.to_dict()
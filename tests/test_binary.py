@@ -0,0 +1,60 @@
+import json
+from flash_gate.exchange.formatters import CcxtOrderBookFormatter
+from flash_gate.transmitter.binary import BinaryOrderBookFormatter, decode_order_book
+from flash_gate.transmitter.enums import EventAction
+from flash_gate.transmitter.formatters import JsonFormatter, MonotonicClock
+from .test_formatters import CONFIG
+
+RAW_ORDER_BOOK = {
+    "symbol": "BTC/USDT",
+    "bids": [[20102.37, 0.00521], [20102.36, 1.2], [20101.0, 0.1]],
+    "asks": [[20102.38, 0.4], [20103.99, 0.00004]],
+    "timestamp": 1656000000123,
+    "datetime": "2022-06-23T16:00:00.123Z",
+    "nonce": 21140123456,
+}
+
+
+class TestBinaryOrderBookFormatter:
+    formatter = BinaryOrderBookFormatter(CONFIG, MonotonicClock())
+
+    def make_event(self, order_book: dict) -> dict:
+        return {
+            "event_id": "1f0b1c3e-5cde-4a5f-9d11-c1d1c3c9a001",
+            "action": EventAction.ORDER_BOOK_UPDATE,
+            "timestamp": 1656000000200000,
+            "data": order_book,
+        }
+
+    def test_round_trip(self):
+        order_book = CcxtOrderBookFormatter().format(RAW_ORDER_BOOK)
+        event = self.make_event(order_book)
+
+        decoded = decode_order_book(self.formatter.format(event))
+
+        assert json.dumps(decoded["data"]) == json.dumps(order_book)
+        assert decoded["event_id"] == event["event_id"]
+        assert decoded["timestamp"] == event["timestamp"]
+        assert decoded["exchange"] == "binance"
+
+    def test_round_trip_without_timestamp(self):
+        order_book = CcxtOrderBookFormatter().format(
+            RAW_ORDER_BOOK | {"timestamp": None}
+        )
+        decoded = decode_order_book(self.formatter.format(self.make_event(order_book)))
+        assert decoded["data"] == order_book
+
+    def test_smaller_than_json(self):
+        order_book = CcxtOrderBookFormatter().format(RAW_ORDER_BOOK)
+        event = self.make_event(order_book)
+        json_message = JsonFormatter(CONFIG).format(event)
+        assert len(self.formatter.format(event)) < len(json_message)
+
+    def test_supports_only_order_book_updates(self):
+        assert self.formatter.supports(self.make_event({}))
+        assert not self.formatter.supports({"action": EventAction.GET_BALANCE})
+
+    def test_round_trip_with_sequence(self):
+        order_book = CcxtOrderBookFormatter().format(RAW_ORDER_BOOK) | {"sequence": 7}
+        decoded = decode_order_book(self.formatter.format(self.make_event(order_book)))
+        assert decoded["data"] == order_book
@@ -0,0 +1,42 @@
+import asyncio
+from flash_gate.gate.executor import OrderExecutor
+
+
+class TestOrderExecutor:
+    def test_same_key_runs_in_order(self):
+        async def run():
+            executor = OrderExecutor(max_in_flight_per_account=10)
+            calls = []
+
+            async def operation(name: str, delay: float):
+                await asyncio.sleep(delay)
+                calls.append(name)
+
+            await asyncio.gather(
+                executor.run("a", operation, "create", 0.02),
+                executor.run("a", operation, "cancel", 0),
+                executor.run("b", operation, "other", 0),
+            )
+            return calls
+
+        assert asyncio.run(run()) == ["other", "create", "cancel"]
+
+    def test_slot_limits_concurrency(self):
+        async def run():
+            executor = OrderExecutor(max_in_flight_per_account=2)
+            account = object()
+            in_flight = 0
+            peak = 0
+
+            async def operation():
+                nonlocal in_flight, peak
+                async with executor.slot(account):
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                    await asyncio.sleep(0.001)
+                    in_flight -= 1
+
+            await asyncio.gather(*(executor.run(i, operation) for i in range(5)))
+            return peak
+
+        assert asyncio.run(run()) == 2
@@ -0,0 +1,63 @@
+import asyncio
+import socket
+from flash_gate.gate.exporter import MetricsExporter, OpenMetricsWriter
+from flash_gate.gate.statistics import LatencyHistogram
+
+
+class TestOpenMetricsWriter:
+    def test_counter_and_gauge(self):
+        writer = OpenMetricsWriter()
+        writer.counter("offers", "Offers", [({"destination": "core"}, 3)])
+        writer.gauge("lag_seconds", "Lag", [({}, 0.5)])
+        assert writer.text().splitlines() == [
+            "# TYPE flash_gate_offers counter",
+            "# HELP flash_gate_offers Offers",
+            'flash_gate_offers_total{destination="core"} 3',
+            "# TYPE flash_gate_lag_seconds gauge",
+            "# HELP flash_gate_lag_seconds Lag",
+            "flash_gate_lag_seconds 0.5",
+            "# EOF",
+        ]
+
+    def test_label_values_are_escaped(self):
+        writer = OpenMetricsWriter()
+        writer.gauge("value", "Value", [({"name": 'a"b\\c'}, 1)])
+        assert 'flash_gate_value{name="a\\"b\\\\c"} 1' in writer.text()
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for latency in (50, 5_000, 20_000_000):
+            histogram.record(latency)
+
+        writer = OpenMetricsWriter()
+        writer.histogram("latency_seconds", "Latency", [({"action": "x"}, histogram)])
+        lines = writer.text().splitlines()
+
+        assert 'flash_gate_latency_seconds_bucket{action="x",le="0.0001"} 1' in lines
+        assert 'flash_gate_latency_seconds_bucket{action="x",le="0.005"} 2' in lines
+        assert 'flash_gate_latency_seconds_bucket{action="x",le="10"} 2' in lines
+        assert 'flash_gate_latency_seconds_bucket{action="x",le="+Inf"} 3' in lines
+        assert 'flash_gate_latency_seconds_count{action="x"} 3' in lines
+        assert 'flash_gate_latency_seconds_sum{action="x"} 20.00505' in lines
+        assert lines[-1] == "# EOF"
+
+
+class TestMetricsExporter:
+    def test_bind_error_does_not_stop_run(self):
+        async def run():
+            with socket.socket() as occupied:
+                occupied.bind(("127.0.0.1", 0))
+                occupied.listen()
+                port = occupied.getsockname()[1]
+
+                exporter = MetricsExporter(
+                    lambda writer: None, port=port, retry_delay=0.01
+                )
+                task = asyncio.create_task(exporter.run())
+                await asyncio.sleep(0.05)
+                running = not task.done()
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                return running
+
+        assert asyncio.run(run())
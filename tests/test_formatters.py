@@ -0,0 +1,62 @@
+import json
+from flash_gate.transmitter.enums import EventAction, EventNode, EventType
+from flash_gate.transmitter.formatters import JsonFormatter, MonotonicClock
+
+CONFIG = {
+    "algo": "spread_bot",
+    "data": {
+        "configs": {
+            "gate_config": {
+                "info": {"node": "gate_binance", "instance": "1"},
+                "exchange": {"exchange_id": "binance"},
+            }
+        }
+    },
+}
+
+
+class TestJsonFormatter:
+    formatter = JsonFormatter(CONFIG)
+
+    def reference(self, event: dict) -> str:
+        template = self.formatter._get_template()
+        filled = self.formatter._fill_template(template, event)
+        return self.formatter._serialize(filled)
+
+    def test_envelope_matches_template(self):
+        event = {
+            "event_id": "6d1a",
+            "action": EventAction.ORDER_BOOK_UPDATE,
+            "timestamp": 1656000000000000,
+            "data": {"symbol": "BTC/USDT", "bids": [[1.5, 2.0]], "asks": []},
+        }
+        assert self.formatter.format(event) == self.reference(event)
+
+    def test_error_envelope_matches_template(self):
+        event = {
+            "event_id": "6d1a",
+            "event": EventType.ERROR,
+            "action": EventAction.CREATE_ORDERS,
+            "message": "Timeout error",
+            "timestamp": 1,
+            "data": [{"client_order_id": "a"}],
+        }
+        assert self.formatter.format(event) == self.reference(event)
+
+    def test_static_field_override(self):
+        event = {"event_id": "6d1a", "node": EventNode.GATE, "timestamp": 1}
+        assert self.formatter.format(event) == self.reference(event)
+        assert json.loads(self.formatter.format(event))["node"] == "gate"
+
+    def test_timestamp_is_filled(self):
+        message = json.loads(self.formatter.format({"event_id": "6d1a"}))
+        assert message["event"] == "data"
+        assert message["exchange"] == "binance"
+        assert isinstance(message["timestamp"], int)
+
+
+class TestMonotonicClock:
+    def test_not_decreasing(self):
+        clock = MonotonicClock()
+        first = clock.now_us()
+        assert clock.now_us() >= first
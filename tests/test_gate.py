@@ -0,0 +1,242 @@
+import asyncio
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from ccxt.base.errors import RequestTimeout
+from flash_gate.cache.index import OrderIndex
+from flash_gate.exchange.pool import PrivateExchangePool
+from flash_gate.gate import gate as gate_module
+from flash_gate.gate.enums import DataCollectionMethod, PrivateAction, RequestPriority
+from flash_gate.gate.executor import OrderExecutor
+from flash_gate.gate.gate import Gate
+from flash_gate.gate.orderbooks import OrderBookCache
+from flash_gate.gate.scheduler import PrivateRequestScheduler
+from flash_gate.gate.parsers import ConfigParser
+from flash_gate.gate.statistics import LatencyHistogram
+
+
+class FakeTransmitter:
+    def __init__(self):
+        self.events = []
+
+    def offer(self, event, *destinations) -> None:
+        self.events.append(event)
+
+
+class StreamFirstExchange:
+    """
+    Биржа, присылающая обновление ордера в поток раньше ответа на создание
+    """
+
+    def __init__(self, gate: Gate):
+        self.gate = gate
+
+    async def create_order(self, param: dict) -> dict:
+        order = {
+            "id": "1",
+            "client_order_id": None,
+            "symbol": param["symbol"],
+            "status": "open",
+            "filled": 0.0,
+        }
+        self.gate.on_order_update(order | {"status": "closed", "filled": 1.0})
+        return order
+
+
+class StreamExchange:
+    """
+    Биржа, поток стаканов которой отдаёт заданные стаканы и ошибки,
+    а затем ждёт бесконечно
+    """
+
+    def __init__(self, *updates):
+        self.updates = list(updates)
+
+    async def watch_order_book(self, symbol: str, limit: int) -> dict:
+        if not self.updates:
+            await asyncio.get_running_loop().create_future()
+        update = self.updates.pop(0)
+        if isinstance(update, Exception):
+            raise update
+        return make_orderbook(symbol, update)
+
+    async def fetch_order_book(self, symbol: str, limit: int) -> dict:
+        return make_orderbook(symbol, 0.5)
+
+
+class FakeExchangePool:
+    """
+    Пул, выдающий exchange в заданном порядке
+    """
+
+    def __init__(self, exchanges: list):
+        self.exchanges = list(exchanges)
+        self.acquired = []
+
+    async def acquire(self, weight: int):
+        exchange = self.exchanges.pop(0)
+        self.acquired.append(exchange)
+        return exchange
+
+    def get_local_host(self, exchange) -> str:
+        return "127.0.0.1"
+
+
+def make_orderbook(symbol: str, price: float) -> dict:
+    return {"symbol": symbol, "bids": [[price, 1.0]], "asks": [], "timestamp": None}
+
+
+def make_config(exchange_rps_limit: float) -> dict:
+    gate_config = {
+        "exchange": {
+            "exchange_id": "binance",
+            "credentials": {"api_key": "", "secret_key": "", "password": ""},
+            "timeout_ms": 10000,
+        },
+        "rate_limits": {
+            "enable_ccxt_rate_limiter": False,
+            "api_requests_per_seconds": {
+                "private": {"exchange_rps_limit": exchange_rps_limit}
+            },
+        },
+        "gate": {},
+    }
+    return {"data": {"configs": {"gate_config": gate_config}}}
+
+
+def make_gate() -> Gate:
+    gate = Gate.__new__(Gate)
+    gate.order_index = OrderIndex()
+    gate.order_executor = OrderExecutor(max_in_flight_per_account=1)
+    gate.open_orders = set()
+    gate.untracked_updates = OrderedDict()
+    gate.response_latencies = LatencyHistogram()
+    gate.transmitter = FakeTransmitter()
+    account = SimpleNamespace(index=0, exchange=StreamFirstExchange(gate))
+
+    @asynccontextmanager
+    async def private_request(*args, **kwargs):
+        yield account
+
+    gate.private_request = private_request
+    return gate
+
+
+def make_stream_gate(exchanges: list, tickers: list[str]) -> Gate:
+    gate = Gate.__new__(Gate)
+    gate.tickers = tickers
+    gate.order_book_method = DataCollectionMethod.WEBSOCKET
+    gate.order_book_limit = 5
+    gate.exchange_pool = FakeExchangePool(exchanges)
+    gate.orderbook_cache = OrderBookCache()
+    gate.orderbook_latencies = LatencyHistogram()
+    gate.orderbook_latencies_by_ip = defaultdict(LatencyHistogram)
+    gate.orderbook_rps = 0
+    gate.transmitter = FakeTransmitter()
+    return gate
+
+
+async def run_until(gate: Gate, coroutine, events: int, timeout: float = 1) -> None:
+    async def wait_for_events():
+        while len(gate.transmitter.events) < events:
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(coroutine)
+    try:
+        await asyncio.wait_for(wait_for_events(), timeout)
+    finally:
+        task.cancel()
+
+
+class TestOrderUpdates:
+    def test_update_before_create_response_is_applied(self):
+        gate = make_gate()
+        param = {"client_order_id": "c1", "symbol": "BTC/USDT"}
+
+        asyncio.run(gate.create_order(param, "e1"))
+
+        actions = [event["action"] for event in gate.transmitter.events]
+        update = gate.transmitter.events[-1]
+        assert actions == ["create_orders", "orders_update"]
+        assert update["event_id"] == "e1"
+        assert update["data"][0]["client_order_id"] == "c1"
+        assert update["data"][0]["status"] == "closed"
+        assert gate.open_orders == set()
+        assert not gate.untracked_updates
+
+
+class TestPrivateExchangePool:
+    def test_account_delay_follows_private_rps_limit(self):
+        async def run():
+            config_parser = ConfigParser(make_config(exchange_rps_limit=2))
+            pool = Gate.create_private_exchange_pool(config_parser)
+            async with pool.request() as account:
+                pass
+            return account.get_wait_time(0)
+
+        assert 0.4 < asyncio.run(run()) <= 0.5
+
+
+class TestOrderBookStream:
+    def test_each_ticker_is_published_from_its_stream(self):
+        tickers = ["BTC/USDT", "ETH/USDT"]
+        gate = make_stream_gate([StreamExchange(1.0), StreamExchange(2.0)], tickers)
+
+        asyncio.run(run_until(gate, gate.watch_orderbooks(), 2))
+
+        published = {
+            event["data"]["symbol"]: event["data"]["bids"][0][0]
+            for event in gate.transmitter.events
+        }
+        assert published == {"BTC/USDT": 1.0, "ETH/USDT": 2.0}
+        assert len(gate.exchange_pool.acquired) == 2
+
+    def test_stream_error_falls_back_to_rest_and_reconnects(self, monkeypatch):
+        monkeypatch.setattr(gate_module, "RECONNECT_DELAY_S", 0)
+        # Первый IP-адрес получил бан: стакан запрашивается по HTTP,
+        # а поток переподключается через другой адрес
+        banned = StreamExchange(1.0, RequestTimeout("banned"))
+        rest = StreamExchange()
+        healthy = StreamExchange(2.0)
+        gate = make_stream_gate([banned, rest, healthy], ["BTC/USDT"])
+
+        asyncio.run(run_until(gate, gate.stream_orderbook("BTC/USDT"), 4))
+
+        events = gate.transmitter.events
+        assert len(events) == 4
+        assert events[0]["data"]["bids"][0][0] == 1.0
+        assert events[1]["event"] == "error"
+        assert events[2]["data"]["bids"][0][0] == 0.5
+        assert events[3]["data"]["bids"][0][0] == 2.0
+        assert gate.exchange_pool.acquired[-1] is healthy
+
+
+class TestPrivateRequest:
+    def test_latency_excludes_order_slot_wait(self):
+        async def run():
+            gate = Gate.__new__(Gate)
+            gate.private_scheduler = PrivateRequestScheduler(4, 10)
+            gate._private_exchange_pool = PrivateExchangePool(
+                "binance", {}, [{"apiKey": "a"}]
+            )
+            gate.order_executor = OrderExecutor(max_in_flight_per_account=1)
+            gate.private_api_total_rps = 0
+            gate.private_latencies_by_action = defaultdict(LatencyHistogram)
+            gate.private_latencies_by_account = defaultdict(LatencyHistogram)
+
+            async def request(duration: float):
+                async with gate.private_request(
+                    RequestPriority.CREATE,
+                    PrivateAction.CREATE_ORDER,
+                    urgent=True,
+                    order_slot=True,
+                ):
+                    await asyncio.sleep(duration)
+
+            # Второй запрос ждёт места аккаунта, пока выполняется первый
+            await asyncio.gather(request(0.05), request(0))
+            return gate.private_latencies_by_action["create_order"]
+
+        latencies = asyncio.run(run())
+        assert latencies.count == 2
+        assert latencies.percentile(50.0) < 10_000
@@ -0,0 +1,71 @@
+from flash_gate.cache.index import OrderIndex
+
+
+class TestOrderIndex:
+    def test_lookup(self):
+        index = OrderIndex()
+        index.add("c1", "101", "e1", "BTC/USDT")
+        assert index.get_order_id("c1") == "101"
+        assert index.get_event_id("c1") == "e1"
+        assert index.get_order_id("c2") is None
+
+    def test_active_orders_are_not_evicted(self):
+        index = OrderIndex(terminal_limit=1)
+        for i in range(3):
+            index.add(f"c{i}", str(i), "e", "BTC/USDT")
+        assert len(index) == 3
+
+    def test_terminal_orders_are_evicted_by_limit(self):
+        index = OrderIndex(terminal_limit=2)
+        for i in range(3):
+            index.add(f"c{i}", str(i), "e", "BTC/USDT")
+            index.set_status(f"c{i}", "closed")
+        assert index.get("c0") is None
+        assert index.get("c2").status == "closed"
+
+    def test_least_recently_used_is_evicted(self):
+        index = OrderIndex(terminal_limit=2)
+        for i in range(2):
+            index.add(f"c{i}", str(i), "e", "BTC/USDT", "canceled")
+        index.get("c0")
+        index.add("c2", "2", "e", "BTC/USDT", "canceled")
+        assert index.get("c0") is not None
+        assert index.get("c1") is None
+
+    def test_terminal_orders_are_evicted_by_ttl(self):
+        index = OrderIndex(terminal_ttl=0)
+        index.add("c0", "0", "e", "BTC/USDT", "closed")
+        index.add("c1", "1", "e", "BTC/USDT", "closed")
+        assert index.get("c0") is None
+
+    def test_update_reports_changes(self):
+        index = OrderIndex()
+        index.add("c1", "101", "e1", "BTC/USDT", "open", 0.0)
+        assert not index.update("c1", "open", 0.0)
+        assert index.update("c1", "open", 0.5)
+        assert index.update("c1", "closed", 0.5)
+        assert index.get("c1").terminal_at is not None
+
+    def test_lookup_by_order_id(self):
+        index = OrderIndex(terminal_limit=1)
+        index.add("c1", "101", "e1", "BTC/USDT", "closed")
+        assert index.get_by_order_id("101").client_order_id == "c1"
+        index.add("c2", "102", "e2", "BTC/USDT", "closed")
+        assert index.get_by_order_id("101") is None
+
+    def test_account_is_kept(self):
+        index = OrderIndex()
+        index.add("c1", "101", "e1", "BTC/USDT", account=1)
+        assert index.get_account("c1") == 1
+        assert index.get("c1").to_dict()["account"] == 1
+        assert index.get_account("c2") is None
+
+    def test_expired_order_is_evicted(self):
+        index = OrderIndex(terminal_limit=1)
+        index.add("c0", "0", "e", "BTC/USDT")
+        index.expire("c0")
+        assert index.get("c0").status == "open"
+
+        index.add("c1", "1", "e", "BTC/USDT", "closed")
+        assert index.get("c0") is None
+        assert index.get_by_order_id("0") is None
@@ -0,0 +1,79 @@
+import pytest
+from flash_gate.orderbook import DepthSynchronizer, LocalOrderBook, SequenceGap
+
+
+def make_event(first: int, final: int, bids: list = (), asks: list = ()) -> dict:
+    return {
+        "e": "depthUpdate",
+        "s": "BTCUSDT",
+        "U": first,
+        "u": final,
+        "b": bids,
+        "a": asks,
+    }
+
+
+def make_snapshot(nonce: int) -> dict:
+    return {
+        "symbol": "BTC/USDT",
+        "bids": [["100.0", "1.0"], ["99.0", "2.0"]],
+        "asks": [["101.0", "1.0"], ["102.0", "2.0"]],
+        "nonce": nonce,
+    }
+
+
+class TestLocalOrderBook:
+    def test_top_levels_are_sorted(self):
+        book = LocalOrderBook("BTC/USDT")
+        book.load([["99", "1"], ["100", "1"]], [["102", "1"], ["101", "1"]])
+        book.apply([["98", "1"], ["99", "0"]], [["103", "5"]])
+
+        top = book.top(2)
+        assert top["bids"] == [[100.0, 1.0], [98.0, 1.0]]
+        assert top["asks"] == [[101.0, 1.0], [102.0, 1.0]]
+
+    def test_removing_missing_level_is_ignored(self):
+        book = LocalOrderBook("BTC/USDT")
+        book.apply([["1", "0"]], [])
+        assert len(book.bids) == 0
+
+
+class TestDepthSynchronizer:
+    def test_buffered_events_are_applied_after_snapshot(self):
+        synchronizer = DepthSynchronizer(LocalOrderBook("BTC/USDT"))
+        assert not synchronizer.on_event(make_event(5, 9, [["100.0", "5.0"]]))
+        assert not synchronizer.on_event(make_event(10, 12, [["98.0", "1.0"]]))
+
+        synchronizer.on_snapshot(make_snapshot(10))
+
+        assert synchronizer.last_update_id == 12
+        assert synchronizer.book.top(3)["bids"] == [
+            [100.0, 1.0],
+            [99.0, 2.0],
+            [98.0, 1.0],
+        ]
+
+    def test_first_event_must_cover_snapshot(self):
+        synchronizer = DepthSynchronizer(LocalOrderBook("BTC/USDT"))
+        synchronizer.on_snapshot(make_snapshot(10))
+        with pytest.raises(SequenceGap):
+            synchronizer.on_event(make_event(12, 13))
+
+    def test_gap_is_detected(self):
+        synchronizer = DepthSynchronizer(LocalOrderBook("BTC/USDT"))
+        synchronizer.on_snapshot(make_snapshot(10))
+        assert synchronizer.on_event(make_event(9, 11))
+        assert synchronizer.on_event(make_event(12, 14))
+        with pytest.raises(SequenceGap):
+            synchronizer.on_event(make_event(16, 17))
+
+    def test_reset_clears_book(self):
+        synchronizer = DepthSynchronizer(LocalOrderBook("BTC/USDT"))
+        synchronizer.on_snapshot(make_snapshot(10))
+        synchronizer.reset()
+        assert not synchronizer.synced
+        assert synchronizer.book.top(5) == {
+            "symbol": "BTC/USDT",
+            "bids": [],
+            "asks": [],
+        }
@@ -0,0 +1,56 @@
+import asyncio
+import time
+from flash_gate.gate.monitor import LoopLagMonitor, SlowCallbackTracer
+
+
+async def block(seconds: float):
+    await asyncio.sleep(0.05)
+    time.sleep(seconds)
+
+
+class TestLoopLagMonitor:
+    def test_blocking_call_is_measured(self):
+        async def run():
+            monitor = LoopLagMonitor(interval=0.01)
+            task = asyncio.create_task(monitor.run())
+            await block(0.1)
+            await asyncio.sleep(0.05)
+            task.cancel()
+            return monitor.lags
+
+        lags = asyncio.run(run())
+        assert lags.max >= 50_000
+
+
+class TestSlowCallbackTracer:
+    def test_blocking_task_is_reported(self):
+        records = []
+
+        async def run():
+            tracer = SlowCallbackTracer(0.02, records.append)
+            task = asyncio.create_task(tracer.run())
+            await asyncio.sleep(0.05)
+            await asyncio.create_task(block(0.1), name="blocker")
+            await asyncio.sleep(0.05)
+            task.cancel()
+            return tracer.slow_callbacks
+
+        assert asyncio.run(run()) == 1
+        record = records[0]
+        assert record["task"] == "blocker"
+        assert record["coroutine"] == "block"
+        assert record["duration"] >= 0.08
+        assert "time.sleep" in record["stack"][-1]
+
+    def test_fast_callbacks_are_not_reported(self):
+        records = []
+
+        async def run():
+            tracer = SlowCallbackTracer(0.05, records.append)
+            task = asyncio.create_task(tracer.run())
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(run())
+        assert records == []
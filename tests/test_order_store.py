@@ -0,0 +1,86 @@
+import asyncio
+from flash_gate.exchange import CcxtExchange
+from flash_gate.exchange.store import OrderStore
+
+
+def make_order(order_id: str, status: str = "open", symbol: str = "BTC/USDT"):
+    return {
+        "id": order_id,
+        "client_order_id": None,
+        "timestamp": 1,
+        "status": status,
+        "symbol": symbol,
+        "type": "limit",
+        "side": "buy",
+        "price": 100.0,
+        "amount": 1.0,
+        "filled": 0.0,
+    }
+
+
+class TestOrderStore:
+    def test_open_order_goes_stale(self):
+        store = OrderStore(max_age=0)
+        store.put(make_order("1"))
+        assert store.get("1") is None
+
+        store = OrderStore(max_age=60)
+        store.put(make_order("1"))
+        assert store.get("1")["status"] == "open"
+
+    def test_terminal_order_does_not_go_stale(self):
+        store = OrderStore(max_age=0)
+        store.put(make_order("1", "canceled"))
+        assert store.get("1")["status"] == "canceled"
+
+    def test_terminal_status_is_not_overwritten(self):
+        store = OrderStore(max_age=60)
+        store.put(make_order("1", "closed"))
+        store.put(make_order("1", "open"))
+        assert store.get("1")["status"] == "closed"
+
+    def test_returned_order_is_a_copy(self):
+        store = OrderStore(max_age=60)
+        store.put(make_order("1"))
+        store.get("1")["client_order_id"] = "c1"
+        assert store.get("1")["client_order_id"] is None
+
+    def test_missing_open_orders_are_dropped(self):
+        store = OrderStore(max_age=60)
+        store.put(make_order("1"))
+        store.put(make_order("2"))
+        store.put(make_order("3", symbol="ETH/USDT"))
+        store.sync_open_orders(["BTC/USDT"], [make_order("2")])
+        assert store.get("1") is None
+        assert store.get("2") is not None
+        assert store.get("3") is not None
+
+    def test_limit(self):
+        store = OrderStore(max_age=60, limit=2)
+        for order_id in "123":
+            store.put(make_order(order_id, "closed"))
+        assert len(store) == 2 and store.get("1") is None
+
+
+class TestCcxtExchangeOrderState:
+    def test_polled_open_order_is_fetched_again_when_stale(self):
+        async def run():
+            exchange = CcxtExchange("binance", {}, order_state_max_age=0.05)
+            calls = []
+
+            async def fetch_order(order_id, symbol):
+                calls.append(order_id)
+                return {}
+
+            exchange.exchange.fetch_order = fetch_order
+            exchange._format = lambda raw_order, structure_type: make_order("1")
+
+            params = {"id": "1", "symbol": "BTC/USDT"}
+            # Опрос чаще max_age не должен продлевать актуальность состояния
+            for _ in range(10):
+                await exchange.fetch_order(params)
+                await asyncio.sleep(0.02)
+            await exchange.close()
+            return len(calls)
+
+        assert asyncio.run(run()) >= 3
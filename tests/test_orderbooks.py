@@ -0,0 +1,45 @@
+from flash_gate.gate.orderbooks import OrderBookCache, get_changed_levels
+from flash_gate.transmitter.enums import EventAction
+
+
+def make_orderbook(bids: list, asks: list, timestamp: int = 1) -> dict:
+    return {"symbol": "BTC/USDT", "bids": bids, "asks": asks, "timestamp": timestamp}
+
+
+class TestOrderBookCache:
+    def test_unchanged_book_is_skipped(self):
+        cache = OrderBookCache()
+        assert cache.update(make_orderbook([[1.0, 1.0]], [[2.0, 1.0]]))
+        assert cache.update(make_orderbook([[1.0, 1.0]], [[2.0, 1.0]], 2)) is None
+        assert cache.unchanged == 1
+
+    def test_book_mutated_in_place_is_detected(self):
+        cache = OrderBookCache()
+        bids = [[1.0, 1.0]]
+        cache.update(make_orderbook(bids, []))
+        bids[0][1] = 2.0
+        assert cache.update(make_orderbook(bids, [])) is not None
+
+    def test_deltas_and_snapshots(self):
+        cache = OrderBookCache(deltas=True, snapshot_interval=2)
+
+        action, data = cache.update(make_orderbook([[1.0, 1.0]], [[2.0, 1.0]]))
+        assert action == EventAction.ORDER_BOOK_UPDATE
+        assert data["sequence"] == 0
+
+        action, data = cache.update(make_orderbook([[1.0, 3.0]], [[2.0, 1.0]]))
+        assert action == EventAction.ORDER_BOOK_DELTA
+        assert data["sequence"] == 1
+        assert data["bids"] == [[1.0, 3.0]]
+        assert data["asks"] == []
+
+        action, data = cache.update(make_orderbook([[1.0, 1.0]], [[2.0, 1.0]]))
+        assert action == EventAction.ORDER_BOOK_UPDATE
+        assert data["sequence"] == 2
+
+
+class TestChangedLevels:
+    def test_removed_level_has_zero_amount(self):
+        previous = [[3.0, 1.0], [2.0, 1.0]]
+        current = [[3.0, 1.0], [1.0, 5.0]]
+        assert get_changed_levels(previous, current, True) == [[2.0, 0.0], [1.0, 5.0]]
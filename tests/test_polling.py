@@ -0,0 +1,49 @@
+import asyncio
+from flash_gate.transmitter.polling import BackoffIdleStrategy, PollingThread
+
+
+class QueueSubscriber:
+    def __init__(self, messages: list[str]):
+        self.messages = messages
+        self.handler = None
+
+    def poll(self) -> int:
+        fragments_read = len(self.messages)
+        for message in self.messages:
+            self.handler(message)
+        self.messages = []
+        return fragments_read
+
+
+class TestBackoffIdleStrategy:
+    def test_parks_after_spins_and_yields(self):
+        strategy = BackoffIdleStrategy(max_spins=1, max_yields=1, min_park=0.0)
+        for _ in range(3):
+            strategy.idle(0)
+        assert strategy._spins == 1
+        assert strategy._yields == 1
+
+    def test_resets_after_work(self):
+        strategy = BackoffIdleStrategy(max_spins=1, max_yields=1, min_park=0.0)
+        for _ in range(3):
+            strategy.idle(0)
+        strategy.idle(1)
+        assert strategy._spins == 0
+        assert strategy._yields == 0
+
+
+class TestPollingThread:
+    def test_messages_are_handled_in_loop(self):
+        async def poll():
+            received = []
+            thread = PollingThread(received.append, BackoffIdleStrategy())
+            subscriber = QueueSubscriber(["a", "b"])
+            subscriber.handler = thread.collect
+
+            thread.start(subscriber, asyncio.get_running_loop())
+            while len(received) < 2:
+                await asyncio.sleep(0.001)
+            thread.stop()
+            return received
+
+        assert asyncio.run(poll()) == ["a", "b"]
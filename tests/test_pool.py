@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from time import monotonic
+from flash_gate.exchange import ExchangePool
+from flash_gate.exchange.pool import ORDER_LIMIT, PrivateExchangePool
+from flash_gate.exchange.limits import (
+    RateLimitUsage,
+    WeightBucket,
+    get_order_book_weight,
+)
+
+
+class TestWeightBucket:
+    def test_budget_fits_into_any_minute(self):
+        bucket = WeightBucket(6000)
+        assert bucket.capacity + bucket.rate * 60 == 6000
+
+    def test_heavy_request_waits_for_full_bucket(self):
+        bucket = WeightBucket(600)
+        assert bucket.can_take(get_order_book_weight(5000))
+        bucket.take(get_order_book_weight(5000))
+        assert not bucket.can_take(1)
+        assert bucket.wait_time(1) > 0
+
+    def test_sync_slows_down_near_limit(self):
+        bucket = WeightBucket(6000)
+        bucket.sync(5990)
+        assert bucket.tokens <= 10
+        assert bucket.rate < bucket.base_rate
+
+    def test_limit_without_refill_is_rejected(self):
+        with pytest.raises(ValueError):
+            WeightBucket(1)
+
+    def test_sync_speeds_up_with_headroom(self):
+        bucket = WeightBucket(6000)
+        bucket.sync(0)
+        assert bucket.base_rate < bucket.rate <= 2 * bucket.base_rate
+
+
+class TestRateLimitUsage:
+    def test_headers_are_parsed(self):
+        usage = RateLimitUsage()
+        usage.update(
+            {
+                "X-MBX-USED-WEIGHT-1M": "120",
+                "X-MBX-ORDER-COUNT-10S": "3",
+                "x-mbx-order-count-1d": "42",
+                "Content-Type": "application/json",
+            }
+        )
+        assert usage.to_dict() == {
+            "used_weight": {"1m": 120},
+            "order_count": {"10s": 3, "1d": 42},
+            "retry_after": 0,
+        }
+        assert not usage.is_exhausted()
+
+    def test_exhausted_by_order_count(self):
+        usage = RateLimitUsage()
+        usage.update({"x-mbx-order-count-10s": "49"})
+        assert usage.is_exhausted()
+
+    def test_rate_limited(self):
+        usage = RateLimitUsage()
+        usage.set_rate_limited({"Retry-After": "5"})
+        assert 4 < usage.retry_after <= 5
+        assert usage.is_exhausted()
+
+
+class TestExchangePool:
+    def test_acquire_spreads_weight_and_waits_for_budget(self):
+        async def run():
+            pool = ExchangePool("binance", {}, ["127.0.0.1", "127.0.0.2"], 60000)
+            first = await pool.acquire(6000)
+            second = await pool.acquire(6000)
+
+            start = monotonic()
+            await pool.acquire(90)
+            elapsed = monotonic() - start
+            await pool.close()
+            return first, second, elapsed
+
+        first, second, elapsed = asyncio.run(run())
+        assert first is not second
+        # Бюджет пополняется на 900 в секунду
+        assert 0.08 < elapsed < 0.2
+
+
+class TestPrivateExchangePool:
+    def make_pool(self) -> PrivateExchangePool:
+        return PrivateExchangePool("binance", {}, [{"apiKey": "a"}, {"apiKey": "b"}])
+
+    def test_least_loaded_account_is_selected(self):
+        async def run():
+            pool = self.make_pool()
+            async with pool.request() as first:
+                async with pool.request() as second:
+                    return first.index, second.index
+
+        assert asyncio.run(run()) == (0, 1)
+
+    def test_pinned_account(self):
+        pool_exchanges = []
+
+        async def run():
+            pool = self.make_pool()
+            pool_exchanges.extend(pool.exchanges)
+            async with pool.request() as first:
+                # Второй аккаунт свободнее, но запрос закреплён за первым
+                return await pool.acquire(first.index)
+
+        assert asyncio.run(run()) is pool_exchanges[0]
+
+    def test_order_limit(self):
+        async def run():
+            pool = self.make_pool()
+            for _ in range(ORDER_LIMIT * 2):
+                async with pool.request(orders=1):
+                    pass
+            return [account.get_wait_time(1) for account in pool._accounts]
+
+        assert all(wait_time > 9 for wait_time in asyncio.run(run()))
+
+    def test_urgent_request_skips_account_delay(self):
+        async def run():
+            pool = PrivateExchangePool("binance", {}, [{"apiKey": "a"}], delay=10)
+            async with pool.request():
+                pass
+            account = pool._accounts[0]
+            return account.get_wait_time(0), account.get_wait_time(0, urgent=True)
+
+        wait_time, urgent_wait_time = asyncio.run(run())
+        assert wait_time > 9 and urgent_wait_time == 0
+
+    def test_account_goes_to_waiter_with_highest_priority(self):
+        async def run():
+            pool = PrivateExchangePool("binance", {}, [{"apiKey": "a"}], delay=0.02)
+            started = []
+
+            async def request(name: str, priority: int):
+                async with pool.request(priority=priority):
+                    started.append(name)
+
+            async with pool.request():
+                pass
+            # Опрос встал в очередь за аккаунтом раньше отмены
+            polls = [asyncio.create_task(request(f"poll-{i}", 3)) for i in range(3)]
+            await asyncio.sleep(0)
+            await asyncio.gather(request("cancel", 0), *polls)
+            return started
+
+        assert asyncio.run(run())[0] == "cancel"
+
+    def test_cancelled_waiter_does_not_hold_account(self):
+        async def run():
+            pool = PrivateExchangePool("binance", {}, [{"apiKey": "a"}], delay=0.02)
+            async with pool.request():
+                pass
+            waiter = asyncio.create_task(pool.request().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            async with pool.request() as account:
+                return account.in_flight
+
+        assert asyncio.run(run()) == 1
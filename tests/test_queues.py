@@ -0,0 +1,107 @@
+import asyncio
+import aeron
+from flash_gate.transmitter.enums import OverflowPolicy
+from flash_gate.transmitter.queues import OutboundQueue
+
+
+class FlakyPublisher:
+    """
+    Издатель, отклоняющий первые failures сообщений
+    """
+
+    def __init__(self, failures: int = 0, error: type = None):
+        self.failures = failures
+        self.error = error or aeron.AeronPublicationBackPressuredError
+        self.sent = []
+
+    def offer(self, message: str) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise self.error("Back pressured")
+        self.sent.append(message)
+
+    def close(self) -> None:
+        pass
+
+
+class TestOutboundQueue:
+    def test_offer_immediately(self):
+        publisher = FlakyPublisher()
+        queue = OutboundQueue(publisher, OverflowPolicy.DROP_OLDEST, 2)
+        queue.offer("a")
+        assert publisher.sent == ["a"]
+        assert queue.depth == 0
+
+    def test_keep_latest_replaces_message_with_same_key(self):
+        publisher = FlakyPublisher(failures=1)
+        queue = OutboundQueue(publisher, OverflowPolicy.KEEP_LATEST, 4)
+        queue.offer("btc-1", key="BTC/USDT")
+        queue.offer("eth-1", key="ETH/USDT")
+        queue.offer("btc-2", key="BTC/USDT")
+        assert queue.depth == 2
+        assert queue.dropped == 1
+
+    def test_drop_oldest_on_overflow(self):
+        publisher = FlakyPublisher(failures=1)
+        queue = OutboundQueue(publisher, OverflowPolicy.DROP_OLDEST, 2)
+        for message in "abc":
+            queue.offer(message)
+        assert queue.depth == 2
+        assert queue.dropped == 1
+
+    def test_never_drop_grows_over_capacity(self):
+        publisher = FlakyPublisher(failures=1)
+        queue = OutboundQueue(publisher, OverflowPolicy.NEVER_DROP, 2)
+        for message in "abcd":
+            queue.offer(message)
+        assert queue.depth == 4
+        assert queue.dropped == 0
+
+    def test_drain_keeps_order(self):
+        async def drain():
+            publisher = FlakyPublisher(failures=3)
+            queue = OutboundQueue(publisher, OverflowPolicy.NEVER_DROP, 8)
+            for message in "abc":
+                queue.offer(message)
+
+            task = asyncio.create_task(queue.drain())
+            while queue.depth:
+                await asyncio.sleep(0)
+            task.cancel()
+            return publisher.sent
+
+        assert asyncio.run(drain()) == ["a", "b", "c"]
+
+    def test_offer_during_retry_keeps_order(self):
+        async def drain():
+            publisher = FlakyPublisher(failures=2)
+            queue = OutboundQueue(publisher, OverflowPolicy.NEVER_DROP, 8)
+            queue.offer("a")
+
+            task = asyncio.create_task(queue.drain())
+            await asyncio.sleep(0)
+            queue.offer("b")
+            while queue.depth:
+                await asyncio.sleep(0)
+            task.cancel()
+            return publisher.sent
+
+        assert asyncio.run(drain()) == ["a", "b"]
+
+    def test_unexpected_error_does_not_block_queue(self):
+        async def drain():
+            publisher = FlakyPublisher(failures=1)
+            queue = OutboundQueue(publisher, OverflowPolicy.NEVER_DROP, 8)
+            queue.offer("a")
+            publisher.failures = 1
+            publisher.error = ValueError
+            queue.offer("b")
+            queue.offer("c")
+
+            task = asyncio.create_task(queue.drain())
+            while queue.depth:
+                await asyncio.sleep(0)
+            task.cancel()
+            return publisher.sent, queue.failed
+
+        assert asyncio.run(drain()) == (["b", "c"], 1)
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from flash_gate.gate.enums import RequestPriority
+from flash_gate.gate.scheduler import PrivateRequestScheduler, RequestShed
+
+
+class TestPrivateRequestScheduler:
+    def test_waiters_start_in_priority_order(self):
+        async def run():
+            scheduler = PrivateRequestScheduler(max_concurrency=1, max_backlog=10)
+            started = []
+
+            async def request(name: str, priority: RequestPriority):
+                async with scheduler.slot(priority):
+                    started.append(name)
+                    await asyncio.sleep(0.01)
+
+            await asyncio.gather(
+                request("first", RequestPriority.POLLING),
+                request("query", RequestPriority.QUERY),
+                request("create", RequestPriority.CREATE),
+                request("cancel", RequestPriority.CANCEL),
+            )
+            return started
+
+        assert asyncio.run(run()) == ["first", "cancel", "create", "query"]
+
+    def test_polling_leaves_room_for_commands(self):
+        async def run():
+            scheduler = PrivateRequestScheduler(max_concurrency=4, max_backlog=10)
+            release = asyncio.Event()
+
+            async def request(priority: RequestPriority):
+                async with scheduler.slot(priority):
+                    await release.wait()
+
+            tasks = [
+                asyncio.create_task(request(RequestPriority.POLLING)) for _ in range(3)
+            ]
+            tasks.append(asyncio.create_task(request(RequestPriority.CREATE)))
+            await asyncio.sleep(0)
+            in_flight = scheduler.in_flight
+            release.set()
+            await asyncio.gather(*tasks)
+            return in_flight
+
+        # Опрос занимает одно место из четырёх, команда не ждёт
+        assert asyncio.run(run()) == 2
+
+    def test_polling_is_shed_under_backlog(self):
+        async def run():
+            scheduler = PrivateRequestScheduler(max_concurrency=4, max_backlog=1)
+            async with scheduler.slot(RequestPriority.CREATE):
+                with pytest.raises(RequestShed):
+                    async with scheduler.slot(RequestPriority.POLLING):
+                        pass
+            return scheduler.shed
+
+        assert asyncio.run(run()) == 1
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        async def run():
+            scheduler = PrivateRequestScheduler(max_concurrency=1, max_backlog=10)
+            async with scheduler.slot(RequestPriority.CREATE):
+                waiter = asyncio.create_task(
+                    scheduler.slot(RequestPriority.CREATE).__aenter__()
+                )
+                await asyncio.sleep(0)
+                waiter.cancel()
+            await asyncio.sleep(0)
+            return scheduler.in_flight
+
+        assert asyncio.run(run()) == 0
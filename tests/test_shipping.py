@@ -0,0 +1,102 @@
+import json
+import pytest
+from flash_gate.transmitter.enums import EventAction, EventType
+from flash_gate.transmitter.formatters import JsonFormatter
+from flash_gate.transmitter.shipping import LogShipper
+from .test_formatters import CONFIG
+
+
+class CollectingQueue:
+    def __init__(self, capacity: int = 1024):
+        self.messages = []
+        self.depth = 0
+        self.capacity = capacity
+
+    def offer(self, message: str, key=None) -> None:
+        self.messages.append(message)
+
+
+class TestLogShipper:
+    formatter = JsonFormatter(CONFIG)
+
+    def test_single_event_is_not_wrapped(self):
+        queue = CollectingQueue()
+        shipper = LogShipper(self.formatter, queue)
+        shipper.put({"event_id": "a", "action": EventAction.GET_BALANCE})
+        shipper.flush()
+        assert json.loads(queue.messages[0])["event_id"] == "a"
+
+    def test_events_are_batched(self):
+        queue = CollectingQueue()
+        shipper = LogShipper(self.formatter, queue, batch_size=2)
+        for event_id in "abc":
+            shipper.put({"event_id": event_id})
+        shipper.flush()
+        assert len(queue.messages) == 2
+        assert [event["event_id"] for event in json.loads(queue.messages[0])] == [
+            "a",
+            "b",
+        ]
+
+    def test_batch_bytes_limit(self):
+        queue = CollectingQueue()
+        shipper = LogShipper(self.formatter, queue, batch_size=10, batch_bytes=1)
+        shipper.put({"event_id": "a"}, '{"event_id": "a"}')
+        shipper.put({"event_id": "b"}, '{"event_id": "b"}')
+        shipper.flush()
+        assert queue.messages == ['{"event_id": "a"}', '{"event_id": "b"}']
+
+    def test_sampling_keeps_errors(self):
+        queue = CollectingQueue()
+        sampling = {EventAction.ORDER_BOOK_UPDATE: 3}
+        shipper = LogShipper(self.formatter, queue, sampling=sampling)
+        for _ in range(6):
+            shipper.put({"action": EventAction.ORDER_BOOK_UPDATE})
+        shipper.put({"action": EventAction.ORDER_BOOK_UPDATE, "event": EventType.ERROR})
+        shipper.put({"action": EventAction.CREATE_ORDERS})
+        shipper.flush()
+        assert len(queue.messages) == 4
+        assert shipper.sampled_out == 4
+
+    def test_overflow_keeps_order_and_error_events(self):
+        queue = CollectingQueue()
+        shipper = LogShipper(self.formatter, queue, max_pending=2)
+        for _ in range(3):
+            shipper.put({"action": EventAction.ORDER_BOOK_UPDATE})
+        shipper.put({"action": EventAction.CREATE_ORDERS})
+        shipper.put({"action": EventAction.BALANCE_UPDATE, "event": EventType.ERROR})
+        shipper.flush()
+        assert len(queue.messages) == 4
+        assert shipper.dropped == 1
+
+    def test_event_timestamp_is_kept(self):
+        queue = CollectingQueue()
+        shipper = LogShipper(self.formatter, queue)
+        shipper.put({"event_id": "a", "timestamp": 1})
+        shipper.put({"event_id": "b"})
+        shipper.flush()
+        assert json.loads(queue.messages[0])["timestamp"] == 1
+        assert json.loads(queue.messages[1])["timestamp"] > 1
+
+    def test_full_queue_keeps_events_in_shipper(self):
+        queue = CollectingQueue(capacity=1)
+        shipper = LogShipper(self.formatter, queue, max_pending=1)
+        queue.depth = 1
+        shipper.put({"action": EventAction.CREATE_ORDERS})
+        shipper.put({"action": EventAction.ORDER_BOOK_UPDATE})
+        shipper.put({"action": EventAction.CANCEL_ORDERS})
+        shipper.flush()
+        assert queue.messages == []
+
+        queue.depth = 0
+        shipper.flush()
+        assert len(queue.messages) == 2
+        assert shipper.dropped == 1
+
+    def test_invalid_sampling_rate(self):
+        with pytest.raises(ValueError):
+            LogShipper(
+                self.formatter,
+                CollectingQueue(),
+                sampling={EventAction.ORDER_BOOK_UPDATE: 0},
+            )
@@ -1,5 +1,10 @@
 import statistics
-from flash_gate.gate.statistics import percentile
+from flash_gate.gate.statistics import (
+    LatencyHistogram,
+    latency_percentile,
+    latency_percentiles,
+    percentile,
+)
 import pytest
 
 DATA = [1, 2, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 7, 7, 8, 8, 10, 10]
@@ -31,3 +36,68 @@ class TestPercentile:
     def test_hundred(self):
         hundred_percentile = percentile(self.quantiles, "100")
         assert round(hundred_percentile, 2) == 10
+
+
+class TestLatencyHistogram:
+    def make_histogram(self, values) -> LatencyHistogram:
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        return histogram
+
+    def test_small_values_are_exact(self):
+        histogram = self.make_histogram(DATA)
+        assert histogram.percentile(50) == 5
+        assert histogram.percentile(90) == 8
+        assert histogram.percentile(100) == 10
+        assert len(histogram) == len(DATA)
+
+    def test_relative_error(self):
+        values = range(1, 1_000_001, 7)
+        histogram = self.make_histogram(values)
+        exact = statistics.quantiles(values, n=100, method="inclusive")
+        for n in (50, 90, 99):
+            assert abs(histogram.percentile(n) - exact[n - 1]) / exact[n - 1] < 0.01
+
+    def test_extremes(self):
+        histogram = self.make_histogram([-5, 1000, 2**40])
+        assert histogram.min == 0
+        assert histogram.percentile(0) == 0
+        assert histogram.percentile(100) == histogram.max
+
+    def test_merge(self):
+        first = self.make_histogram(range(100))
+        second = self.make_histogram(range(100, 200))
+        merged = first.snapshot()
+        merged.merge(second)
+        assert len(first) == 100
+        assert len(merged) == 200
+        assert merged.percentile(50) == 99
+        assert merged.max == 199
+
+    def test_empty_histogram_raises_exception(self):
+        with pytest.raises(ValueError):
+            LatencyHistogram().percentile(50)
+
+    def test_latency_percentile(self):
+        histogram = self.make_histogram(range(1, 101))
+        assert latency_percentile(histogram) == {
+            "50": 50,
+            "90": 90,
+            "99": 99,
+            "99.99": 100,
+        }
+
+    def test_reset(self):
+        histogram = self.make_histogram(DATA)
+        histogram.reset()
+        assert len(histogram) == 0 and histogram.max is None
+
+    def test_empty_histograms_are_skipped(self):
+        histograms = {"0": self.make_histogram([10]), "1": LatencyHistogram()}
+        assert list(latency_percentiles(histograms)) == ["0"]
+
+    def test_cumulative_counts(self):
+        histogram = self.make_histogram([1, 10, 100, 1000])
+        assert histogram.get_cumulative_counts([0, 10, 500, 10**12]) == [0, 2, 3, 4]
+        assert histogram.sum == 1111
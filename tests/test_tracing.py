@@ -0,0 +1,84 @@
+import asyncio
+from flash_gate.tracing import CommandTrace, TraceStage, branch, current_trace, mark
+
+
+def get_stages(trace: CommandTrace) -> list[TraceStage]:
+    return [stage for stage, _ in trace.marks]
+
+
+class TestCommandTrace:
+    def test_stages_are_relative_to_receipt(self):
+        trace = CommandTrace(received_at=1_000)
+        trace.respond("id", "create_orders")
+        trace.marks[-1] = (TraceStage.OFFERED, 251_000)
+
+        data = trace.to_dict()
+
+        assert data == {
+            "event_id": "id",
+            "action": "create_orders",
+            "stages": [("received", 0), ("offered", 250)],
+        }
+
+    def test_fork_does_not_share_marks(self):
+        trace = CommandTrace()
+        fork = trace.fork()
+        fork.mark(TraceStage.REST_SENT)
+
+        assert get_stages(trace) == [TraceStage.RECEIVED]
+        assert get_stages(fork) == [TraceStage.RECEIVED, TraceStage.REST_SENT]
+
+
+class TestMark:
+    def test_untraced_command_is_ignored(self):
+        async def run():
+            mark(TraceStage.TASK_STARTED)
+            return current_trace.get()
+
+        assert asyncio.run(run()) is None
+
+    def test_branches_are_traced_separately(self):
+        traces = []
+
+        @branch
+        async def request(stage: TraceStage):
+            mark(stage)
+            traces.append(current_trace.get())
+
+        async def run():
+            trace = CommandTrace()
+            current_trace.set(trace)
+            mark(TraceStage.TASK_STARTED)
+            await request(TraceStage.REST_SENT)
+            await request(TraceStage.FORMATTED)
+            return trace
+
+        trace = asyncio.run(run())
+
+        assert get_stages(trace) == [TraceStage.RECEIVED, TraceStage.TASK_STARTED]
+        assert [get_stages(branch_trace)[-1] for branch_trace in traces] == [
+            TraceStage.REST_SENT,
+            TraceStage.FORMATTED,
+        ]
+        assert all(TraceStage.REST_SENT not in get_stages(t) for t in traces[1:])
+
+    def test_branch_trace_is_finished_once(self):
+        finished = []
+
+        @branch
+        async def cancel():
+            trace = current_trace.get()
+            trace.respond("id", "cancel_orders")
+            trace.respond("id", "orders_update")
+
+        async def run():
+            trace = CommandTrace(on_finish=finished.append)
+            current_trace.set(trace)
+            await cancel()
+            trace.finish()
+
+        asyncio.run(run())
+
+        assert len(finished) == 1
+        assert finished[0].action == "cancel_orders"
+        assert get_stages(finished[0]).count(TraceStage.OFFERED) == 2